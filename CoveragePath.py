@@ -0,0 +1,260 @@
+from utils.Freezeable import Freezeable
+from settings import Setup
+from utils import Log as MyLog
+import cv2
+import numpy as np
+import math
+import sys
+import os
+
+class CoveragePath(Freezeable):
+    """
+    This class generates path files which cover the arena uniformly, for SFA data collection.
+    There are three patterns:
+    1. "sweep": boustrophedon sweeps along runparams.segment_orientation. Every sweep line is
+       driven in both directions (once on the way there and once on the way back).
+    2. "spiral": rectangular spiral from the walls to the center.
+    3. "lissajous": Lissajous figure over the whole arena.
+    Run this file to write a path file and print the expected coverage per minute
+    (set variable pattern at the bottom of this file or pass it on the command line).
+    """
+
+    # motor encoder steps per meter, see ePuckControl.TICKS_PER_M
+    TICKS_PER_M = 7700
+
+    # motor encoder steps per full turn on the spot, see ePuckControl.FULL_TURN
+    FULL_TURN = 1278
+
+    def __init__(self):
+        '''
+        Constructor
+        '''
+        self.setup = Setup()
+        self.name = "CoveragePath"
+
+        # distance between robots' center and the walls (same clearance as PathPlanner)
+        self.margin = self.setup.robot.diameter / 2 + self.setup.planner.margin
+
+        # distance between neighbouring sweep lines / spiral rings
+        self.spacing = self.setup.coverage.spacing
+
+        # arena area the robots' center can reach
+        self.x_min = self.margin
+        self.y_min = self.margin
+        self.x_max = self.setup.arena.boxwidth - self.margin
+        self.y_max = self.setup.arena.boxheight - self.margin
+
+        self.freeze()
+
+    def getLines(self, low, high):
+        """
+        Private. Positions of sweep lines between low and high (both included).
+        """
+        count = max(int(math.floor((high - low) / float(self.spacing))), 0) + 1
+        if count == 1:
+            return [int((low + high) / 2)]
+        return [int(round(v)) for v in np.linspace(low, high, count)]
+
+    def sweep(self):
+        """
+        Boustrophedon sweeps along runparams.segment_orientation.
+        The first pass sweeps the arena line by line, the second pass returns
+        over the same lines in opposite direction, so that every line is driven
+        with both headings.
+        """
+        if self.setup.runparams.segment_orientation == "up_down":
+            lines = self.getLines(self.x_min, self.x_max)
+            ends = (self.y_min, self.y_max)
+        else:
+            lines = self.getLines(self.y_min, self.y_max)
+            ends = (self.x_min, self.x_max)
+
+        # (line, start, end) of every sweep of the first pass
+        sweeps = []
+        for i in range(0, len(lines)):
+            if i % 2 == 0:
+                sweeps.append((lines[i], ends[0], ends[1]))
+            else:
+                sweeps.append((lines[i], ends[1], ends[0]))
+
+        # the second pass starts where the first pass ends
+        sweeps += [(line, end, start) for (line, start, end) in reversed(sweeps)]
+
+        points = []
+        for (line, start, end) in sweeps:
+            if self.setup.runparams.segment_orientation == "up_down":
+                points.append([line, start])
+                points.append([line, end])
+            else:
+                points.append([start, line])
+                points.append([end, line])
+
+        return self.removeDuplicates(points)
+
+    def spiral(self):
+        """
+        Rectangular spiral from the walls towards the center of the arena.
+        """
+        x_min, y_min, x_max, y_max = self.x_min, self.y_min, self.x_max, self.y_max
+
+        points = [[x_min, y_min]]
+        while x_min <= x_max and y_min <= y_max:
+            points.append([x_max, y_min])
+            points.append([x_max, y_max])
+            points.append([x_min, y_max])
+            y_min += self.spacing
+            if y_min > y_max:
+                break
+            points.append([x_min, y_min])
+            x_min += self.spacing
+            x_max -= self.spacing
+            y_max -= self.spacing
+            if x_min > x_max:
+                break
+            points.append([x_min, y_min])
+
+        return self.removeDuplicates([[int(p[0]), int(p[1])] for p in points])
+
+    def lissajous(self):
+        """
+        Lissajous figure x = sin(a * t + pi / 2), y = sin(b * t) scaled to the arena.
+        """
+        a = self.setup.coverage.lissajous_a
+        b = self.setup.coverage.lissajous_b
+
+        t = np.linspace(0, 2 * math.pi, self.setup.coverage.lissajous_points + 1)
+        x = (self.x_min + self.x_max) / 2.0 + (self.x_max - self.x_min) / 2.0 * np.sin(a * t + math.pi / 2)
+        y = (self.y_min + self.y_max) / 2.0 + (self.y_max - self.y_min) / 2.0 * np.sin(b * t)
+
+        return self.removeDuplicates([[int(round(x[i])), int(round(y[i]))] for i in range(0, len(t))])
+
+    def removeDuplicates(self, points):
+        """
+        Private. Remove consecutive points with equal coordinates.
+        """
+        result = []
+        for p in points:
+            if len(result) == 0 or result[-1] != p:
+                result.append(p)
+        return result
+
+    def getHeadingBin(self, angle):
+        """
+        Private. Returns the heading bin which PlaceCellCalculation uses for an angle
+        (1 = right/up, 0 = left/down) or None if the heading is not collected.
+        """
+        # angle which should be considered, see PlaceCellCalculation.update()
+        window = 60
+        if self.setup.runparams.segment_orientation == "up_down":
+            angle = angle - 90
+        angle = (angle + 180) % 360 - 180
+        if abs(angle) < window / 2:
+            return 1
+        if abs(angle) > 180 - window / 2:
+            return 0
+        return None
+
+    def estimateCoverage(self, points):
+        """
+        Estimate arena time and coverage of a path.
+        Returns a dictionary with the driving time in seconds, the covered fraction of the arena,
+        the covered fraction of (position, heading) poses and both as coverage per minute.
+        """
+        resolution = float(self.setup.coverage.resolution)
+        rows = int(math.ceil(self.setup.arena.boxheight / resolution))
+        cols = int(math.ceil(self.setup.arena.boxwidth / resolution))
+        thickness = max(int(round(self.setup.robot.diameter / resolution)), 1)
+
+        # area swept by the robot, and poses seen with each heading bin
+        area = np.zeros((rows, cols), np.uint8)
+        poses = np.zeros((2, rows, cols), np.uint8)
+
+        # wheel speeds are given in encoder steps per second
+        drive_speed = self.setup.navigation.drive_speed * 1000.0 / self.TICKS_PER_M
+        turn_speed = self.setup.navigation.rotate_speed * 360.0 / self.FULL_TURN
+
+        seconds = 0.0
+        heading = None
+        for i in range(1, len(points)):
+            d_x = points[i][0] - points[i - 1][0]
+            d_y = points[i][1] - points[i - 1][1]
+            length = math.sqrt(d_x ** 2 + d_y ** 2)
+            if length == 0:
+                continue
+            angle = math.degrees(math.atan2(d_y, d_x))
+
+            # turn on the spot, then drive straight
+            if heading != None:
+                seconds += abs((angle - heading + 180) % 360 - 180) / turn_speed
+            seconds += length / drive_speed
+            heading = angle
+
+            p = (int(points[i - 1][0] / resolution), int(points[i - 1][1] / resolution))
+            q = (int(points[i][0] / resolution), int(points[i][1] / resolution))
+            cv2.line(area, p, q, 1, thickness)
+
+            _bin = self.getHeadingBin(angle)
+            if _bin != None:
+                cv2.line(poses[_bin], p, q, 1, thickness)
+
+        area_coverage = area.mean()
+        pose_coverage = poses.mean()
+        minutes = seconds / 60.0
+
+        return {"seconds": seconds,
+                "area_coverage": area_coverage,
+                "pose_coverage": pose_coverage,
+                "area_coverage_per_minute": area_coverage / minutes if minutes > 0 else 0.0,
+                "pose_coverage_per_minute": pose_coverage / minutes if minutes > 0 else 0.0}
+
+    def generate(self, pattern):
+        """
+        Returns the points of pattern "sweep", "spiral" or "lissajous".
+        """
+        if pattern == "sweep":
+            return self.sweep()
+        elif pattern == "spiral":
+            return self.spiral()
+        elif pattern == "lissajous":
+            return self.lissajous()
+        raise Exception("wrong input: pattern. Correct usage: pattern = (\"sweep\", \"spiral\", \"lissajous\")")
+
+    def writePath(self, points, path, fileName):
+        """
+        Write points to a path file, which can be used by ePuckControl.followPath().
+        """
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+        _file = open(path + fileName, "w")
+        _file.write("x\ty\n")
+        for p in points:
+            _file.write(str(int(p[0])) + "\t" + str(int(p[1])) + "\n")
+        _file.close()
+        MyLog.l(self.name, "Path successfully written: " + path + fileName)
+
+if __name__ == "__main__":
+    setup = Setup()
+
+    # determines which path will be generated ("sweep", "spiral", "lissajous")
+    pattern = "sweep"
+
+    # directory of the path file
+    path = setup.filesystem.input_dir + setup.filesystem.path_dir
+
+    # process console input
+    for i, arg in enumerate(sys.argv):
+        if i == 0: continue
+        elif arg == "sweep": pattern = arg
+        elif arg == "spiral": pattern = arg
+        elif arg == "lissajous": pattern = arg
+        else: path = arg
+
+    coverage_path = CoveragePath()
+    points = coverage_path.generate(pattern)
+    coverage_path.writePath(points, path, "path_" + pattern + ".txt")
+
+    estimate = coverage_path.estimateCoverage(points)
+    MyLog.l(coverage_path.name, "Expected arena time: %.1f s" % estimate["seconds"])
+    MyLog.l(coverage_path.name, "Expected area coverage: %.1f%% (%.1f%% per minute)" % (estimate["area_coverage"] * 100, estimate["area_coverage_per_minute"] * 100))
+    MyLog.l(coverage_path.name, "Expected pose coverage: %.1f%% (%.1f%% per minute)" % (estimate["pose_coverage"] * 100, estimate["pose_coverage_per_minute"] * 100))
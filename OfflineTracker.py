@@ -0,0 +1,296 @@
+from utils.Freezeable import Freezeable
+from settings import Setup
+from utils import Log as MyLog
+from modules.ArenaFrame import getArenaFrame
+from modules.MarkerClassifier import MarkerClassifier
+from modules.MotionFilter import MotionFilter
+from cv2 import cv
+from collections import deque
+from multiprocessing import Pool, cpu_count
+import cv2
+import numpy as np
+import math
+import sys
+import os
+
+# file extensions of frames in a frame directory
+FRAME_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+def cropFrame(frame, params):
+    """
+    Returns the tracking image (image.tracking, see params) of a frame, None if there is no frame.
+    """
+    if frame is None:
+        return None
+    return frame[params["offy"]:params["offy"] + params["height"], params["offx"]:params["offx"] + params["width"]]
+
+def readFrames(source, frames, params):
+    """
+    Generator of the tracking images of a chunk: frames are file names of the frame directory source,
+    or the tracking images of a video (see readVideo()).
+    """
+    if os.path.isdir(source):
+        for fileName in frames:
+            yield cropFrame(cv2.imread(os.path.join(source, fileName)), params)
+    else:
+        for frame in frames:
+            yield frame
+
+def readVideo(source, chunk, params):
+    """
+    Generator of chunks (lists of tracking images, see cropFrame()) of a video, decoded sequentially from the first frame.
+    Seeking (CV_CAP_PROP_POS_FRAMES) is not frame-accurate for compressed video, so chunks are not decoded separately.
+    """
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise Exception("Could not open video: " + source)
+    try:
+        frames = []
+        while True:
+            flag, frame = cap.read()
+            if not flag:
+                break
+            # copy, so the full frame is freed
+            frames.append(cropFrame(frame, params).copy())
+            if len(frames) == chunk:
+                yield frames
+                frames = []
+        if len(frames) > 0:
+            yield frames
+    finally:
+        cap.release()
+
+def detectChunk(job):
+    """
+    Runs in a worker process. Detects the blue and the green marker (pixels) in each frame of a chunk.
+    job is (source, frames, params). Returns a list of [[blue x, blue y], [green x, green y]],
+    markers which could not be found are at [-1, -1].
+    """
+    source, frames, params = job
+    classifier = None
+    if params["use_lut"]:
+        classifier = MarkerClassifier([("blue", params["blue"][0], params["blue"][1])
+                                       , ("green", params["green"][0], params["green"][1])], params["lut_bits"])
+
+    markers = []
+    for frame in readFrames(source, frames, params):
+        if frame is None:
+            markers.append([[-1, -1], [-1, -1]])
+            continue
+
+        # blur the image to reduce noise
+        img = cv2.GaussianBlur(frame, (0, 0), 2)
+
+        if classifier != None:
+            centroids = classifier.getCentroids(classifier.classify(img))
+            positions = [centroids["blue"], centroids["green"]]
+        else:
+            img = cv2.cvtColor(img, cv.CV_BGR2HSV)
+            positions = []
+            for (low, high) in (params["blue"], params["green"]):
+                mmts = cv2.moments(cv2.inRange(img, low, high))
+                if mmts["m00"] > 0:
+                    positions.append([int(mmts["m10"] / mmts["m00"]), int(mmts["m01"] / mmts["m00"])])
+                else:
+                    positions.append(None)
+
+        # check if positions are plausible (see Tracker.validatePos())
+        for i in range(0, 2):
+            p = positions[i]
+            if p == None or not (0 < p[0] < params["width"] and 0 < p[1] < params["height"]):
+                positions[i] = [-1, -1]
+        markers.append(positions)
+    return markers
+
+class OfflineTracker(Freezeable):
+    """
+    This class re-runs tracking on a recorded overhead video or a directory of frames
+    (e.g. with new marker thresholds or a new calibration), much faster than real time.
+    The frames are split in chunks of tracking.offline_chunk frames, markers are detected
+    in a pool of processes and the results are merged in order. A video is decoded
+    sequentially in this process and only the tracking images are passed to the workers,
+    the chunks of a frame directory are read by the workers.
+    Tracking errors are handled like in Tracker.updatePosition() (motion filters, see MotionFilter)
+    and the output file has the same format as tracking.txt (x, y, angle).
+    Run this file with the video file or frame directory as argument:
+    python OfflineTracker.py session.avi [output file] [calibration file]
+    """
+
+    def __init__(self, source, blue=None, green=None):
+        '''
+        Constructor. source is a video file or a directory of frames.
+        blue and green are HSV ranges (low, high) of the markers, the tracker's thresholds by default.
+        '''
+        self.setup = Setup()
+        self.name = "OfflineTracker"
+
+        self.source = source
+
+        # HSV ranges (low, high) of the robot markers, see Tracker
+        self.blue_range = blue if blue != None else ((90, 100, 90), (110, 255, 255))
+        self.green_range = green if green != None else ((40, 140, 90), (55, 255, 255))
+
+        self.arena_frame = getArenaFrame()
+
+        self.freeze()
+
+    def getChunks(self, chunk, params):
+        """
+        Private. Generator of the chunks of frames: lists of file names of the frame directory or of decoded video frames.
+        """
+        if os.path.isdir(self.source):
+            frames = sorted(f for f in os.listdir(self.source) if os.path.splitext(f)[1].lower() in FRAME_EXTENSIONS)
+            for i in range(0, len(frames), chunk):
+                yield frames[i:i + chunk]
+        else:
+            for frames in readVideo(self.source, chunk, params):
+                yield frames
+
+    def loadCalibration(self, fileName=None):
+        """
+        Load calibration markers from a calibration_pts.txt file (see Tracker.loadCalibration()).
+        """
+        if fileName == None:
+            fileName = self.setup.filesystem.file_dir + self.setup.filesystem.cam_dir + "calibration/calibration_pts.txt"
+
+        corners = []
+        _file = open(fileName, "r")
+        try:
+            for i, line in enumerate(_file):
+                if i == 0:
+                    continue
+                if line.find("Marker") != -1:
+                    raise Exception("File is missing at least one marker. Try re-calibrating with Tracker.calibrate().")
+                x, y = line.strip().split()
+                corners.append([int(x), int(y)])
+        finally:
+            _file.close()
+
+        self.arena_frame.setCalibration(corners)
+        MyLog.l(self.name, "Calibration successfully loaded from file!")
+
+    def detect(self, processes=None, chunk=None):
+        """
+        Detect the markers in all frames in parallel. Returns a (frames, 2, 2) array of marker pixels.
+        """
+        chunk = chunk if chunk != None else self.setup.tracking.offline_chunk
+        processes = processes if processes != None else self.setup.tracking.offline_processes
+        if processes <= 0:
+            processes = cpu_count()
+        if not os.path.isdir(self.source):
+            # smaller chunks of a video, so tracking.offline_frames frames keep all processes busy
+            chunk = max(1, min(chunk, self.setup.tracking.offline_frames // (2 * processes)))
+
+        params = {"offx": self.setup.image.tracking.offx,
+                  "offy": self.setup.image.tracking.offy,
+                  "width": self.setup.image.tracking.width,
+                  "height": self.setup.image.tracking.height,
+                  "blue": self.blue_range,
+                  "green": self.green_range,
+                  "use_lut": self.setup.tracking.use_lut,
+                  "lut_bits": self.setup.tracking.lut_bits}
+
+        MyLog.l(self.name, "Tracking " + self.source + " in chunks of " + str(chunk) + " frames with " + str(processes) + " processes.")
+
+        markers = []
+        # chunks in work, in order, and their number of frames. At most tracking.offline_frames frames
+        # (at least one chunk) are in work, so a long video is not decoded into memory at once
+        pending = deque()
+        pending_frames = 0
+        pool = Pool(processes)
+        try:
+            for frames in self.getChunks(chunk, params):
+                while len(pending) > 0 and pending_frames + len(frames) > self.setup.tracking.offline_frames:
+                    result, count = pending.popleft()
+                    markers.extend(result.get())
+                    pending_frames -= count
+                pending.append((pool.apply_async(detectChunk, ((self.source, frames, params),)), len(frames)))
+                pending_frames += len(frames)
+            while len(pending) > 0:
+                markers.extend(pending.popleft()[0].get())
+        finally:
+            pool.close()
+            pool.join()
+
+        MyLog.l(self.name, "Tracked " + str(len(markers)) + " frames.")
+        return np.array(markers, np.float64).reshape(-1, 2, 2)
+
+    def track(self, markers):
+        """
+        Handle tracking errors in frame order and calculate positions (mm) and angles.
+        Lost markers are predicted by a motion filter per marker for up to tracking.max_prediction frames,
+        then the last measured position is held. Frames before the first measurement of a marker are unknown (NaN).
+        Returns a (frames, 3) array of x, y and angle.
+        """
+        markers = markers.copy()
+        motion = [MotionFilter(), MotionFilter()]
+        errors = 0
+        for i in range(0, len(markers)):
+            blue, green = markers[i]
+            found = [blue[0] >= 0 and blue[1] >= 0, green[0] >= 0 and green[1] >= 0]
+
+            # if the markers are too distant, we don't know which one is wrong
+            if found[0] and found[1] and math.sqrt(((blue - green) ** 2).sum()) > self.setup.arena.markerdist:
+                found = [False, False]
+            if not (found[0] and found[1]):
+                errors += 1
+
+            # correct the motion filters with tracked markers, predict the others. Time is counted in frames
+            for j in range(0, 2):
+                if found[j]:
+                    motion[j].update(i, markers[i][j])
+                else:
+                    predicted = motion[j].coast(i)
+                    markers[i][j] = np.floor(np.array(predicted) + 0.5) if predicted != None else np.nan
+        MyLog.l(self.name, str(errors) + " of " + str(len(markers)) + " frames with tracking errors.")
+
+        # median of marker points (pixels), then all points of known frames into the inertial system of the box at once
+        known = ~np.isnan(markers).any(axis=(1, 2))
+        markers = markers[known]
+        median = np.floor((markers[:, 0] + markers[:, 1]) / 2)
+        points = np.vstack((markers[:, 0], markers[:, 1], median))
+        box = np.floor(self.arena_frame.toArena(points) + 0.5)
+        count = len(markers)
+        blue, green, center = box[:count], box[count:2 * count], box[2 * count:]
+
+        # angle of the robot: direction from green to blue marker, see Tracker.updatePosition()
+        angle = np.floor(np.degrees(np.arctan2(blue[:, 1] - green[:, 1], blue[:, 0] - green[:, 0])) + 0.5)
+
+        poses = np.empty((len(known), 3))
+        poses[:] = np.nan
+        poses[known] = np.column_stack((center, angle))
+        return poses
+
+    def writeTracking(self, poses, fileName):
+        """
+        Write poses to a file with the format of tracking.txt. Unknown poses are written as nan.
+        """
+        path = os.path.dirname(fileName)
+        if path != "" and not os.path.exists(path):
+            os.makedirs(path)
+
+        _file = open(fileName, "w")
+        _file.write("x\ty\tangle\n")
+        for pose in poses:
+            if np.isnan(pose).any():
+                _file.write("nan\tnan\tnan\n")
+            else:
+                _file.write(str(int(pose[0])) + "\t" + str(int(pose[1])) + "\t" + str(pose[2]) + "\n")
+        _file.close()
+        MyLog.l(self.name, "File successfully written: " + fileName)
+
+if __name__ == "__main__":
+    setup = Setup()
+
+    if len(sys.argv) < 2:
+        MyLog.e("OfflineTracker", "Correct usage: python OfflineTracker.py <video file or frame directory> [output file] [calibration file]")
+        sys.exit(1)
+
+    source = sys.argv[1]
+    output = sys.argv[2] if len(sys.argv) > 2 else setup.filesystem.file_dir + "tracking_offline.txt"
+    calibration = sys.argv[3] if len(sys.argv) > 3 else None
+
+    offline_tracker = OfflineTracker(source)
+    offline_tracker.loadCalibration(calibration)
+    poses = offline_tracker.track(offline_tracker.detect())
+    offline_tracker.writeTracking(poses, output)
@@ -1,6 +1,7 @@
 from utils.Freezeable import Freezeable
 from cv2 import cv
 from settings import Setup
+from modules.PoseLog import PoseLog
 from utils import Log as MyLog
 import cv2
 import numpy
@@ -35,11 +36,13 @@ class ASyncTracing(Freezeable, threading.Thread):
         
         self.trace = None
         self._file = None
+        self.pose_log = None
         self.epuck = ePuckControl
         
         self.image_path = self.setup.filesystem.file_dir + self.setup.filesystem.epuck_dir
         self.image_file_name = "trace.png"
         self.txt_file_name = "tracing.txt"
+        self.log_file_name = "tracing.bin"
         
         self.freeze()
         
@@ -84,9 +87,13 @@ class ASyncTracing(Freezeable, threading.Thread):
                     os.makedirs(path)
                     MyLog.l(self.myName, "Directory successfully created: " + path)
             
-                # open file
-                self._file = open(path + self.txt_file_name, "a")
-                MyLog.l(self.myName, "File successfully opened: " + path + self.txt_file_name)
+                # open file (binary pose log or .txt file)
+                if self.setup.other.poselog:
+                    self.pose_log = PoseLog(path + self.log_file_name, append=True)
+                    MyLog.l(self.myName, "File successfully opened: " + path + self.log_file_name)
+                else:
+                    self._file = open(path + self.txt_file_name, "a")
+                    MyLog.l(self.myName, "File successfully opened: " + path + self.txt_file_name)
             except Exception as pokemon:
                 MyLog.e(self.myName, "Exception in prepareFilesystem: " + pokemon.__str__())
 
@@ -120,6 +127,13 @@ class ASyncTracing(Freezeable, threading.Thread):
             os.remove(self.image_path + self.txt_file_name)
         except:
             pass
+        if self.pose_log != None:
+            self.pose_log.close()
+            self.pose_log = None
+        try:
+            os.remove(self.image_path + self.log_file_name)
+        except:
+            pass
             
         self.trace = None
         
@@ -145,6 +159,10 @@ class ASyncTracing(Freezeable, threading.Thread):
             MyLog.l(self.myName, "File successfully written: " + self.image_path + self.image_file_name)
         except Exception as pokemon:
             MyLog.e(self.myName, "Exception in run: " + pokemon.__str__())
+        
+        # write remaining records of the pose log
+        if self.pose_log != None:
+            self.pose_log.close()
                 
         self.active = False
         
@@ -175,7 +193,10 @@ class ASyncTracing(Freezeable, threading.Thread):
                 cv2.imwrite(self.image_path + self.image_file_name, self.trace)
             
             # if option active, also store data in a .txt-file
-            if self.setup.other.storepos:
+            if self.pose_log != None:
+                self.pose_log.append(time.time(), None, current, self.epuck.getOdometry().angle
+                                     , PoseLog.FLAG_CORRECTION if isCorrection[0] else 0)
+            elif self.setup.other.storepos:
                 try:
                     self._file.write(str(current[0]) + "\t" + str(current[1]) + "\t" + str(self.epuck.getOdometry().angle) + "\n")
                 except Exception, pokemon:
@@ -0,0 +1,99 @@
+from utils.Freezeable import Freezeable
+from settings import Setup
+from modules.LensCorrection import LensCorrection
+import cv2
+import numpy
+
+class ArenaFrame(Freezeable):
+    """
+    Coordinate frame service: maps tracking camera pixels to arena millimeters and back.
+    Holds a 3x3 homography calculated from the four calibration markers
+    (top left, bottom left, bottom right, top right) and its inverse.
+    Points are transformed in batches with NumPy, one matrix multiplication per batch.
+    If there is a lens calibration (see LensCorrection) and tracking.undistort is set,
+    pixels are undistorted before the homography is applied.
+    The homography is calculated whenever the markers are set (four points, this is cheap),
+    so it always matches the markers, the arena size (arena.boxwidth/boxheight) and the lens correction.
+    All modules share one instance, see getArenaFrame().
+    """
+    def __init__(self):
+        """
+        Constructor
+        """
+        self.setup = Setup()
+        self.name = "ArenaFrame"
+
+        # calibration markers in pixels (4x2) and homographies pixel -> arena, arena -> pixel
+        self.corners = None
+        self.homography = None
+        self.inverse = None
+
+        # lens distortion of the tracking camera
+        self.lens = LensCorrection()
+        if self.setup.tracking.undistort:
+            self.lens.load()
+
+        self.freeze()
+
+    def setCalibration(self, corners):
+        """
+        Set calibration markers (pixels): top left, bottom left, bottom right, top right.
+        """
+        corners = numpy.array(corners, numpy.float32).reshape(4, 2)
+        if self.corners is not None and numpy.array_equal(corners, self.corners):
+            return
+        self.corners = corners
+
+        # the homography maps undistorted pixels
+        if self.lens.isLoaded():
+            corners = self.lens.undistort(corners).astype(numpy.float32)
+
+        # arena corners in mm, same order as the calibration markers
+        arena = numpy.array([[0, 0],
+                             [0, self.setup.arena.boxheight],
+                             [self.setup.arena.boxwidth, self.setup.arena.boxheight],
+                             [self.setup.arena.boxwidth, 0]], numpy.float32)
+        self.homography = cv2.getPerspectiveTransform(corners, arena).astype(numpy.float64)
+        self.inverse = numpy.linalg.inv(self.homography)
+
+    def isCalibrated(self):
+        """
+        Returns true if calibration markers were set.
+        """
+        return self.homography is not None
+
+    def transform(self, points, matrix):
+        """
+        Private. Apply a homography to N points (N x 2). Returns a N x 2 float array.
+        """
+        points = numpy.asarray(points, numpy.float64).reshape(-1, 2)
+        projected = numpy.dot(points, matrix[:, :2].T) + matrix[:, 2]
+        return projected[:, :2] / projected[:, 2:3]
+
+    def toArena(self, points):
+        """
+        Transform N pixel coordinates (N x 2) into arena coordinates in mm.
+        """
+        if self.lens.isLoaded():
+            points = self.lens.undistort(points)
+        return self.transform(points, self.homography)
+
+    def toPixel(self, points):
+        """
+        Transform N arena coordinates in mm (N x 2) into pixel coordinates.
+        """
+        if self.lens.isLoaded():
+            return self.lens.distort(self.transform(points, self.inverse))
+        return self.transform(points, self.inverse)
+
+# instance shared by all modules
+arena_frame = None
+
+def getArenaFrame():
+    """
+    Returns the ArenaFrame shared by all modules.
+    """
+    global arena_frame
+    if arena_frame == None:
+        arena_frame = ArenaFrame()
+    return arena_frame
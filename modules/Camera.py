@@ -151,6 +151,9 @@ class Camera(Freezeable):
         # grab a frame as NumPy array
         flag, frame = self.cap.read()
         
+        # time the frame was captured
+        timestamp = time()
+        
         # throw an error if there is none
         if frame == None:
             raise Exception("Camera could not grab a frame.")
@@ -183,7 +186,7 @@ class Camera(Freezeable):
                 MyLog.e(self.name, "Exception in grabImage(): Could not write file:" + pokemon.__str__())
         
         # send new picture to observers (e.g.PlaceCellCalculation), so that they can process it in real time
-        self.notify(frame)
+        self.notify(frame, timestamp)
     
     def collectFrames(self, number):
         """
@@ -273,10 +276,11 @@ class Camera(Freezeable):
         except:
             pass
         
-    def notify(self, pic):
+    def notify(self, pic, timestamp=None):
         """
         Notifiy observers that there was a change => There is a new picture available.
+        timestamp is the time the picture was captured.
         """
         for observer in self._observers:
-            observer.update(pic)
+            observer.update(pic, timestamp)
     
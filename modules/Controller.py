@@ -2,6 +2,7 @@ from modules.Camera import Camera
 from modules.Navigation import ePuckControl
 from modules.PlaceCellCalculation import PlaceCellCalculation
 from modules.Tracker import Tracker
+from modules.TrackerProcess import TrackerProcess
 from settings import Setup
 from time import sleep
 from utils.Freezeable import Freezeable
@@ -20,7 +21,10 @@ class Controller(Freezeable):
         self.new_calib    = self.setup.runparams.new_calibration   # to calibrate set new_calibration in settings.py to 1
         self.use_SFA      = self.setup.runparams.enable_SFA        # to use SFA network, set enable_SFA to 1
         # prepare variables
-        self.tracker = Tracker() if self.use_tracking else None
+        self.tracker = None
+        if self.use_tracking:
+            # the tracker process opens the camera itself
+            self.tracker = TrackerProcess() if self.setup.tracking.process else Tracker()
         self.cam     = Camera()  if self.use_cam and not self.new_calib else None
         # freeze
         self.freeze()
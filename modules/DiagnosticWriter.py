@@ -0,0 +1,108 @@
+from utils.Freezeable import Freezeable
+from utils import Log as MyLog
+from settings import Setup
+from collections import deque
+import Queue
+import cv2
+import os
+import threading
+import time
+
+class DiagnosticWriter(Freezeable, threading.Thread):
+    """
+    This class writes diagnostic images (e.g. frames in which a marker was lost) in its own thread,
+    so encoding and disk I/O do not slow down the tracking loop.
+    Each event type is written at most once every tracking.diagnostic_interval seconds,
+    at most tracking.diagnostic_queue images wait to be written (further images are dropped)
+    and only the last tracking.diagnostic_history images of each event type are kept.
+    Images are named <event>_<timestamp>.jpg.
+    """
+
+    def __init__(self, path):
+        """
+        Constructor. path is the directory the images are written to.
+        """
+        threading.Thread.__init__(self)
+        self.daemon = True
+
+        self.setup = Setup()
+        self.name = "DiagnosticWriter"
+
+        self.path = path
+
+        # images waiting to be written: (event, timestamp, image). None stops the thread
+        self.queue = Queue.Queue(self.setup.tracking.diagnostic_queue)
+
+        # time of the last accepted image and file names of the written images of each event type
+        self.last_submit = {}
+        self.history = {}
+
+        # statistics
+        self.written = 0
+        self.limited = 0
+        self.dropped = 0
+
+        self.freeze()
+
+    def submit(self, event, image):
+        """
+        Queue a copy of image for writing. Returns False if it was dropped by the rate limit or a full queue.
+        """
+        now = time.time()
+        if now - self.last_submit.get(event, 0) < self.setup.tracking.diagnostic_interval:
+            self.limited += 1
+            return False
+
+        try:
+            self.queue.put_nowait((event, now, image.copy()))
+        except Queue.Full:
+            self.dropped += 1
+            return False
+
+        self.last_submit[event] = now
+        return True
+
+    def run(self):
+        """
+        Private. Implementation for its own thread.
+        Use start() instead.
+        """
+        while True:
+            item = self.queue.get()
+            if item == None:
+                break
+            self.write(*item)
+
+    def write(self, event, timestamp, image):
+        """
+        Private. Write an image and delete the oldest image of the event type if the history is full.
+        """
+        try:
+            if not os.path.exists(self.path):
+                os.makedirs(self.path)
+                MyLog.l(self.name, "Directory successfully created: " + self.path)
+
+            fileName = event + "_" + time.strftime("%Y%m%d_%H%M%S", time.localtime(timestamp)) + "_%03d.jpg" % int(timestamp % 1 * 1000)
+            cv2.imwrite(self.path + fileName, image)
+            self.written += 1
+
+            history = self.history.setdefault(event, deque())
+            history.append(fileName)
+            while len(history) > self.setup.tracking.diagnostic_history:
+                os.remove(self.path + history.popleft())
+        except Exception as pokemon:
+            MyLog.e(self.name, "Exception in write: " + pokemon.__str__())
+
+    def stop(self):
+        """
+        Write the queued images and stop the thread.
+        """
+        if self.is_alive():
+            self.queue.put(None)
+            self.join()
+
+    def getStats(self):
+        """
+        Returns statistics: written images, images skipped by the rate limit and images dropped by a full queue.
+        """
+        return {"written": self.written, "limited": self.limited, "dropped": self.dropped}
@@ -0,0 +1,108 @@
+from utils.Freezeable import Freezeable
+from utils import Log as MyLog
+from settings import Setup
+from collections import deque
+import threading
+import time
+
+class FrameGrabber(Freezeable, threading.Thread):
+    """
+    This class grabs frames of a cv2.VideoCapture continuously in its own thread,
+    so the driver's buffers never back up while the tracker is processing a frame.
+    The last tracking.capture_buffer frames are kept with the time they were captured.
+    getLatest() always returns the newest frame; frames which were overwritten before
+    anyone asked for them are counted as dropped.
+    """
+
+    def __init__(self, cap):
+        """
+        Constructor. cap is an opened cv2.VideoCapture.
+        """
+        threading.Thread.__init__(self)
+        self.daemon = True
+
+        self.setup = Setup()
+        self.name = "FrameGrabber"
+
+        self.cap = cap
+
+        # ring buffer of (sequence number, capture time, frame)
+        self.buffer = deque(maxlen=self.setup.tracking.capture_buffer)
+        self.condition = threading.Condition()
+
+        # sequence number of the last captured and of the last returned frame
+        self.seq = 0
+        self.last_seq = 0
+
+        # statistics
+        self.dropped = 0
+        self.failed = 0
+
+        self.stopped = False
+
+        self.freeze()
+
+    def run(self):
+        """
+        Private. Implementation for its own thread.
+        Use start() instead.
+        """
+        MyLog.l(self.name, "Starting Capture-Thread")
+        while not self.stopped:
+            # grab() returns as soon as the frame is available, so take the time right after it
+            if not self.cap.grab():
+                self.failed += 1
+                time.sleep(0.01)
+                continue
+            timestamp = time.time()
+            flag, frame = self.cap.retrieve()
+            if not flag or frame is None:
+                self.failed += 1
+                continue
+
+            self.condition.acquire()
+            self.seq += 1
+            self.buffer.append((self.seq, timestamp, frame))
+            self.condition.notifyAll()
+            self.condition.release()
+        MyLog.l(self.name, "Exiting Capture-Thread")
+
+    def stop(self):
+        """
+        Stops capturing.
+        """
+        self.condition.acquire()
+        self.stopped = True
+        self.condition.notifyAll()
+        self.condition.release()
+
+    def getLatest(self, timeout=1.0):
+        """
+        Returns the newest frame and the time it was captured.
+        Waits until a frame is available which was not returned before.
+        Returns (None, None) after timeout seconds.
+        """
+        self.condition.acquire()
+        try:
+            end = time.time() + timeout
+            while (len(self.buffer) == 0 or self.buffer[-1][0] == self.last_seq) and not self.stopped:
+                remaining = end - time.time()
+                if remaining <= 0:
+                    return None, None
+                self.condition.wait(remaining)
+            if len(self.buffer) == 0 or self.buffer[-1][0] == self.last_seq:
+                return None, None
+
+            seq, timestamp, frame = self.buffer[-1]
+            if self.last_seq > 0:
+                self.dropped += seq - self.last_seq - 1
+            self.last_seq = seq
+            return frame, timestamp
+        finally:
+            self.condition.release()
+
+    def getStats(self):
+        """
+        Returns capture statistics: captured, dropped and failed frames.
+        """
+        return {"captured": self.seq, "dropped": self.dropped, "failed": self.failed}
@@ -0,0 +1,103 @@
+from utils.Freezeable import Freezeable
+from settings import Setup
+from cv2 import cv
+import cv2
+import numpy
+
+class FramePipeline(Freezeable):
+    """
+    This class runs the processing steps of a tracking frame (crop, blur, HSV conversion,
+    thresholding, colour labeling, downsampling) into preallocated work buffers, so no image
+    memory is allocated per frame. Each step writes into its own buffer; a buffer holds a
+    contiguous image of any size up to the one it was allocated for, so windows (regions of
+    interest) of the frame reuse the same memory.
+    Returned images are views of the buffers: they are overwritten by the next call of the same step.
+    Examples:
+    -pipeline = FramePipeline()
+    -frame = pipeline.crop(frame)
+    -hsv = pipeline.toHsv(pipeline.blur(frame))
+    -mask = pipeline.threshold(hsv, (90, 100, 90), (110, 255, 255))
+    """
+
+    def __init__(self, width=None, height=None):
+        """
+        Constructor. Allocates the buffers for images of width x height, the tracking image (image.tracking) by default.
+        """
+        self.setup = Setup()
+        self.name = "FramePipeline"
+
+        self.width = width if width != None else self.setup.image.tracking.width
+        self.height = height if height != None else self.setup.image.tracking.height
+
+        # flat work buffers by name
+        self.buffers = {}
+        # number of buffer allocations, only grows if an image is larger than the tracking image
+        self.allocations = 0
+
+        self.freeze()
+
+        shape = (self.height, self.width)
+        for name in ("blurred", "hsv", "quantized"):
+            self.getBuffer(name, shape + (3,), numpy.uint8)
+        self.getBuffer("mask", shape, numpy.uint8)
+        self.getBuffer("labels", shape, numpy.uint8)
+        self.getBuffer("index", shape, numpy.int32)
+        for i in range(0, self.setup.tracking.pyramid_levels):
+            shape = ((shape[0] + 1) / 2, (shape[1] + 1) / 2)
+            self.getBuffer("pyramid" + str(i), shape + (3,), numpy.uint8)
+
+    def getBuffer(self, name, shape, dtype):
+        """
+        Private. Returns a contiguous view of shape of the buffer name, (re)allocates it if it is too small.
+        """
+        size = int(numpy.prod(shape))
+        buf = self.buffers.get(name)
+        if buf is None or buf.size < size or buf.dtype != dtype:
+            buf = numpy.empty(size, dtype)
+            self.buffers[name] = buf
+            self.allocations += 1
+        return buf[:size].reshape(shape)
+
+    def crop(self, frame):
+        """
+        Returns the tracking image (image.tracking) of a camera frame. A view, nothing is copied.
+        """
+        tracking = self.setup.image.tracking
+        return frame[tracking.offy:tracking.offy + tracking.height, tracking.offx:tracking.offx + tracking.width]
+
+    def blur(self, img, sigma=2):
+        """
+        Returns img blurred with a gaussian filter to reduce noise.
+        """
+        return cv2.GaussianBlur(img, (0, 0), sigma, dst=self.getBuffer("blurred", img.shape, numpy.uint8))
+
+    def toHsv(self, img):
+        """
+        Returns img converted to HSV. A thresholding by hue catches graduated colors better than a RGB/BGR thresholding.
+        """
+        return cv2.cvtColor(img, cv.CV_BGR2HSV, dst=self.getBuffer("hsv", img.shape, numpy.uint8))
+
+    def threshold(self, img, low, high):
+        """
+        Returns the mask of the pixels of img within [low, high].
+        """
+        return cv2.inRange(img, low, high, dst=self.getBuffer("mask", img.shape[:2], numpy.uint8))
+
+    def classify(self, classifier, img):
+        """
+        Returns the label image of img (see MarkerClassifier.classify()).
+        """
+        shape = img.shape[:2]
+        return classifier.classify(img
+                                   , self.getBuffer("labels", shape, numpy.uint8)
+                                   , self.getBuffer("quantized", img.shape, numpy.uint8)
+                                   , self.getBuffer("index", shape, numpy.int32))
+
+    def pyrDown(self, img, levels):
+        """
+        Returns img downsampled levels times by 2 (smoothed before each step).
+        """
+        for i in range(0, levels):
+            shape = ((img.shape[0] + 1) / 2, (img.shape[1] + 1) / 2) + img.shape[2:]
+            img = cv2.pyrDown(img, dst=self.getBuffer("pyramid" + str(i), shape, numpy.uint8))
+        return img
@@ -0,0 +1,80 @@
+from utils.Freezeable import Freezeable
+import time
+
+class HeadingController(Freezeable):
+    """
+    PID controller that holds the robots' heading while it drives straight.
+    Feed the heading error (in degree) into update(). It returns a wheel speed trim,
+    which has to be added to the left wheel and subtracted from the right wheel.
+    Call reset() before every new straight segment.
+    """
+    def __init__(self, kp, ki, kd, trim_limit):
+        """
+        Constructor
+        """
+        # gains
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+
+        # maximum absolute wheel speed trim
+        self.trim_limit = trim_limit
+
+        # residual heading error of the last update (degree)
+        self.error = 0
+
+        # last calculated trim
+        self.trim = 0
+
+        # integrated error and time of the last update
+        self.integral = 0
+        self.last_time = None
+
+        self.freeze()
+
+    def reset(self):
+        """
+        Forget integrated error and the last update.
+        """
+        self.error = 0
+        self.trim = 0
+        self.integral = 0
+        self.last_time = None
+
+    def update(self, error):
+        """
+        Calculate a new wheel speed trim for the given heading error (degree).
+        """
+        now = time.time()
+
+        derivative = 0
+        if self.last_time != None:
+            dt = now - self.last_time
+            if dt > 0:
+                self.integral += error * dt
+                derivative = (error - self.error) / dt
+
+                # anti windup: the integral part alone must not exceed the trim limit
+                if self.ki != 0:
+                    integral_limit = float(self.trim_limit) / abs(self.ki)
+                    self.integral = max(-integral_limit, min(integral_limit, self.integral))
+
+        self.error = error
+        self.last_time = now
+
+        trim = self.kp * error + self.ki * self.integral + self.kd * derivative
+        self.trim = max(-self.trim_limit, min(self.trim_limit, trim))
+
+        return self.trim
+
+    def getError(self):
+        """
+        Returns the residual heading error (degree) of the last update.
+        """
+        return self.error
+
+    def getTrim(self):
+        """
+        Returns the last calculated wheel speed trim.
+        """
+        return self.trim
@@ -0,0 +1,146 @@
+from utils.Freezeable import Freezeable
+from utils import Log as MyLog
+from settings import Setup
+import cv2
+import numpy
+import os
+
+class LensCorrection(Freezeable):
+    """
+    Lens distortion of the tracking camera.
+    calibrate() estimates the intrinsics from checkerboard images (see tools/calibrateLens.py) and
+    saves them with an undistortion map to calibration/lens.npz. The map holds the undistorted
+    position of every camera pixel, so undistorting a marker centroid is a bilinear lookup instead
+    of remapping the whole frame.
+    Points are given in coordinates of the cropped tracking image (image.tracking).
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        self.setup = Setup()
+        self.name = "LensCorrection"
+
+        self.path = self.setup.filesystem.file_dir + self.setup.filesystem.cam_dir + "calibration/"
+        self.file_name = "lens.npz"
+
+        # intrinsics and undistorted pixel positions (height x width x 2) of the whole camera frame
+        self.camera_matrix = None
+        self.dist_coeffs = None
+        self.map = None
+
+        # offset of the cropped tracking image in the camera frame
+        self.offset = numpy.array([self.setup.image.tracking.offx, self.setup.image.tracking.offy], numpy.float64)
+
+        self.freeze()
+
+    def calibrate(self, imageDir, pattern=None):
+        """
+        Estimate intrinsics from checkerboard images in imageDir. pattern is the number of
+        inner corners (columns, rows), tracking.checkerboard by default.
+        Saves intrinsics and undistortion map. Returns the RMS reprojection error in pixels.
+        """
+        pattern = tuple(pattern if pattern != None else self.setup.tracking.checkerboard)
+
+        # corners in checkerboard coordinates (one square = 1)
+        board = numpy.zeros((pattern[0] * pattern[1], 3), numpy.float32)
+        board[:, :2] = numpy.mgrid[0:pattern[0], 0:pattern[1]].T.reshape(-1, 2)
+
+        object_points = []
+        image_points = []
+        size = None
+        for fileName in sorted(os.listdir(imageDir)):
+            img = cv2.imread(os.path.join(imageDir, fileName), 0)
+            if img is None:
+                continue
+            size = (img.shape[1], img.shape[0])
+            found, corners = cv2.findChessboardCorners(img, pattern)
+            if not found:
+                MyLog.l(self.name, "No checkerboard in " + fileName)
+                continue
+            cv2.cornerSubPix(img, corners, (11, 11), (-1, -1), (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.01))
+            object_points.append(board)
+            image_points.append(corners)
+
+        if len(image_points) < 3:
+            raise Exception("Found a checkerboard in " + str(len(image_points)) + " images only. At least 3 are needed.")
+
+        rms, self.camera_matrix, self.dist_coeffs, rvecs, tvecs = cv2.calibrateCamera(object_points, image_points, size, None, None)
+        MyLog.l(self.name, "Calibrated with " + str(len(image_points)) + " images. RMS reprojection error: %.3f px" % rms)
+
+        self.buildMap(size)
+        self.save()
+        return rms
+
+    def buildMap(self, size):
+        """
+        Private. Undistort the position of every pixel of a camera frame of size (width, height).
+        """
+        grid = numpy.mgrid[0:size[1], 0:size[0]].astype(numpy.float32)
+        pixels = numpy.dstack((grid[1], grid[0])).reshape(-1, 1, 2)
+        undistorted = cv2.undistortPoints(pixels, self.camera_matrix, self.dist_coeffs, P=self.camera_matrix)
+        self.map = undistorted.reshape(size[1], size[0], 2)
+
+    def save(self):
+        """
+        Private. Save intrinsics and undistortion map.
+        """
+        try:
+            if not os.path.exists(self.path):
+                os.makedirs(self.path)
+            numpy.savez(self.path + self.file_name, camera_matrix=self.camera_matrix, dist_coeffs=self.dist_coeffs, map=self.map)
+            MyLog.l(self.name, "File successfully written: " + self.path + self.file_name)
+        except Exception as pokemon:
+            MyLog.e(self.name, "Exception in save: " + pokemon.__str__())
+
+    def load(self):
+        """
+        Load intrinsics and undistortion map. Returns True on success.
+        """
+        if not os.path.exists(self.path + self.file_name):
+            return False
+        try:
+            data = numpy.load(self.path + self.file_name)
+            self.camera_matrix = data["camera_matrix"]
+            self.dist_coeffs = data["dist_coeffs"]
+            self.map = data["map"]
+            MyLog.l(self.name, "Lens calibration successfully loaded from file!")
+            return True
+        except Exception as pokemon:
+            MyLog.e(self.name, "Exception in load: " + pokemon.__str__())
+            return False
+
+    def isLoaded(self):
+        """
+        Returns True if there is an undistortion map.
+        """
+        return self.map is not None
+
+    def undistort(self, points):
+        """
+        Undistort N points (N x 2) of the tracking image. Bilinear lookup in the undistortion map.
+        """
+        points = numpy.asarray(points, numpy.float64).reshape(-1, 2) + self.offset
+        height, width = self.map.shape[:2]
+        x = numpy.clip(points[:, 0], 0, width - 1.001)
+        y = numpy.clip(points[:, 1], 0, height - 1.001)
+        x0 = x.astype(int)
+        y0 = y.astype(int)
+        f_x = (x - x0)[:, numpy.newaxis]
+        f_y = (y - y0)[:, numpy.newaxis]
+
+        top = self.map[y0, x0] * (1 - f_x) + self.map[y0, x0 + 1] * f_x
+        bottom = self.map[y0 + 1, x0] * (1 - f_x) + self.map[y0 + 1, x0 + 1] * f_x
+        return top * (1 - f_y) + bottom * f_y - self.offset
+
+    def distort(self, points):
+        """
+        Distort N undistorted points (N x 2) of the tracking image, the inverse of undistort().
+        """
+        points = numpy.asarray(points, numpy.float64).reshape(-1, 2) + self.offset
+
+        # normalized camera coordinates, projected with the distortion model
+        normalized = numpy.dot(numpy.linalg.inv(self.camera_matrix), numpy.vstack((points.T, numpy.ones(len(points))))).T
+        distorted, jacobian = cv2.projectPoints(normalized.reshape(-1, 1, 3), numpy.zeros(3), numpy.zeros(3), self.camera_matrix, self.dist_coeffs)
+        return distorted.reshape(-1, 2) - self.offset
@@ -0,0 +1,130 @@
+from utils.Freezeable import Freezeable
+from settings import Setup
+from cv2 import cv
+import cv2
+import numpy
+
+class MarkerClassifier(Freezeable):
+    """
+    This class labels every pixel of a BGR image with the marker colour it belongs to, in one pass.
+    Marker colours are given as HSV ranges (like cv2.inRange()). They are compiled into a lookup table
+    over quantized BGR values (tracking.lut_bits per channel), so no HSV conversion and
+    no thresholding per colour is needed while tracking.
+    Label 0 is background, label i is the i-th marker. Any number of markers (up to 255) is supported.
+    Examples:
+    -classifier = MarkerClassifier([("blue", (90, 100, 90), (110, 255, 255)), ("green", (40, 140, 90), (55, 255, 255))])
+    -centroids = classifier.getCentroids(classifier.classify(img))
+    """
+    # lookup tables which were built in this process, see getLut()
+    luts = {}
+
+    def __init__(self, markers, bits=None):
+        """
+        Constructor. markers is a list of (name, HSV low, HSV high).
+        """
+        self.setup = Setup()
+        self.name = "MarkerClassifier"
+
+        self.markers = [(name, tuple(low), tuple(high)) for (name, low, high) in markers]
+        self.names = [marker[0] for marker in self.markers]
+
+        # quantization of each BGR channel
+        self.bits = bits if bits != None else self.setup.tracking.lut_bits
+        self.shift = 8 - self.bits
+
+        # label of each quantized BGR value
+        self.lut = self.getLut()
+
+        self.freeze()
+
+    def getLut(self):
+        """
+        Private. Returns the lookup table of the markers, builds it if needed.
+        """
+        key = (tuple(self.markers), self.bits)
+        if not key in MarkerClassifier.luts:
+            MarkerClassifier.luts[key] = self.buildLut()
+        return MarkerClassifier.luts[key]
+
+    def buildLut(self):
+        """
+        Private. Convert the center of each quantized BGR cell to HSV and label it with the first matching marker.
+        """
+        levels = 1 << self.bits
+        centers = (numpy.arange(levels) << self.shift) + ((1 << self.shift) >> 1)
+        b, g, r = numpy.meshgrid(centers, centers, centers, indexing="ij")
+        bgr = numpy.dstack((b.ravel(), g.ravel(), r.ravel())).astype(numpy.uint8)
+        hsv = cv2.cvtColor(bgr, cv.CV_BGR2HSV).reshape(-1, 3)
+
+        lut = numpy.zeros(levels ** 3, numpy.uint8)
+        for label, (name, low, high) in enumerate(self.markers, 1):
+            match = numpy.all(hsv >= low, axis=1) & numpy.all(hsv <= high, axis=1) & (lut == 0)
+            lut[match] = label
+        return lut
+
+    def classify(self, img, out=None, quantized=None, index=None):
+        """
+        Returns the label image (uint8) of a BGR image.
+        out, quantized (like img) and index (int32, like out) are optional work buffers (see FramePipeline).
+        """
+        q = numpy.right_shift(img, self.shift, out=quantized)
+        if index is None:
+            index = q[:, :, 0].astype(numpy.int32)
+        else:
+            index[:] = q[:, :, 0]
+        index <<= self.bits
+        index |= q[:, :, 1]
+        index <<= self.bits
+        index |= q[:, :, 2]
+        return self.lut.take(index, out=out)
+
+    def getCentroids(self, labels, offset=(0, 0)):
+        """
+        Returns {name: [x, y]} with the centroid of each marker in a label image (or a region of it,
+        offset is added), computed from all labeled pixels at once. Markers which were not found are None.
+        """
+        length = len(self.markers) + 1
+        counts = numpy.zeros(length)
+        sum_x = sum_y = counts
+
+        # coordinates of all labeled pixels
+        points = cv2.findNonZero(labels) if labels.size > 0 else None
+        if points is not None:
+            points = points.reshape(-1, 2)
+            values = labels[points[:, 1], points[:, 0]]
+            counts = numpy.bincount(values, minlength=length)
+            sum_x = numpy.bincount(values, weights=points[:, 0], minlength=length)
+            sum_y = numpy.bincount(values, weights=points[:, 1], minlength=length)
+
+        centroids = {}
+        for label, name in enumerate(self.names, 1):
+            if counts[label] > 0:
+                centroids[name] = [int(sum_x[label] / counts[label]) + offset[0],
+                                   int(sum_y[label] / counts[label]) + offset[1]]
+            else:
+                centroids[name] = None
+        return centroids
+
+    def getBlobs(self, labels, min_area=1, offset=(0, 0)):
+        """
+        Returns {name: [(x, y, area), ...]} with the connected components (blobs) of each marker
+        in a label image, so several objects of the same colour are kept apart.
+        Blobs smaller than min_area pixels are ignored.
+        """
+        blobs = {}
+        for label, name in enumerate(self.names, 1):
+            blobs[name] = []
+            mask = numpy.uint8(labels == label)
+            # findContours modifies its input, mask is a temporary image anyway
+            contours, hierarchy = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+            for contour in contours:
+                mmts = cv2.moments(contour)
+                area = max(mmts["m00"], len(contour))
+                if area < min_area:
+                    continue
+                if mmts["m00"] > 0:
+                    x, y = mmts["m10"] / mmts["m00"], mmts["m01"] / mmts["m00"]
+                else:
+                    x, y = contour[:, 0, 0].mean(), contour[:, 0, 1].mean()
+                blobs[name].append((x + offset[0], y + offset[1], area))
+        return blobs
@@ -0,0 +1,108 @@
+from utils.Freezeable import Freezeable
+from settings import Setup
+
+class MotionFilter(Freezeable):
+    """
+    Alpha-beta filter (constant velocity) of one marker position in pixels.
+    update() corrects the filter with a measured position, coast() predicts the position of a frame
+    without one, e.g. while the marker is occluded. After more than tracking.max_prediction frames
+    without a measurement the filter stops predicting and holds the last measured position.
+    Examples:
+    -motion = MotionFilter()
+    -motion.update(t, [120, 80])
+    -position = motion.coast(t + 0.03)
+    """
+
+    def __init__(self, alpha=None, beta=None):
+        """
+        Constructor. alpha, beta: gains of position and velocity, tracking.motion_alpha/motion_beta by default.
+        """
+        self.setup = Setup()
+        self.name = "MotionFilter"
+
+        self.alpha = alpha if alpha != None else self.setup.tracking.motion_alpha
+        self.beta = beta if beta != None else self.setup.tracking.motion_beta
+
+        # state after the last measurement: position (pixels), velocity (pixels per second) and time
+        self.position = None
+        self.velocity = [0.0, 0.0]
+        self.time = None
+
+        # number of measurements and of frames without a measurement since the last one
+        self.count = 0
+        self.misses = 0
+
+        self.freeze()
+
+    def reset(self):
+        """
+        Forget the state.
+        """
+        self.position = None
+        self.velocity = [0.0, 0.0]
+        self.time = None
+        self.count = 0
+        self.misses = 0
+
+    def predict(self, t):
+        """
+        Returns the predicted position [x, y] at time t, None if there was no measurement yet.
+        """
+        if self.position == None:
+            return None
+        dt = t - self.time if self.isPredicting() else 0
+        return [self.position[0] + self.velocity[0] * dt, self.position[1] + self.velocity[1] * dt]
+
+    def update(self, t, measured):
+        """
+        Correct the filter with a measured position at time t.
+        """
+        if not self.isPredicting():
+            # first measurement or after a long dropout: start again
+            self.reset()
+            self.position = [float(measured[0]), float(measured[1])]
+        else:
+            dt = t - self.time
+            if dt <= 0:
+                self.position = [float(measured[0]), float(measured[1])]
+            elif self.count == 1:
+                # second measurement: start with the measured velocity
+                self.velocity = [(measured[0] - self.position[0]) / dt, (measured[1] - self.position[1]) / dt]
+                self.position = [float(measured[0]), float(measured[1])]
+            else:
+                predicted = self.predict(t)
+                residual = [measured[0] - predicted[0], measured[1] - predicted[1]]
+                self.position = [predicted[0] + self.alpha * residual[0], predicted[1] + self.alpha * residual[1]]
+                self.velocity = [self.velocity[0] + self.beta / dt * residual[0], self.velocity[1] + self.beta / dt * residual[1]]
+        self.time = t
+        self.count += 1
+        self.misses = 0
+
+    def coast(self, t):
+        """
+        Count a frame at time t without a measurement. Returns the predicted position, the last
+        measured position once the filter stopped predicting and None if there was no measurement yet.
+        The state is kept, so the next measurement corrects the prediction over the whole dropout.
+        """
+        if self.position == None:
+            return None
+        self.misses += 1
+        return self.predict(t)
+
+    def isPredicting(self):
+        """
+        Returns True while the filter predicts positions: tracked, or lost for at most tracking.max_prediction frames.
+        """
+        return self.position != None and self.misses <= self.setup.tracking.max_prediction
+
+    def getMisses(self):
+        """
+        Returns the number of frames since the last measurement.
+        """
+        return self.misses
+
+    def getVelocity(self):
+        """
+        Returns the velocity [x, y] in pixels per second.
+        """
+        return list(self.velocity)
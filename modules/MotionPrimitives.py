@@ -0,0 +1,157 @@
+from utils.Freezeable import Freezeable
+from utils import Log as MyLog
+from settings import Setup
+from time import sleep
+from numpy import sign
+import numpy
+
+class MotionPrimitives(Freezeable):
+    """
+    Motion primitives with encoder targets that are calculated up front.
+    The motor encoders are set to a known value with set_motor_position() at the start
+    of each primitive, so the target is a fixed encoder value and completion can be
+    monitored at a low poll rate (the wheel speed tells how long the robot needs to get there).
+    Examples:
+    -rotateBy(90)
+    -driveDistance(250)
+    -getOvershootStats()
+    """
+    def __init__(self, ePuckControl):
+        """
+        Constructor
+        """
+        self.setup = Setup()
+        self.name = "MotionPrimitives"
+        self.epuck = ePuckControl
+
+        # overshoot of each executed primitive, in ticks. "rotate" and "drive"
+        self.overshoot = {"rotate": [], "drive": []}
+
+        self.freeze()
+
+    def rotateBy(self, degree):
+        """
+        Turn robot on the spot by "degree" degree.
+        """
+        ticks = abs(degree) * self.epuck.FULL_TURN / 360.0
+        speed = self.setup.navigation.rotate_speed
+
+        # positive angles turn with the left wheel going forwards (see ePuckControl.turn)
+        self.epuck.is_turning = True
+        self.execute("rotate", ticks, sign(degree) * speed, -sign(degree) * speed)
+        self.epuck.is_turning = False
+
+    def driveDistance(self, distance):
+        """
+        Drive "distance" mm straight ahead (backwards if distance is negative).
+        """
+        ticks = abs(distance) * self.epuck.TICKS_PER_M / 1000.0
+        speed = self.setup.navigation.drive_speed
+
+        self.execute("drive", ticks, sign(distance) * speed, sign(distance) * speed)
+
+    def execute(self, primitive, ticks, speed_l, speed_r):
+        """
+        Private. Let both wheels run "ticks" encoder steps with the given speeds.
+        Long primitives are split into chunks, so that the encoders never overflow.
+        """
+        # encoders start at MOTOR_HACK, keep the target away from the overflow hack
+        max_chunk = self.epuck.MOTOR_HACK - 2 * self.epuck.ENCODER_HACK
+
+        overshoot = 0
+        remaining = ticks
+        while remaining > 0 and not self.epuck.stopped:
+            chunk = min(remaining, max_chunk)
+            # a chunk that overshot shortens the next one
+            overshoot = self.executeChunk(chunk - overshoot, speed_l, speed_r)
+            remaining -= chunk
+
+        self.overshoot[primitive].append(overshoot)
+        MyLog.d(self.name, primitive + "(" + str(int(ticks)) + " ticks): overshoot " + str(int(overshoot)) + " ticks")
+
+    def executeChunk(self, ticks, speed_l, speed_r):
+        """
+        Private. Reset encoders, run towards the encoder target and stop.
+        Returns the overshoot in ticks (negative if the robot stopped short).
+        """
+        if ticks <= 0:
+            return -ticks
+
+        start = self.epuck.MOTOR_HACK
+
+        # set encoders to a known value. Keep odometry consistent with the reset
+        try:
+            self.epuck.set_motor_position(start, start)
+            self.epuck.step()
+        except Exception, pokemon:
+            MyLog.e(self.name, "Exception in executeChunk(): " + pokemon.__str__())
+        self.epuck.motor_pos_old = [start, start]
+
+        speed = max(abs(speed_l), abs(speed_r))
+        slow_speed = self.setup.navigation.slow_speed
+        slow_ticks = self.setup.navigation.slow_ticks
+        slow = False
+
+        try:
+            self.epuck.set_motors_speed(speed_l, speed_r)
+        except Exception, pokemon:
+            MyLog.e(self.name, "Exception in executeChunk(): " + pokemon.__str__())
+
+        progress = 0
+        while not self.epuck.stopped:
+            try:
+                self.epuck.updatePosition()
+            except Exception, pokemon:
+                MyLog.e(self.name, "Exception in executeChunk(): " + pokemon.__str__())
+
+            progress = self.getProgress(start)
+            remaining = ticks - progress
+            if remaining <= 0:
+                break
+
+            # slow down shortly before the target to reduce overshoot
+            if remaining < slow_ticks and not slow:
+                try:
+                    self.epuck.set_motors_speed(sign(speed_l) * slow_speed, sign(speed_r) * slow_speed)
+                except Exception, pokemon:
+                    MyLog.e(self.name, "Exception in executeChunk(): " + pokemon.__str__())
+                slow = True
+
+            # wheel speed is given in steps per second: sleep half the time
+            # the robot needs to reach the next phase (slow-down zone or target)
+            if slow:
+                eta = float(remaining) / slow_speed
+            else:
+                eta = float(remaining - slow_ticks) / speed
+            sleep(max(self.setup.navigation.poll_min, min(self.setup.navigation.poll_max, eta * 0.5)))
+
+        try:
+            self.epuck.zeroWheelspeed()
+        except Exception, pokemon:
+            MyLog.e(self.name, "Exception in executeChunk(): " + pokemon.__str__())
+
+        return self.getProgress(start) - ticks
+
+    def getProgress(self, start):
+        """
+        Private. Average absolute encoder steps of both wheels since start.
+        """
+        return (abs(self.epuck.motor_pos[0] - start) + abs(self.epuck.motor_pos[1] - start)) * 0.5
+
+    def getOvershootStats(self):
+        """
+        Returns overshoot statistics per primitive:
+        {primitive: (count, mean, standard deviation, maximum absolute overshoot)}.
+        Rotations are given in degree, drives in mm.
+        """
+        scale = {"rotate": 360.0 / self.epuck.FULL_TURN,
+                 "drive": 1000.0 / self.epuck.TICKS_PER_M}
+
+        stats = {}
+        for primitive in self.overshoot:
+            values = numpy.array(self.overshoot[primitive], numpy.float64) * scale[primitive]
+            if len(values) == 0:
+                stats[primitive] = (0, 0.0, 0.0, 0.0)
+            else:
+                stats[primitive] = (len(values), values.mean(), values.std(), numpy.abs(values).max())
+        return stats
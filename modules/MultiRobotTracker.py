@@ -0,0 +1,150 @@
+from utils.Freezeable import Freezeable
+from utils import Log as MyLog
+from settings import Setup
+from modules.dataType import Odometry
+from modules.ArenaFrame import getArenaFrame
+from modules.MarkerClassifier import MarkerClassifier
+from modules.FramePipeline import FramePipeline
+import numpy
+import math
+
+class MultiRobotTracker(Freezeable):
+    """
+    This class tracks several robots in one frame pass.
+    Each robot (tracking.robots: {robot id: (front HSV range, back HSV range)}) carries a front and
+    a back marker. Robots may share their colours, but a pair must not be the reverse of another pair.
+    Robots with the same colours get their ids in the first frame in which they are found.
+    All marker colours are labeled in one pass (see MarkerClassifier), each colour is split
+    into connected components and front/back blobs closer than arena.markerdist are paired.
+    Pairs are assigned to robots by the distance to each robots' predicted position (nearest first),
+    so robots with the same colours keep their ids across frames.
+    Examples:
+    -tracker.update(frame, timestamp)
+    -odometry = tracker.getOdometry("epuck_2")
+    """
+
+    def __init__(self, robots=None):
+        """
+        Constructor. robots: {robot id: ((front low, front high), (back low, back high))}, tracking.robots by default.
+        """
+        self.setup = Setup()
+        self.name = "MultiRobotTracker"
+
+        self.robots = robots if robots != None else self.setup.tracking.robots
+        self.ids = sorted(self.robots.keys())
+
+        # one classifier label per distinct colour
+        self.colours = []
+        self.robot_colours = {}
+        for robot_id in self.ids:
+            names = []
+            for (low, high) in self.robots[robot_id]:
+                colour = (tuple(low), tuple(high))
+                if not colour in self.colours:
+                    self.colours.append(colour)
+                names.append(str(self.colours.index(colour)))
+            self.robot_colours[robot_id] = names
+        self.classifier = MarkerClassifier([(str(i), low, high) for i, (low, high) in enumerate(self.colours)])
+        self.pipeline = FramePipeline()
+
+        self.arena_frame = getArenaFrame()
+
+        # pixel positions of front and back marker: current and previous frame. None if unknown
+        self.markers = dict((robot_id, None) for robot_id in self.ids)
+        self.previous = dict((robot_id, None) for robot_id in self.ids)
+
+        # odometry of each robot and whether the robot was found in the last frame
+        self.odometry = dict((robot_id, Odometry()) for robot_id in self.ids)
+        self.found = dict((robot_id, False) for robot_id in self.ids)
+
+        self.freeze()
+
+    def predict(self, robot_id):
+        """
+        Private. Predicted pixel position of the robots' marker median, None if the robot was never found.
+        """
+        if self.markers[robot_id] == None:
+            return None
+        current = numpy.mean(self.markers[robot_id], axis=0)
+        if self.previous[robot_id] == None:
+            return current
+        return current + (current - numpy.mean(self.previous[robot_id], axis=0))
+
+    def update(self, frame, timestamp=0):
+        """
+        Track all robots in a (cropped) BGR frame.
+        """
+        img = self.pipeline.blur(frame)
+        blobs = self.classifier.getBlobs(self.pipeline.classify(self.classifier, img), self.setup.tracking.min_blob_area)
+
+        # all front/back pairs which could be a robot: (cost, robot id, front blob, back blob)
+        candidates = []
+        for robot_id in self.ids:
+            front_name, back_name = self.robot_colours[robot_id]
+            prediction = self.predict(robot_id)
+            for i, front in enumerate(blobs[front_name]):
+                for j, back in enumerate(blobs[back_name]):
+                    if math.hypot(front[0] - back[0], front[1] - back[1]) > self.setup.arena.markerdist:
+                        continue
+                    if prediction is None:
+                        # robots which were never found take the pairs nobody else is close to
+                        cost = float("inf")
+                    else:
+                        cost = math.hypot((front[0] + back[0]) / 2.0 - prediction[0], (front[1] + back[1]) / 2.0 - prediction[1])
+                    candidates.append((cost, robot_id, (front_name, i), (back_name, j)))
+
+        # nearest first, each robot and each blob at most once
+        candidates.sort(key=lambda c: c[0])
+        used = set()
+        found = {}
+        for (cost, robot_id, front, back) in candidates:
+            if robot_id in found or front in used or back in used:
+                continue
+            used.add(front)
+            used.add(back)
+            found[robot_id] = [list(blobs[front[0]][front[1]][:2]), list(blobs[back[0]][back[1]][:2])]
+
+        # transform all markers at once
+        ids = [robot_id for robot_id in self.ids if robot_id in found]
+        if len(ids) > 0:
+            box = self.arena_frame.toArena([p for robot_id in ids for p in found[robot_id]])
+        for k, robot_id in enumerate(ids):
+            self.previous[robot_id] = self.markers[robot_id]
+            self.markers[robot_id] = found[robot_id]
+            front, back = box[2 * k], box[2 * k + 1]
+            odometry = self.odometry[robot_id]
+            odometry.location = [int(math.floor((front[0] + back[0]) / 2.0 + 0.5)), int(math.floor((front[1] + back[1]) / 2.0 + 0.5))]
+            odometry.angle = math.floor(math.degrees(math.atan2(front[1] - back[1], front[0] - back[0])) + 0.5)
+            odometry.timestamp = timestamp
+
+        for robot_id in self.ids:
+            if self.found[robot_id] and not robot_id in found:
+                MyLog.e(self.name, "Could not track robot " + str(robot_id) + ".")
+            self.found[robot_id] = robot_id in found
+
+    def getMarkers(self, robot_id):
+        """
+        Returns pixel positions [[front x, front y], [back x, back y]] of a robot in the last frame,
+        markers of a robot which was not found are at [-1, -1].
+        """
+        if not self.found[robot_id]:
+            return [[-1, -1], [-1, -1]]
+        return [[int(p[0]), int(p[1])] for p in self.markers[robot_id]]
+
+    def getOdometry(self, robot_id):
+        """
+        Returns the odometry of a robot (last known pose if it was not found in the last frame).
+        """
+        return self.odometry[robot_id]
+
+    def isFound(self, robot_id):
+        """
+        Returns True if the robot was found in the last frame.
+        """
+        return self.found[robot_id]
+
+    def getIds(self):
+        """
+        Returns the ids of all tracked robots.
+        """
+        return list(self.ids)
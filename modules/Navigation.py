@@ -9,7 +9,13 @@ from modules.dataType import Odometry
 from utils import Log as MyLog
 from ASyncTracing import ASyncTracing
 from time import sleep
+import time
 from modules.randomVehicle import randomVehicle
+from modules.HeadingController import HeadingController
+from modules.MotionPrimitives import MotionPrimitives
+from modules.VisitationMap import VisitationMap
+from modules.NavigationTelemetry import NavigationTelemetry
+from modules.WaypointSource import FileWaypointSource
  
 class ePuckControl(ePuck, Freezeable):
     """
@@ -53,6 +59,17 @@ class ePuckControl(ePuck, Freezeable):
         self.motor_pos = None                  # motor position left and right
         self._thread   = None                  # variable to start and stop a thread
         self.target    = [0, 0]                # current target from goTo command
+        self.next_target = None                # target after the current one (lookahead of a WaypointSource)
+        self.source      = None                # WaypointSource followed right now
+        
+        # speed profile: last commanded forward speed, time of the last command and last wheel speeds sent
+        self.profile_speed = 0
+        self.profile_time  = None
+        self.speed_cmd     = None
+        
+        # last stop: time (sec) until the robot stood still and overshoot (mm) beyond the target
+        self.stop_time      = 0
+        self.stop_overshoot = 0
         self.tracer    = ASyncTracing(self)    # module: robots' own tracing
         self.tracker = tracker                 # module: (camera-)tracking
         self.sfa_calc = sfa_calc               # module: SFA-network calculator
@@ -67,6 +84,21 @@ class ePuckControl(ePuck, Freezeable):
         # module: random walk
         self.random_vehicle = None
         
+        # module: keeps the heading while driving straight
+        self.heading_control = HeadingController(self.setup.navigation.heading_kp,
+                                                 self.setup.navigation.heading_ki,
+                                                 self.setup.navigation.heading_kd,
+                                                 self.setup.navigation.heading_trim_limit)
+        
+        # module: encoder-target motion primitives
+        self.motion = MotionPrimitives(self)
+        
+        # module: counts visits of arena cells and headings
+        self.visitation = VisitationMap() if self.setup.visitation.enabled else None
+        
+        # module: records time spent per waypoint
+        self.telemetry = NavigationTelemetry()
+        
         # what is the robot doing right now?
         self.random_walking    = False
         self.is_following_path = False
@@ -169,6 +201,9 @@ class ePuckControl(ePuck, Freezeable):
         except Exception, pokemon:
             MyLog.e(self.name, "Exception in updatePosition: " + pokemon.__str__())
                     
+        # count odometry update of current waypoint
+        self.telemetry.countStep()
+        
         # calculate change of motor encoders left and right      
         self.d_enc_l = self.motor_pos[0] - self.motor_pos_old[0]           
         self.d_enc_r = self.motor_pos[1] - self.motor_pos_old[1]
@@ -206,6 +241,10 @@ class ePuckControl(ePuck, Freezeable):
         if self.odometry.angle < -180:
             self.odometry.angle += 360
 
+        # count visit of current cell and heading
+        if self.visitation != None:
+            self.visitation.update(self.odometry.location, self.odometry.angle)
+
         # adjust robot with help of a tracking module (if correction was enabled in settings.py)
         if self.tracker != None and self.setup.runparams.correction_mode == 1:
         #if self.tracker != None and self.setup.runparams.correction_mode == 1 and not self.is_turning:
@@ -256,6 +295,10 @@ class ePuckControl(ePuck, Freezeable):
         Adjust robots odometry once in a while with help of a tracking module.
         """
         track_odometry = self.tracker.getOdometry()
+        
+        # don't correct with a predicted or restored pose (e.g. while a marker is occluded)
+        if track_odometry.confidence < self.setup.tracking.min_confidence:
+            return
 
         # calculate the difference of the robots' position and the real position the tracking module tracked 
         difference = self.calcDistance(track_odometry.location, self.odometry.location)
@@ -349,17 +392,48 @@ class ePuckControl(ePuck, Freezeable):
             
         self.is_turning = False
         
+    def rotateBy(self, degree):
+        """
+        Turn robot by "degree" degree with an encoder-target motion primitive.
+        """
+        self.motion.rotateBy(degree)
+    
+    def driveDistance(self, distance):
+        """
+        Drive "distance" mm straight with an encoder-target motion primitive.
+        """
+        self.motion.driveDistance(distance)
+    
+    def getOvershootStats(self):
+        """
+        Returns overshoot statistics of the motion primitives (see MotionPrimitives).
+        """
+        return self.motion.getOvershootStats()
+        
     def goTo(self, targetp):
         """
         Go to coordinates in targetp.
         """
         try:
             MyLog.l(self.name, "Starting thread: goTo" + str(targetp[0]) + "," + str(targetp[1]))
-            self._thread = Thread(target=self.threadedGoTo, args=[targetp])
+            self.telemetry.startRun()
+            self._thread = Thread(target=self.recordedGoTo, args=[targetp, True])
             self._thread.start()
         except Exception, pokemon:
             MyLog.e(self.name, "Exception in goTo: " + pokemon.__str__())
             
+    def recordedGoTo(self, pos, single=False):
+        """
+        Private. Let robot go to point "pos" and record telemetry of this waypoint.
+        If single is True, pos is a run of its own.
+        """
+        self.telemetry.startWaypoint(pos)
+        self.threadedGoTo(pos)
+        self.telemetry.finishWaypoint(self.odometry.location)
+        
+        if single:
+            self.telemetry.finishRun()
+            
     def threadedGoTo(self, pos):
         """
         Let robot go to point "pos". 
@@ -397,30 +471,72 @@ class ePuckControl(ePuck, Freezeable):
             # only turn if the turn angle is bigger than |epsilon|
             epsilon = 2
             if phi_turn < -epsilon or phi_turn > epsilon:
-                self.turn((phi_turn))
+                turn_start = time.time()
+                if self.setup.navigation.use_primitives:
+                    self.motion.rotateBy(phi_turn)
+                else:
+                    self.turn((phi_turn))
+                self.telemetry.addTime("turn", time.time() - turn_start)
+                
+                # robot turned on the spot, accelerate from standstill
+                self.resetSpeedProfile()
             
-            finished = False
-            while not finished and not self.is_corrected[0]:
-                try:
-                    self.set_motors_speed(700, 700)
-                    self.step()
-                    finished = True
-                except Exception, pokemon:
-                    MyLog.e(self.name, "Exception1 in threadedGoTo: " + pokemon.__str__())
-
-            # while not at target position and the robot was not stopped
-            while self.path_length < end and not self.is_corrected[0] and not self.stopped:
-                try:
-                    self.updatePosition()
-                except Exception, pokemon:
-                    MyLog.e(self.name, "Exception2 in threadedGoTo, going straight: " + pokemon.__str__())
+            drive_start = time.time()
+            
+            if self.setup.navigation.use_primitives:
+                # drive the segment with an encoder target, the primitive stops the robot at the end
+                self.motion.driveDistance(d_s)
+            else:
+                # brake towards pos, unless the next target lies straight ahead
+                brake = not self.continuesStraight(pos, alpha)
+            
+                finished = False
+                while not finished and not self.is_corrected[0]:
+                    try:
+                        self.driveStraight(self.getProfileSpeed(end - self.path_length, brake), 0)
+                        self.step()
+                        finished = True
+                    except Exception, pokemon:
+                        MyLog.e(self.name, "Exception1 in threadedGoTo: " + pokemon.__str__())
+
+                # new straight segment, forget the heading error of the last one
+                self.heading_control.reset()
+
+                # while not at target position and the robot was not stopped
+                while self.path_length < end and not self.is_corrected[0] and not self.stopped:
+                    try:
+                        self.updatePosition()
+                    
+                        # accelerate / decelerate with the speed profile
+                        speed = self.getProfileSpeed(end - self.path_length, brake)
+                    
+                        # trim wheel speeds to hold the heading towards pos
+                        trim = 0
+                        if self.setup.navigation.heading_control:
+                            trim = self.trimHeading(pos) * speed / self.setup.navigation.drive_speed
+                    
+                        self.driveStraight(speed, trim)
+                    except Exception, pokemon:
+                        MyLog.e(self.name, "Exception2 in threadedGoTo, going straight: " + pokemon.__str__())
+            self.telemetry.addTime("drive", time.time() - drive_start)
                     
             # if robot wasn't corrected by another module, it will end the goTo-command here
             if not self.is_corrected[0]:
-                try:
-                    self.zeroWheelspeed()
-                except Exception, pokemon:
-                    MyLog.e(self.name, "Exception3 in threadedGoTo, stopping: " + pokemon.__str__())
+                if self.setup.navigation.use_primitives:
+                    # the primitive stopped the robot already. Distance it rolled beyond the target (negative if it stopped short)
+                    self.stop_overshoot = self.path_length - end
+                    self.telemetry.recordStop(self.stop_time, self.stop_overshoot)
+                # keep driving if the next target lies straight ahead, otherwise stop
+                elif self.stopped or brake:
+                    try:
+                        # after the deceleration ramp a single confirmed stop suffices, a manual stop may come at full speed
+                        self.zeroWheelspeed(self.setup.navigation.use_ramps and brake and not self.stopped)
+                    except Exception, pokemon:
+                        MyLog.e(self.name, "Exception3 in threadedGoTo, stopping: " + pokemon.__str__())
+                    
+                    # distance the robot rolled beyond the target (negative if it stopped short)
+                    self.stop_overshoot = self.path_length - end
+                    self.telemetry.recordStop(self.stop_time, self.stop_overshoot)
             
                 # ePuck reached target
                 if not self.stopped:
@@ -431,6 +547,8 @@ class ePuckControl(ePuck, Freezeable):
                     self.tracer.stop()
             # robot was corrected, so repeat goTo-command
             else:
+                self.telemetry.countCorrection()
+                
                 # robot is correcting path
                 try:
                     self.updatePosition()
@@ -440,26 +558,119 @@ class ePuckControl(ePuck, Freezeable):
         else:
             MyLog.d(self.name, "goTo(" + str(pos[0]) + "," + str(pos[1]) + "): ePuck is already at target. Skipping goTo.")        
 
-    def zeroWheelspeed(self):
+    def continuesStraight(self, pos, alpha):
+        """
+        Private. Returns true if the next target (lookahead of a WaypointSource) lies straight
+        ahead of pos in direction alpha, so the robot would not have to turn at pos.
+        """
+        if self.next_target == None:
+            return False
+        
+        # the next goTo would be skipped, so the robot has to stop at pos
+        if self.calcDistance(self.next_target, pos) <= self.error_threshold:
+            return False
+        
+        # same epsilon as in threadedGoTo()
+        epsilon = 2
+        heading = degrees(math.atan2(self.next_target[1] - pos[1], self.next_target[0] - pos[0]))
+        return abs(self.calcSignedAngleDiff(heading, alpha)) <= epsilon
+        
+    def trimHeading(self, pos):
+        """
+        Private. Trim wheel speeds with the heading controller, so that the robot
+        keeps heading towards pos while driving straight.
+        """
+        d_x = pos[0] - self.odometry.location[0]
+        d_y = pos[1] - self.odometry.location[1]
+        
+        # close to the target the bearing gets unreliable, keep the last trim
+        if (d_x ** 2 + d_y ** 2) ** 0.5 < self.setup.robot.diameter:
+            return self.heading_control.getTrim()
+        
+        # angles grow with the left wheel, so a positive error speeds up the left wheel
+        error = self.calcSignedAngleDiff(degrees(math.atan2(d_y, d_x)), self.odometry.angle)
+        return self.heading_control.update(error)
+
+    def getProfileSpeed(self, remaining, brake):
+        """
+        Private. Forward speed of the acceleration / deceleration ramps.
+        Accelerates with navigation.acceleration up to navigation.drive_speed and, if brake is True,
+        decelerates so that the robot reaches navigation.min_speed when "remaining" mm are left.
+        """
+        if not self.setup.navigation.use_ramps:
+            return self.setup.navigation.drive_speed
+        
+        now = time.time()
+        d_t = now - self.profile_time if self.profile_time != None else 0
+        self.profile_time = now
+        
+        # acceleration ramp. Speeds are given in encoder steps per second
+        speed = min(self.setup.navigation.drive_speed, self.profile_speed + self.setup.navigation.acceleration * d_t)
+        
+        # deceleration ramp: v = sqrt(2 * a * s)
+        if brake:
+            remaining_ticks = max(remaining, 0) * self.TICKS_PER_M / 1000.0
+            speed = min(speed, math.sqrt(2 * self.setup.navigation.deceleration * remaining_ticks))
+        
+        self.profile_speed = max(speed, self.setup.navigation.min_speed)
+        return self.profile_speed
+    
+    def resetSpeedProfile(self):
+        """
+        Private. The robot does not drive forward anymore, restart the speed profile from standstill.
+        """
+        self.profile_speed = 0
+        self.profile_time = None
+        self.speed_cmd = None
+    
+    def driveStraight(self, speed, trim):
+        """
+        Private. Set wheel speeds to speed + trim (left) and speed - trim (right).
+        Only sends a command if the wheel speeds changed.
+        """
+        command = (int(speed + trim), int(speed - trim))
+        if command != self.speed_cmd:
+            self.set_motors_speed(command[0], command[1])
+            self.speed_cmd = command
+
+    def zeroWheelspeed(self, ramped=False):
         """
         Fail-safe method to set the robots' wheelspeed to (0,0) and therefore stop it.
+        ramped: the robot was slowed down to navigation.min_speed by the deceleration ramp already,
+        so a single stop command is sent and confirmed once. Otherwise (or if the robot did not stop),
+        the stop is repeated until the motor speed reads zero.
         """
-        motor_speed = None
-        try:
-            
-            motor_speed = self.get_motor_speed()
-        except Exception, pokemon:
-            MyLog.e(self.name, "Exception in zeroWheelspeed(): Couldn't get_motor_speed(). Trying again. " + pokemon.__str__())
+        stop_start = time.time()
+        
+        if ramped:
+            try:
+                self.set_motors_speed(0, 0)
+                self.updatePosition()
+                motor_speed = self.get_motor_speed()
+                if motor_speed != None and motor_speed[0] == 0 and motor_speed[1] == 0:
+                    self.stop_time = time.time() - stop_start
+                    self.resetSpeedProfile()
+                    return
+                MyLog.d(self.name, "zeroWheelspeed(): robot did not confirm the stop, repeating it.")
+            except Exception, pokemon:
+                MyLog.e(self.name, "Exception in zeroWheelspeed(): Couldn't stop robot. " + pokemon.__str__())
         
         # loop as long as the robot did not stop and try to stop him.
-        while motor_speed == None or motor_speed[0] != 0 or motor_speed[1] != 0:
+        while True:
+            motor_speed = None
             try:
                 self.set_motors_speed(0, 0)
                 self.updatePosition()
-                sleep(0.033)
                 motor_speed = self.get_motor_speed()
             except Exception, pokemon:
                 MyLog.e(self.name, "Exception in zeroWheelspeed(): Couldn't stop robot. " + pokemon.__str__())
+            
+            if motor_speed != None and motor_speed[0] == 0 and motor_speed[1] == 0:
+                break
+            sleep(0.033)
+        
+        self.stop_time = time.time() - stop_start
+        self.resetSpeedProfile()
 
     def followPath(self, filePath):
         """
@@ -469,79 +680,10 @@ class ePuckControl(ePuck, Freezeable):
         500    500
         1234    4321
         ...
+        The whole file is parsed before the robot moves, a missing, empty or corrupt file raises an exception.
         """
-        try:
-            MyLog.l(self.name, "Starting thread: followPath: " + filePath)
-            self.is_following_path = True
-            self._thread = Thread(target=self.threadedFollowPath, args=[filePath])
-            self._thread.start()
-        except Exception, pokemon:
-            MyLog.e(self.name, "Exception in followPath: " + pokemon.__str__())
-            
-    def threadedFollowPath(self, filePath):
-        """
-        Let robot follow a path read in a .txt-file. 
-        Is called in its own thread.
-        """
-        path = "".join(filePath)
-
-        try:
-            _file = None
-            # check if filePath is existing and not empty
-            if path != None or not path == "":
-                _file = open(path, "r")
-            
-            # check if file is empty
-            first_character = _file.read(1)
-            if not first_character:
-                raise Exception("filePath is empty!")
-            else:
-                # first character wasn't empty, return to start
-                _file.seek(0)
-        
-            # prepare variable for coordinates
-            p = []
-            
-            # parse each line in _file to check if file is correct and save read coordinates into variable p. Ignore first line
-            i = 0
-            for line in _file:
-                if not i == 0:
-                    # append new point
-                    p.append([-1, -1])
-                    
-                    # try reading two numbers from line
-                    p[i - 1][0], p[i - 1][1] = line.strip().split()
-                        
-                    # check if read data is a number
-                    if not (p[i - 1][0].isdigit() and p[i - 1][1].isdigit()):
-                        raise Exception("File is corrupt. Read data wasn't int.")
-                    
-                    # make sure p contains numbers
-                    p[i - 1][0] = int(p[i - 1][0])
-                    p[i - 1][1] = int(p[i - 1][1])
-                i = i + 1
-                
-            _file.close()
-            
-            # start tracing robot
-            if self.tracer.isUsed():
-                # tracer was used before, so create a new one to continue tracing
-                self.tracer = ASyncTracing(self)
-            self.tracer.start()      
-            
-            # iterate through points and tell the robot to go to each point
-            for point in p:
-                # if robot was not stopped manually continue following path
-                if not self.stopped:
-                    self.threadedGoTo(point)
-            
-            # stop tracing robot
-            self.tracer.stop()
-            
-            self.is_following_path = False
-            MyLog.l(self.name, "finished following path.")
-        except Exception as pokemon:
-            MyLog.e(self.name, "Exception in threadedFollowPath: " + pokemon.__str__())
+        MyLog.l(self.name, "Starting thread: followPath: " + filePath)
+        self.followSource(FileWaypointSource(filePath))
             
     def loopPath(self, filePath, turns):
         """
@@ -552,58 +694,32 @@ class ePuckControl(ePuck, Freezeable):
         500    500
         1234    4321
         ...
+        The whole file is parsed before the robot moves, a missing, empty or corrupt file raises an exception.
+        """
+        MyLog.l(self.name, "Starting thread: loopPath: " + filePath)
+        self.followSource(FileWaypointSource(filePath, turns))
+            
+    def followSource(self, source):
+        """
+        Follow waypoints of a WaypointSource (file, array, generator or queue fed by another thread).
         """
         try:
-            MyLog.l(self.name, "Starting thread: loopPath: " + filePath)
+            MyLog.l(self.name, "Starting thread: followSource: " + source.__class__.__name__)
             self.is_following_path = True
-            self._thread = Thread(target=self.threadedLoopPath, args=[filePath, turns])
+            self.source = source
+            self._thread = Thread(target=self.threadedFollowSource, args=[source])
             self._thread.start()
         except Exception, pokemon:
-            MyLog.e(self.name, "Exception in loopPath: " + pokemon.__str__())
+            MyLog.e(self.name, "Exception in followSource: " + pokemon.__str__())
             
-    def threadedLoopPath(self, filePath, turns):
+    def threadedFollowSource(self, source):
         """
-        Let robot follow a path read in a .txt-file. Is called in its own thread.
+        Let robot follow waypoints of a WaypointSource. 
+        Is called in its own thread.
         """
-        path = "".join(filePath)
-
         try:
-            _file = None
-            # check if filePath is existing and not empty
-            if path != None or not path == "":
-                _file = open(path, "r")
-            
-            # check if file is empty
-            first_character = _file.read(1)
-            if not first_character:
-                raise Exception("filePath is empty!")
-            else:
-                # first character wasn't empty, return to start
-                _file.seek(0)
-        
-            # prepare variable for coordinates
-            p = []
-            
-            # parse each line in _file to check if file is correct and save read coordinates into variable p. Ignore first line
-            i = 0
-            for line in _file:
-                if not i == 0:
-                    # append new point
-                    p.append([-1, -1])
-                    
-                    # try reading two numbers from line
-                    p[i - 1][0], p[i - 1][1] = line.strip().split()
-                        
-                    # check if read data is a number
-                    if not (p[i - 1][0].isdigit() and p[i - 1][1].isdigit()):
-                        raise Exception("File is corrupt. Read data wasn't int.")
-                    
-                    # make sure p contains numbers
-                    p[i - 1][0] = int(p[i - 1][0])
-                    p[i - 1][1] = int(p[i - 1][1])
-                i = i + 1
-                
-            _file.close()
+            # start producing waypoints
+            source.start()
             
             # start tracing robot
             if self.tracer.isUsed():
@@ -611,21 +727,33 @@ class ePuckControl(ePuck, Freezeable):
                 self.tracer = ASyncTracing(self)
             self.tracer.start()      
             
-            # iterate through points and tell the robot to go to each point
-            for i in range(0, turns):
-                # if robot was not stopped manually continue following path
-                if not self.stopped:
-                    for point in p:
-                        if not self.stopped:
-                            self.threadedGoTo(point)
+            # start recording telemetry
+            self.telemetry.startRun()
+            
+            # tell the robot to go to each point as long as it was not stopped manually
+            point = source.next()
+            while point != None and not self.stopped:
+                # look ahead without waiting, so threadedGoTo knows where the robot goes afterwards (None if not known yet)
+                self.next_target = source.peek(False)
+                self.recordedGoTo(point)
+                point = source.next()
+            self.next_target = None
+            source.close()
             
             # stop tracing robot
             self.tracer.stop()
             
+            # write telemetry of this run
+            self.telemetry.finishRun()
+            
+            # write the visitation map of this run
+            if self.visitation != None:
+                self.visitation.stop()
+            
             self.is_following_path = False
             MyLog.l(self.name, "finished following path.")
         except Exception as pokemon:
-            MyLog.e(self.name, "Exception in threadedFollowPath: " + pokemon.__str__())
+            MyLog.e(self.name, "Exception in threadedFollowSource: " + pokemon.__str__())
       
     def startRandomWalk(self, momentum):
         """
@@ -664,6 +792,10 @@ class ePuckControl(ePuck, Freezeable):
         else:
             self.stopped = True
             
+            # wake up the navigator if it waits for waypoints
+            if self.source != None:
+                self.source.close()
+            
             # if tracking-module is available, stop it
             if self.tracker != None:
                 self.tracker.stop()
@@ -672,6 +804,10 @@ class ePuckControl(ePuck, Freezeable):
         if self.tracer != None:
             self.tracer.stop()
             
+        # write the visitation map
+        if self.visitation != None:
+            self.visitation.stop()
+            
     def waitForCompletion(self):
         """
         Wait in calling thread until ePuck finishes what he was doing.
@@ -681,6 +817,13 @@ class ePuckControl(ePuck, Freezeable):
                 self._thread.join()
             if self.random_walking:
                 MyLog.d(self.name, "waitForCompletion() has no effect while random walking.")
+            else:
+                # report where the time of the run went
+                self.telemetry.logSummary()
+                
+                # write the visitation map of this run
+                if self.visitation != None:
+                    self.visitation.stop()
         except Exception, pokemon:
             MyLog.e(self.name, "Exception in waitForCompletion: " + pokemon.__str__())
         
@@ -700,6 +843,18 @@ class ePuckControl(ePuck, Freezeable):
         """
         return self.odometry
     
+    def getTelemetry(self):
+        """
+        Returns the navigation telemetry (records per waypoint, summary and comparison of runs).
+        """
+        return self.telemetry
+    
+    def getVisitationMap(self):
+        """
+        Returns the visitation map (None if disabled in settings.py).
+        """
+        return self.visitation
+    
     def getCorrectionStatus(self):
         """
         Returns True if the robots' current position was corrected by a tracking module.
@@ -725,6 +880,24 @@ class ePuckControl(ePuck, Freezeable):
         
         return result
     
+    def calcSignedAngleDiff(self, a, b):
+        """
+        Calculates difference a - b between two angles, kept within [-180, 180).
+        """
+        return (a - b + 180) % 360 - 180
+    
+    def getStopReport(self):
+        """
+        Returns time (sec) until the robot stood still and overshoot (mm) of the last stop at a target.
+        """
+        return self.stop_time, self.stop_overshoot
+    
+    def getHeadingError(self):
+        """
+        Returns the residual heading error (degree) of the heading controller.
+        """
+        return self.heading_control.getError()
+    
     def setCorrectionStatus(self, correction):
         """
         Set self.is_corrected.
@@ -0,0 +1,197 @@
+from utils.Freezeable import Freezeable
+from utils import Log as MyLog
+from settings import Setup
+import numpy
+import os
+import time
+
+class NavigationTelemetry(Freezeable):
+    """
+    This class records where the time of a navigation run goes, waypoint by waypoint.
+    Each waypoint record holds start and end time, time spent turning, driving and stopping,
+    the overshoot of the stop, the number of tracker corrections, the final position error
+    and the number of odometry steps.
+    Records of a run are written as one tab separated line per waypoint to
+    filesystem.file_dir + filesystem.epuck_dir + "telemetry_<run>.txt".
+    Examples:
+    -telemetry.logSummary()
+    -telemetry.compareRuns("telemetry_a.txt", "telemetry_b.txt")
+    """
+    FIELDS = ["waypoint", "x", "y", "start", "end", "turn", "drive", "stop", "overshoot", "corrections", "error", "steps"]
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        self.setup = Setup()
+        self.name = "NavigationTelemetry"
+
+        self.path = self.setup.filesystem.file_dir + self.setup.filesystem.epuck_dir
+
+        # name of the current run and records of finished waypoints
+        self.run = None
+        self.records = []
+
+        # record of the waypoint the robot is going to
+        self.current = None
+
+        self.freeze()
+
+    def startRun(self):
+        """
+        Start a new run. Records of the last run are discarded.
+        """
+        self.run = time.strftime("%Y%m%d_%H%M%S")
+        self.records = []
+        self.current = None
+
+    def finishRun(self):
+        """
+        Write records of the current run to file.
+        """
+        if self.run == None:
+            return
+        try:
+            if not os.path.exists(self.path):
+                os.makedirs(self.path)
+                MyLog.l(self.name, "Directory successfully created: " + self.path)
+            fileName = self.path + "telemetry_" + self.run + ".txt"
+            _file = open(fileName, "w")
+            _file.write("\t".join(self.FIELDS) + "\n")
+            for record in self.records:
+                _file.write("\t".join(str(record[field]) for field in self.FIELDS) + "\n")
+            _file.close()
+            MyLog.l(self.name, "File successfully written: " + fileName)
+        except Exception as pokemon:
+            MyLog.e(self.name, "Exception in finishRun: " + pokemon.__str__())
+
+    def startWaypoint(self, target):
+        """
+        Start recording the way to target.
+        """
+        if self.run == None:
+            self.startRun()
+        self.current = {"waypoint": len(self.records),
+                        "x": target[0],
+                        "y": target[1],
+                        "start": time.time(),
+                        "end": 0,
+                        "turn": 0.0,
+                        "drive": 0.0,
+                        "stop": 0.0,
+                        "overshoot": 0.0,
+                        "corrections": 0,
+                        "error": 0.0,
+                        "steps": 0}
+
+    def finishWaypoint(self, location):
+        """
+        Finish recording the current waypoint. location is the robots' final position.
+        """
+        if self.current == None:
+            return
+        self.current["end"] = time.time()
+        self.current["error"] = round(((location[0] - self.current["x"]) ** 2 + (location[1] - self.current["y"]) ** 2) ** 0.5, 1)
+        for field in ("start", "end", "turn", "drive", "stop"):
+            self.current[field] = round(self.current[field], 3)
+        self.records.append(self.current)
+        self.current = None
+
+    def addTime(self, phase, seconds):
+        """
+        Add time spent in phase ("turn", "drive" or "stop") to the current waypoint.
+        """
+        if self.current != None:
+            self.current[phase] += seconds
+
+    def recordStop(self, seconds, overshoot):
+        """
+        Add time spent stopping and the overshoot (mm) of the stop to the current waypoint.
+        """
+        if self.current != None:
+            self.current["stop"] += seconds
+            self.current["overshoot"] = round(overshoot, 1)
+
+    def countCorrection(self):
+        """
+        Count a tracker correction, which forced the robot to plan the current waypoint again.
+        """
+        if self.current != None:
+            self.current["corrections"] += 1
+
+    def countStep(self):
+        """
+        Count an odometry update on the way to the current waypoint.
+        """
+        if self.current != None:
+            self.current["steps"] += 1
+
+    def getRecords(self):
+        """
+        Returns records of the current run as a NumPy structured array.
+        """
+        return self.toArray(self.records)
+
+    def toArray(self, records):
+        """
+        Private. Convert records to a NumPy structured array.
+        """
+        dtype = [(field, numpy.float64) for field in self.FIELDS]
+        return numpy.array([tuple(record[field] for field in self.FIELDS) for record in records], dtype)
+
+    def loadRun(self, fileName):
+        """
+        Load records of a run from a telemetry file as a NumPy structured array.
+        """
+        return numpy.atleast_1d(numpy.genfromtxt(fileName, names=True, delimiter="\t"))
+
+    def summarize(self, records):
+        """
+        Returns a summary (dictionary) of the given records.
+        """
+        summary = {"waypoints": len(records)}
+        if len(records) == 0:
+            return summary
+
+        summary["total"] = float(records["end"][-1] - records["start"][0])
+        for field in ("turn", "drive", "stop"):
+            summary[field] = float(records[field].sum())
+        # time which was neither spent turning, driving nor stopping (e.g. replanning, logging)
+        summary["other"] = summary["total"] - summary["turn"] - summary["drive"] - summary["stop"]
+        summary["corrections"] = int(records["corrections"].sum())
+        summary["mean_overshoot"] = float(records["overshoot"].mean())
+        summary["mean_error"] = float(records["error"].mean())
+        summary["max_error"] = float(records["error"].max())
+        summary["steps"] = int(records["steps"].sum())
+        return summary
+
+    def logSummary(self):
+        """
+        Log a summary of the current run.
+        """
+        summary = self.summarize(self.getRecords())
+        if summary["waypoints"] == 0:
+            MyLog.l(self.name, "No waypoints recorded.")
+            return
+
+        total = summary["total"] if summary["total"] > 0 else 1
+        MyLog.l(self.name, "Run " + str(self.run) + ": " + str(summary["waypoints"]) + " waypoints in %.1f s" % summary["total"])
+        for phase in ("turn", "drive", "stop", "other"):
+            MyLog.l(self.name, "  " + phase + ": %.1f s (%.0f%%)" % (summary[phase], summary[phase] * 100 / total))
+        MyLog.l(self.name, "  corrections: " + str(summary["corrections"]) + ", steps: " + str(summary["steps"]))
+        MyLog.l(self.name, "  overshoot: mean %.1f mm" % summary["mean_overshoot"])
+        MyLog.l(self.name, "  position error: mean %.1f mm, max %.1f mm" % (summary["mean_error"], summary["max_error"]))
+
+    def compareRuns(self, fileA, fileB):
+        """
+        Compare two telemetry files. Returns {key: (value a, value b, b - a)} for each summary value.
+        """
+        a = self.summarize(self.loadRun(fileA))
+        b = self.summarize(self.loadRun(fileB))
+
+        comparison = {}
+        for key in a:
+            if key in b:
+                comparison[key] = (a[key], b[key], b[key] - a[key])
+                MyLog.l(self.name, key + ": " + str(a[key]) + " -> " + str(b[key]))
+        return comparison
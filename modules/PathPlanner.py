@@ -0,0 +1,289 @@
+from utils.Freezeable import Freezeable
+from utils import Log as MyLog
+from settings import Setup
+from cv2 import cv
+import cv2
+import numpy
+import hashlib
+import heapq
+import math
+import os
+
+class PathPlanner(Freezeable):
+    """
+    This class plans obstacle free paths through the arena (A* on a grid costmap).
+    The costmap is built from the arena dimensions and a list of rectangular obstacles
+    and is cached per layout (in memory and in filesystem.costmap_dir), so repeated runs
+    only have to search the grid.
+    Format of an obstacle file (rectangles in mm, arena inertial system):
+    x1    y1    x2    y2
+    300    0    350    200
+    ...
+    Examples:
+    -planner = PathPlanner("house.txt"): obstacle file in filesystem.obstacle_dir
+    -planner = PathPlanner("./tmp/house.txt")
+    -points = planner.plan((100, 100), (850, 250))
+    -planner.writePath(points, "./input/path/path_planned.txt")
+    """
+    # costmaps of all layouts which were built in this process, see getCostmap()
+    costmaps = {}
+
+    def __init__(self, obstacles=None):
+        """
+        Constructor. obstacles is an obstacle file (see loadObstacles()) or a list of rectangles (x1, y1, x2, y2).
+        Logs a warning if there are no obstacles.
+        """
+        self.setup = Setup()
+        self.name = "PathPlanner"
+
+        # grid resolution in mm per cell
+        self.resolution = self.setup.planner.resolution
+
+        # minimal distance (mm) between the robots' center and an obstacle
+        self.clearance = self.setup.robot.diameter / 2.0 + self.setup.planner.margin
+
+        # rectangles (x1, y1, x2, y2) in mm
+        self.obstacles = []
+
+        # cost of entering a cell. numpy.inf for cells the robot can not reach
+        self.costmap = None
+
+        self.freeze()
+
+        if isinstance(obstacles, basestring):
+            self.loadObstacles(obstacles)
+        elif obstacles != None:
+            for o in obstacles:
+                self.obstacles.append(tuple(int(v) for v in o))
+
+        # e.g. no obstacle file of a layout in filesystem.obstacle_dir: only the walls are avoided
+        if len(self.obstacles) == 0:
+            MyLog.e(self.name, "Warning: planning without obstacles, only the arena walls are avoided. Obstacle files are read from "
+                    + self.setup.filesystem.obstacle_dir)
+
+        self.costmap = self.getCostmap()
+
+    def loadObstacles(self, filePath):
+        """
+        Read rectangles from an obstacle file. Ignores first line.
+        A file name without directory is read from filesystem.obstacle_dir.
+        """
+        if os.path.dirname(filePath) == "":
+            filePath = self.setup.filesystem.obstacle_dir + filePath
+        _file = open(filePath, "r")
+        i = 0
+        for line in _file:
+            if not i == 0 and line.strip() != "":
+                values = line.strip().split()
+                if len(values) != 4:
+                    raise Exception("Obstacle file is corrupt. Expected four numbers per line.")
+                self.obstacles.append(tuple(int(v) for v in values))
+            i = i + 1
+        _file.close()
+
+    def getLayoutKey(self):
+        """
+        Private. Returns a key which identifies arena, obstacles and planner settings.
+        """
+        layout = (self.setup.arena.boxwidth, self.setup.arena.boxheight, self.resolution,
+                  self.clearance, self.setup.planner.cost_weight, tuple(sorted(self.obstacles)))
+        return hashlib.md5(repr(layout)).hexdigest()
+
+    def getCostmap(self):
+        """
+        Private. Returns the costmap of this layout. Loads it from cache if possible.
+        """
+        key = self.getLayoutKey()
+        if key in PathPlanner.costmaps:
+            return PathPlanner.costmaps[key]
+
+        path = self.setup.filesystem.file_dir + self.setup.filesystem.costmap_dir
+        fileName = path + key + ".npy"
+        costmap = None
+        try:
+            if os.path.exists(fileName):
+                costmap = numpy.load(fileName)
+        except Exception as pokemon:
+            MyLog.e(self.name, "Exception loading costmap: " + pokemon.__str__())
+
+        if costmap is None:
+            costmap = self.buildCostmap()
+            try:
+                if not os.path.exists(path):
+                    os.makedirs(path)
+                numpy.save(fileName, costmap)
+                MyLog.l(self.name, "Costmap successfully written: " + fileName)
+            except Exception as pokemon:
+                MyLog.e(self.name, "Exception saving costmap: " + pokemon.__str__())
+
+        PathPlanner.costmaps[key] = costmap
+        return costmap
+
+    def buildCostmap(self):
+        """
+        Private. Rasterize arena and obstacles and calculate the cost of each cell
+        from its distance to the closest obstacle (distance transform).
+        """
+        rows = int(math.ceil(self.setup.arena.boxheight / float(self.resolution)))
+        cols = int(math.ceil(self.setup.arena.boxwidth / float(self.resolution)))
+
+        # 1 = free, 0 = wall or obstacle
+        free = numpy.ones((rows, cols), numpy.uint8)
+        free[0, :] = 0
+        free[-1, :] = 0
+        free[:, 0] = 0
+        free[:, -1] = 0
+        for (x1, y1, x2, y2) in self.obstacles:
+            c1, c2 = sorted((int(x1 / self.resolution), int(x2 / self.resolution)))
+            r1, r2 = sorted((int(y1 / self.resolution), int(y2 / self.resolution)))
+            free[max(r1, 0):r2 + 1, max(c1, 0):c2 + 1] = 0
+
+        # distance of each cell to the closest obstacle in mm
+        dist = cv2.distanceTransform(free, cv.CV_DIST_L2, 5) * self.resolution
+
+        # cells close to obstacles are more expensive, so paths keep some distance
+        safety = 2 * self.clearance
+        costmap = 1 + self.setup.planner.cost_weight * numpy.clip((safety - dist) / safety, 0, 1)
+        costmap = costmap.astype(numpy.float32)
+        costmap[dist < self.clearance] = numpy.inf
+
+        return costmap
+
+    def toCell(self, p):
+        """
+        Private. Convert a point in mm to a grid cell (row, column).
+        """
+        return (int(p[1] / self.resolution), int(p[0] / self.resolution))
+
+    def toPoint(self, cell):
+        """
+        Private. Convert a grid cell (row, column) to the point in mm at its center.
+        """
+        return [int((cell[1] + 0.5) * self.resolution), int((cell[0] + 0.5) * self.resolution)]
+
+    def isFree(self, cell):
+        """
+        Private. Returns true if the robot can reach the given cell.
+        """
+        rows, cols = self.costmap.shape
+        return 0 <= cell[0] < rows and 0 <= cell[1] < cols and numpy.isfinite(self.costmap[cell[0], cell[1]])
+
+    def plan(self, start, goal):
+        """
+        Plan an obstacle free path from start to goal (points in mm).
+        Returns a list of waypoints [x, y] without the start point and with goal as last point.
+        """
+        start_cell = self.toCell(start)
+        goal_cell = self.toCell(goal)
+
+        if not self.isFree(start_cell):
+            raise Exception("Start point " + str(start) + " is blocked.")
+        if not self.isFree(goal_cell):
+            raise Exception("Goal point " + str(goal) + " is blocked.")
+
+        cells = self.search(start_cell, goal_cell)
+        if cells == None:
+            raise Exception("There is no path from " + str(start) + " to " + str(goal) + ".")
+
+        # drop cells which can be skipped on a straight line
+        waypoints = [self.toPoint(c) for c in self.prune(cells)[1:-1]]
+        waypoints.append([int(goal[0]), int(goal[1])])
+
+        return waypoints
+
+    def planPath(self, points):
+        """
+        Plan an obstacle free path through all given points (e.g. a hand written path).
+        """
+        waypoints = []
+        for i in range(1, len(points)):
+            waypoints.extend(self.plan(points[i - 1], points[i]))
+        return waypoints
+
+    def search(self, start, goal):
+        """
+        Private. A* search on the 8-connected costmap. Returns a list of cells or None.
+        """
+        rows, cols = self.costmap.shape
+        neighbours = [(-1, 0, 1.0), (1, 0, 1.0), (0, -1, 1.0), (0, 1, 1.0),
+                      (-1, -1, math.sqrt(2)), (-1, 1, math.sqrt(2)), (1, -1, math.sqrt(2)), (1, 1, math.sqrt(2))]
+
+        def heuristic(c):
+            # octile distance, cell costs are at least 1
+            d_r = abs(c[0] - goal[0])
+            d_c = abs(c[1] - goal[1])
+            return max(d_r, d_c) + (math.sqrt(2) - 1) * min(d_r, d_c)
+
+        costs = numpy.empty((rows, cols), numpy.float64)
+        costs.fill(numpy.inf)
+        costs[start] = 0
+        parents = {start: None}
+        heap = [(heuristic(start), start)]
+
+        while heap:
+            f, cell = heapq.heappop(heap)
+            if cell == goal:
+                path = []
+                while cell != None:
+                    path.append(cell)
+                    cell = parents[cell]
+                path.reverse()
+                return path
+
+            g = costs[cell]
+            # outdated heap entry
+            if f - heuristic(cell) > g:
+                continue
+
+            for (d_r, d_c, length) in neighbours:
+                n = (cell[0] + d_r, cell[1] + d_c)
+                if not (0 <= n[0] < rows and 0 <= n[1] < cols):
+                    continue
+                step = self.costmap[n]
+                if not numpy.isfinite(step):
+                    continue
+                cost = g + length * step
+                if cost < costs[n]:
+                    costs[n] = cost
+                    parents[n] = cell
+                    heapq.heappush(heap, (cost + heuristic(n), n))
+        return None
+
+    def prune(self, cells):
+        """
+        Private. Keep only cells where the path has to change its direction to avoid obstacles.
+        """
+        pruned = [cells[0]]
+        i = 0
+        while i < len(cells) - 1:
+            # find the furthest cell that can be reached on a straight line
+            j = len(cells) - 1
+            while j > i + 1 and not self.hasLineOfSight(cells[i], cells[j]):
+                j = j - 1
+            pruned.append(cells[j])
+            i = j
+        return pruned
+
+    def hasLineOfSight(self, a, b):
+        """
+        Private. Returns true if the straight line between cells a and b is free.
+        """
+        steps = max(abs(b[0] - a[0]), abs(b[1] - a[1])) * 2 + 1
+        rows = numpy.rint(numpy.linspace(a[0], b[0], steps)).astype(int)
+        cols = numpy.rint(numpy.linspace(a[1], b[1], steps)).astype(int)
+        return bool(numpy.all(numpy.isfinite(self.costmap[rows, cols])))
+
+    def writePath(self, waypoints, filePath):
+        """
+        Write waypoints to a path file, which can be used by ePuckControl.followPath().
+        """
+        path = os.path.dirname(filePath)
+        if path != "" and not os.path.exists(path):
+            os.makedirs(path)
+
+        _file = open(filePath, "w")
+        _file.write("x\ty\n")
+        for p in waypoints:
+            _file.write(str(int(p[0])) + "\t" + str(int(p[1])) + "\n")
+        _file.close()
+        MyLog.l(self.name, "Path successfully written: " + filePath)
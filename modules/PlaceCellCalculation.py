@@ -87,7 +87,7 @@ class PlaceCellCalculation(Freezeable):
         
         return self.sfa_network.execute(data)
     
-    def update(self, pic):
+    def update(self, pic, timestamp=None):
         """
         As soon as the observed class notifies its observers 
         (=> there is a new picture available), this function
@@ -95,10 +95,15 @@ class PlaceCellCalculation(Freezeable):
         It asks the SFA network for the picture related answer, 
         checks the robots' direction and saves the SFA answer 
         into a data array.
+        timestamp is the time the picture was captured. If given, the picture
+        is paired with the robots' pose at that time.
         """
         
         if self.tracker != None:
-            tracking_answer = self.tracker.getOdometry()
+            if timestamp != None:
+                tracking_answer = self.tracker.getOdometryAt(timestamp)
+            else:
+                tracking_answer = self.tracker.getOdometry()
         else:
             raise Exception("No tracking-module initialized. Impossible to use SFA.")
         try:
@@ -0,0 +1,90 @@
+from utils.Freezeable import Freezeable
+from settings import Setup
+import numpy
+import threading
+
+class PoseHistory(Freezeable):
+    """
+    This class keeps the last tracking.history_size poses (timestamp, x, y, angle)
+    in a preallocated NumPy ring buffer, so poses can be queried by time:
+    getAt(t) interpolates the location linearly and the angle along the shorter way
+    between the two poses around t.
+    """
+
+    def __init__(self, size=None):
+        """
+        Constructor
+        """
+        self.setup = Setup()
+        self.name = "PoseHistory"
+
+        self.size = size if size != None else self.setup.tracking.history_size
+
+        # timestamps and poses (x, y, angle). Ring buffer: index is the next slot to write
+        self.times = numpy.zeros(self.size, numpy.float64)
+        self.poses = numpy.zeros((self.size, 3), numpy.float64)
+        self.index = 0
+        self.count = 0
+
+        self.lock = threading.Lock()
+
+        self.freeze()
+
+    def append(self, timestamp, location, angle):
+        """
+        Add a pose. Poses have to be appended in chronological order.
+        """
+        self.lock.acquire()
+        self.times[self.index] = timestamp
+        self.poses[self.index, 0] = location[0]
+        self.poses[self.index, 1] = location[1]
+        self.poses[self.index, 2] = angle
+        self.index = (self.index + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+        self.lock.release()
+
+    def getAt(self, t):
+        """
+        Returns the pose (x, y, angle) at time t. Times before the oldest or after the newest pose
+        return the oldest or newest pose. Returns None if there are no poses yet.
+        """
+        self.lock.acquire()
+        try:
+            if self.count == 0:
+                return None
+
+            # slots in chronological order
+            order = (self.index - self.count + numpy.arange(self.count)) % self.size
+            times = self.times[order]
+
+            i = numpy.searchsorted(times, t)
+            if i == 0:
+                return tuple(self.poses[order[0]])
+            if i == self.count:
+                return tuple(self.poses[order[-1]])
+
+            t0, t1 = times[i - 1], times[i]
+            p0, p1 = self.poses[order[i - 1]], self.poses[order[i]]
+        finally:
+            self.lock.release()
+
+        f = (t - t0) / (t1 - t0) if t1 > t0 else 0.0
+        x = p0[0] + (p1[0] - p0[0]) * f
+        y = p0[1] + (p1[1] - p0[1]) * f
+
+        # interpolate the angle along the shorter way, result in (-180, 180]
+        angle = p0[2] + ((p1[2] - p0[2] + 180) % 360 - 180) * f
+        angle = -((-angle + 180) % 360 - 180)
+        return (x, y, angle)
+
+    def getRange(self):
+        """
+        Returns the timestamps of the oldest and the newest pose, None if there are no poses yet.
+        """
+        self.lock.acquire()
+        try:
+            if self.count == 0:
+                return None
+            return (self.times[(self.index - self.count) % self.size], self.times[(self.index - 1) % self.size])
+        finally:
+            self.lock.release()
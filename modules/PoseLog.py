@@ -0,0 +1,141 @@
+from utils.Freezeable import Freezeable
+from utils import Log as MyLog
+from settings import Setup
+import numpy
+import os
+import threading
+
+class PoseLog(Freezeable):
+    """
+    Append-only binary log of poses with fixed-width records (see RECORD):
+    timestamp, pixel coordinates, arena coordinates (mm), angle and flags.
+    Records are collected in a preallocated block of other.poselog_block records
+    and written to file when the block is full, so the tracking loop does no
+    text formatting and no small writes.
+    A file starts with a 16 byte header (MAGIC, record size). Read it with loadPoseLog(),
+    which memory-maps the records as a NumPy structured array.
+    A new log overwrites the file. When appending to an existing log, an incomplete last
+    record (e.g. after a crash) is cut off first, so the records of the next run stay aligned.
+    """
+    RECORD = numpy.dtype([("timestamp", "<f8"),
+                          ("px", "<f4"),
+                          ("py", "<f4"),
+                          ("x", "<f4"),
+                          ("y", "<f4"),
+                          ("angle", "<f4"),
+                          ("flags", "<u4")])
+
+    MAGIC = "POSELOG1"
+    HEADER_SIZE = 16
+
+    # flags of a record
+    FLAG_INTERPOLATED = 1
+    FLAG_CORRECTION = 2
+
+    def __init__(self, fileName, block=None, append=False):
+        """
+        Constructor. Opens fileName and writes the header, or appends to the log in fileName if append is true.
+        """
+        self.setup = Setup()
+        self.name = "PoseLog"
+
+        self.fileName = fileName
+        self.block = numpy.zeros(block if block != None else self.setup.other.poselog_block, self.RECORD)
+        self.count = 0
+
+        self._file = None
+        self.lock = threading.Lock()
+
+        self.freeze()
+
+        path = os.path.dirname(fileName)
+        if path != "" and not os.path.exists(path):
+            os.makedirs(path)
+            MyLog.l(self.name, "Directory successfully created: " + path)
+
+        if append and os.path.exists(fileName) and os.path.getsize(fileName) > 0:
+            # check the header and cut off an incomplete last record
+            loadPoseLog(fileName)
+            size = os.path.getsize(fileName)
+            complete = size - (size - self.HEADER_SIZE) % self.RECORD.itemsize
+            self._file = open(fileName, "r+b")
+            if complete != size:
+                self._file.truncate(complete)
+                MyLog.e(self.name, "Incomplete last record removed: " + fileName)
+            self._file.seek(complete)
+        else:
+            self._file = open(fileName, "wb")
+            header = numpy.zeros(1, [("magic", "S8"), ("record_size", "<u4"), ("reserved", "<u4")])
+            header["magic"] = self.MAGIC
+            header["record_size"] = self.RECORD.itemsize
+            self._file.write(header.tostring())
+
+    def append(self, timestamp, pixel, location, angle, flags=0):
+        """
+        Add a record. pixel and location may be None if unknown. Ignored after close().
+        """
+        if pixel == None:
+            pixel = (-1, -1)
+        if location == None:
+            location = (-1, -1)
+        self.lock.acquire()
+        try:
+            if self._file == None:
+                return
+            self.block[self.count] = (timestamp, pixel[0], pixel[1], location[0], location[1], angle, flags)
+            self.count += 1
+
+            if self.count == len(self.block):
+                self.write()
+        finally:
+            self.lock.release()
+
+    def write(self):
+        """
+        Private. Write collected records to file, the lock has to be held.
+        """
+        if self._file != None and self.count > 0:
+            try:
+                self._file.write(self.block[:self.count].tostring())
+                self._file.flush()
+            except Exception as pokemon:
+                MyLog.e(self.name, "Exception in flush: " + pokemon.__str__())
+        self.count = 0
+
+    def flush(self):
+        """
+        Write collected records to file.
+        """
+        self.lock.acquire()
+        self.write()
+        self.lock.release()
+
+    def close(self):
+        """
+        Write collected records and close the file.
+        """
+        self.lock.acquire()
+        try:
+            if self._file != None:
+                self.write()
+                self._file.close()
+                self._file = None
+                MyLog.l(self.name, "File successfully written: " + self.fileName)
+        finally:
+            self.lock.release()
+
+def loadPoseLog(fileName):
+    """
+    Memory-map the records of a pose log as a NumPy structured array (read-only).
+    An incomplete last record (e.g. after a crash) is ignored.
+    """
+    header = numpy.fromfile(fileName, numpy.uint8, PoseLog.HEADER_SIZE).tostring()
+    if header[:8] != PoseLog.MAGIC:
+        raise Exception("Not a pose log: " + fileName)
+    if numpy.frombuffer(header[8:12], "<u4")[0] != PoseLog.RECORD.itemsize:
+        raise Exception("Record size of pose log does not match: " + fileName)
+
+    count = (os.path.getsize(fileName) - PoseLog.HEADER_SIZE) // PoseLog.RECORD.itemsize
+    if count == 0:
+        return numpy.zeros(0, PoseLog.RECORD)
+    return numpy.memmap(fileName, PoseLog.RECORD, "r", PoseLog.HEADER_SIZE, (count,))
@@ -0,0 +1,112 @@
+from utils.Freezeable import Freezeable
+from utils.Clock import monotonic
+from settings import Setup
+import numpy
+import threading
+
+class StageTimer(Freezeable):
+    """
+    Measures the time of the stages of a processing loop (e.g. the tracker's capture, blur,
+    convert, detect, transform, publish, draw and log) and the achieved loop rate.
+    lap(stage) adds the time since the previous lap to stage, so a stage which runs several
+    times per frame (e.g. blurring several search windows) is summed up. endFrame() stores
+    the times of the frame in a ring buffer of the last tracking.stats_window frames.
+    Examples:
+    -timer.startFrame()
+    -frame = grab(); timer.lap("capture")
+    -timer.endFrame()
+    -stats = timer.getStats()
+    """
+
+    def __init__(self, stages, window=None):
+        """
+        Constructor. stages is a list of stage names, window the number of frames of the statistics (tracking.stats_window by default).
+        """
+        self.setup = Setup()
+        self.name = "StageTimer"
+
+        self.stages = list(stages)
+        self.index = dict((stage, i) for i, stage in enumerate(self.stages))
+
+        # times of the current frame and of the last frames (ring buffer), start time of the frames
+        size = window if window != None else self.setup.tracking.stats_window
+        self.current = numpy.zeros(len(self.stages))
+        self.times = numpy.zeros((size, len(self.stages)))
+        self.starts = numpy.zeros(size)
+        self.slot = 0
+        self.count = 0
+
+        # start of the current frame and time of the last lap, None outside of a frame
+        self.frame_start = None
+        self.last = None
+
+        # frames in total and frames which missed their deadline (see late())
+        self.frames = 0
+        self.late_frames = 0
+
+        self.lock = threading.Lock()
+
+        self.freeze()
+
+    def startFrame(self):
+        """
+        Start timing a frame.
+        """
+        self.current[:] = 0
+        self.frame_start = self.last = monotonic()
+
+    def lap(self, stage):
+        """
+        Add the time since the previous lap (or the start of the frame) to stage. Ignored outside of a frame.
+        """
+        if self.last == None:
+            return
+        now = monotonic()
+        self.current[self.index[stage]] += now - self.last
+        self.last = now
+
+    def endFrame(self):
+        """
+        Store the times of the current frame.
+        """
+        if self.frame_start == None:
+            return
+        self.lock.acquire()
+        self.times[self.slot] = self.current
+        self.starts[self.slot] = self.frame_start
+        self.slot = (self.slot + 1) % len(self.starts)
+        self.count = min(self.count + 1, len(self.starts))
+        self.frames += 1
+        self.lock.release()
+        self.frame_start = self.last = None
+
+    def late(self):
+        """
+        Count a frame which missed its deadline.
+        """
+        self.late_frames += 1
+
+    def getStats(self):
+        """
+        Returns {"frames", "late", "rate": achieved frames per second, "busy": mean processing time (ms) per frame,
+        "stages": {stage: {"mean", "max"} in ms}} over the last window frames.
+        """
+        self.lock.acquire()
+        try:
+            order = (self.slot - self.count + numpy.arange(self.count)) % len(self.starts)
+            times = self.times[order] * 1000
+            starts = self.starts[order]
+        finally:
+            self.lock.release()
+
+        stats = {"frames": self.frames, "late": self.late_frames, "rate": 0.0, "busy": 0.0, "stages": {}}
+        if self.count > 1 and starts[-1] > starts[0]:
+            stats["rate"] = (self.count - 1) / (starts[-1] - starts[0])
+        if self.count > 0:
+            stats["busy"] = float(times.sum(axis=1).mean())
+        for i, stage in enumerate(self.stages):
+            if self.count > 0:
+                stats["stages"][stage] = {"mean": float(times[:, i].mean()), "max": float(times[:, i].max())}
+            else:
+                stats["stages"][stage] = {"mean": 0.0, "max": 0.0}
+        return stats
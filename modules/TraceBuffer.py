@@ -0,0 +1,162 @@
+from utils.Freezeable import Freezeable
+from utils import Log as MyLog
+from settings import Setup
+from cv2 import cv
+import cv2
+import numpy
+import os
+import threading
+
+class TraceBuffer(Freezeable):
+    """
+    Vector trace of the tracked robot: one record per frame (see RECORD) with the blue, green and median
+    marker positions in pixels and in arena coordinates (mm), appended to a growing NumPy array.
+    Nothing is drawn while tracking; render() and writeSvg() draw the trace when it is needed (e.g. at stop).
+    Segments connect the medians of consecutive records and are coloured (see tracking.trace_colour) by
+    -"flag":  white, yellow where the position was interpolated (like the old trace images)
+    -"time":  from blue (start) to red (end)
+    -"speed": from blue (standing) to red (fastest 5% of the segments)
+    Examples:
+    -trace.append(t, track_obj, box, interpolated)
+    -image = trace.render(background, "pixel")
+    -trace.writeSvg("trace.svg", "box", 1000, 1000)
+    """
+    RECORD = numpy.dtype([("timestamp", "<f8"),
+                          ("pixel", "<f4", (3, 2)),
+                          ("box", "<f4", (3, 2)),
+                          ("interpolated", "u1")])
+
+    # colours (BGR) of the "flag" mode and of the markers in debug mode
+    WHITE = (255, 255, 255)
+    YELLOW = (0, 255, 255)
+    BLUE = (255, 0, 0)
+
+    # number of colours of the "time" and "speed" modes
+    LEVELS = 64
+
+    def __init__(self, capacity=4096):
+        """
+        Constructor. capacity is the initial number of records, the buffer doubles when it is full.
+        """
+        self.setup = Setup()
+        self.name = "TraceBuffer"
+
+        self.records = numpy.zeros(capacity, self.RECORD)
+        self.count = 0
+        self.lock = threading.Lock()
+
+        self.freeze()
+
+    def append(self, timestamp, pixel, box, interpolated):
+        """
+        Add the positions of a frame. pixel and box are marker lists like Tracker.track_obj:
+        [blue, previous blue, green, previous green, median, previous median].
+        """
+        self.lock.acquire()
+        if self.count == len(self.records):
+            self.records = numpy.resize(self.records, 2 * len(self.records))
+        record = self.records[self.count]
+        record["timestamp"] = timestamp
+        record["pixel"] = (pixel[0], pixel[2], pixel[4])
+        record["box"] = (box[0], box[2], box[4])
+        record["interpolated"] = interpolated
+        self.count += 1
+        self.lock.release()
+
+    def getRecords(self):
+        """
+        Returns a copy of all records.
+        """
+        self.lock.acquire()
+        try:
+            return self.records[:self.count].copy()
+        finally:
+            self.lock.release()
+
+    def getColours(self, records, mode):
+        """
+        Private. Returns the BGR colour (N - 1 x 3, uint8) of each segment of records.
+        """
+        segments = len(records) - 1
+        if mode == "flag":
+            colours = numpy.empty((segments, 3), numpy.uint8)
+            colours[:] = self.WHITE
+            colours[records["interpolated"][1:] != 0] = self.YELLOW
+            return colours
+
+        if mode == "time":
+            value = records["timestamp"][1:] - records["timestamp"][0]
+        elif mode == "speed":
+            dt = numpy.diff(records["timestamp"])
+            distance = numpy.hypot(*numpy.diff(records["box"][:, 2], axis=0).T)
+            value = numpy.where(dt > 0, distance / numpy.maximum(dt, 1e-6), 0)
+            value = numpy.minimum(value, numpy.percentile(value, 95))
+        else:
+            raise Exception("Unknown trace colour mode: " + str(mode))
+
+        # quantize to LEVELS hues from blue (120) to red (0)
+        top = value.max()
+        level = numpy.zeros(segments, int) if top <= 0 else numpy.minimum((value / top * self.LEVELS).astype(int), self.LEVELS - 1)
+        hues = numpy.zeros((1, self.LEVELS, 3), numpy.uint8)
+        hues[0, :, 0] = numpy.linspace(120, 0, self.LEVELS)
+        hues[0, :, 1:] = 255
+        return cv2.cvtColor(hues, cv.CV_HSV2BGR)[0][level]
+
+    def render(self, background, space, mode=None, debug=False):
+        """
+        Returns a copy of background with the trace drawn into it.
+        space is "pixel" or "box" (arena coordinates), mode the colour mode, tracking.trace_colour by default.
+        debug also draws the markers of each record.
+        """
+        records = self.getRecords()
+        image = background.copy()
+        if len(records) < 2:
+            return image
+
+        points = numpy.floor(records[space] + 0.5).astype(int).tolist()
+        colours = self.getColours(records, mode if mode != None else self.setup.tracking.trace_colour)
+
+        if debug:
+            for i in range(1, len(records)):
+                cv2.circle(image, tuple(points[i][0]), 5, self.BLUE, 1)
+                cv2.circle(image, tuple(points[i][1]), 5, self.YELLOW, 1)
+                cv2.line(image, tuple(points[i - 1][0]), tuple(points[i][0]), self.BLUE, 1)
+                cv2.line(image, tuple(points[i - 1][1]), tuple(points[i][1]), self.YELLOW, 1)
+
+        colours = colours.tolist()
+        for i in range(1, len(records)):
+            cv2.line(image, tuple(points[i - 1][2]), tuple(points[i][2]), tuple(colours[i - 1]), 1)
+        return image
+
+    def writeSvg(self, fileName, space, width, height, mode=None):
+        """
+        Write the trace as SVG (width x height, in pixels or mm like space). Consecutive segments
+        of the same colour are joined into one polyline.
+        """
+        records = self.getRecords()
+        try:
+            path = os.path.dirname(fileName)
+            if path != "" and not os.path.exists(path):
+                os.makedirs(path)
+
+            _file = open(fileName, "w")
+            _file.write('<svg xmlns="http://www.w3.org/2000/svg" width="%d" height="%d" viewBox="0 0 %d %d">\n' % (width, height, width, height))
+            _file.write('<rect width="100%" height="100%" fill="black"/>\n')
+
+            if len(records) > 1:
+                medians = records[space][:, 2]
+                colours = self.getColours(records, mode if mode != None else self.setup.tracking.trace_colour)
+
+                # runs of segments with the same colour: segments start:end
+                change = numpy.flatnonzero(numpy.any(colours[1:] != colours[:-1], axis=1)) + 1
+                bounds = numpy.concatenate(([0], change, [len(colours)]))
+                for start, end in zip(bounds[:-1], bounds[1:]):
+                    b, g, r = colours[start]
+                    points = " ".join("%.1f,%.1f" % (p[0], p[1]) for p in medians[start:end + 1])
+                    _file.write('<polyline points="%s" fill="none" stroke="#%02x%02x%02x" stroke-width="1"/>\n' % (points, r, g, b))
+
+            _file.write("</svg>\n")
+            _file.close()
+            MyLog.l(self.name, "File successfully written: " + fileName)
+        except Exception as pokemon:
+            MyLog.e(self.name, "Exception in writeSvg: " + pokemon.__str__())
@@ -3,6 +3,18 @@ from utils.Freezeable import Freezeable
 from utils import Log as MyLog
 from settings import Setup
 from modules.dataType import Odometry
+from modules.ArenaFrame import getArenaFrame
+from modules.MarkerClassifier import MarkerClassifier
+from modules.FrameGrabber import FrameGrabber
+from modules.PoseHistory import PoseHistory
+from modules.PoseLog import PoseLog
+from modules.DiagnosticWriter import DiagnosticWriter
+from modules.MultiRobotTracker import MultiRobotTracker
+from modules.MotionFilter import MotionFilter
+from modules.FramePipeline import FramePipeline
+from modules.StageTimer import StageTimer
+from modules.TraceBuffer import TraceBuffer
+from utils.Clock import monotonic
 import cv2
 import numpy
 import os
@@ -19,9 +31,11 @@ class Tracker(Freezeable, threading.Thread):
     getOdometry(): Returns current odometry of the tracked object (i.e. the robot).
     """
 
-    def __init__(self):
+    def __init__(self, cap=None):
         """
-        Constructor. Initializes video capture
+        Constructor. Initializes video capture.
+        cap replaces the tracking camera, e.g. by a recorded or synthetic frame source
+        (anything with isOpened() and read()). It is read in the tracking thread.
         """
         threading.Thread.__init__(self)
         
@@ -31,20 +45,63 @@ class Tracker(Freezeable, threading.Thread):
         self.setup = Setup()
         # class variables
         self.cap = None
+        self.grabber = None
         # tuples
         self.calibration = None
         self.track_obj = None
         self.box = None
         # Matrixes
         self.frame = None
+        # time the current frame was captured
+        self.frame_time = None
+        # backgrounds of the trace images (the arena is drawn into trace at calibration)
         self.trace = None
         self.traceCvt = None
+        # tracked positions of every frame, the trace images are rendered from them (see renderTrace())
+        self.trace_buffer = TraceBuffer()
         # others
         self.odometry = Odometry()
+        # timestamped poses, see getOdometryAt()
+        self.history = PoseHistory()
         self.tracking_file = None
+        self.pose_log = None
+        # shared memory the poses are published to, if the tracker runs in its own process (see TrackerProcess)
+        self.publisher = None
+        # writes images of tracking errors in its own thread
+        self.diagnostics = DiagnosticWriter(self.setup.filesystem.file_dir + self.setup.filesystem.cam_dir + "diagnostics/")
         self.calibration_file = None
         self.calibrated = False
         self.robot_located = False
+        # pixel <-> arena coordinate transform shared by all modules
+        self.arena_frame = getArenaFrame()
+        # HSV ranges (low, high) of the robot markers
+        self.blue_range = ((90, 100, 90), (110, 255, 255))
+        self.green_range = ((40, 140, 90), (55, 255, 255))
+        self.yellow_range = ((25, 140, 110), (35, 255, 255))
+        # lookup table classifiers for the robot markers and the calibration markers (see tracking.use_lut)
+        self.classifier = MarkerClassifier([("blue", self.blue_range[0], self.blue_range[1])
+                                            , ("green", self.green_range[0], self.green_range[1])])
+        self.calibration_classifier = MarkerClassifier([("yellow", self.yellow_range[0], self.yellow_range[1])])
+        # crop, blur, conversion and thresholding of frames into preallocated buffers
+        self.pipeline = FramePipeline()
+        # time of each stage of updatePosition() and achieved tracking rate, see getLoopStats()
+        self.timer = StageTimer(("capture", "blur", "convert", "detect", "transform", "publish", "draw", "log"))
+        # tracks all robots of tracking.robots in one pass per frame
+        if len(self.setup.tracking.robots) > 0 and self.setup.tracking.robot_id not in self.setup.tracking.robots:
+            raise Exception("tracking.robot_id (" + str(self.setup.tracking.robot_id) + ") has to be one of the ids of tracking.robots: "
+                            + str(sorted(self.setup.tracking.robots.keys())))
+        self.multi_tracker = MultiRobotTracker() if len(self.setup.tracking.robots) > 0 else None
+        # motion filters of the blue and the green marker, predict lost markers (see tracking.max_prediction)
+        self.motion = [MotionFilter(), MotionFilter()]
+        # number of frames since both markers were tracked
+        self.lost_frames = 0
+        # number of frames in a row the camera delivered no frame
+        self.missed_frames = 0
+        # region of interest tracking: True while the positions of both markers are known or predicted
+        self.roi_lock = False
+        # region of interest statistics: frames, frames tracked within the ROI, fallbacks after losing lock,
+        # frames tracked coarse-to-fine, frames tracked on the full frame and frames with a predicted marker
+        self.roi_stats = {"frames": 0, "roi": 0, "fallbacks": 0, "pyramid": 0, "full": 0, "predicted": 0}
         # for threading purposes
         self.stopped = False
         # see utils.Freezeable
@@ -80,8 +137,10 @@ class Tracker(Freezeable, threading.Thread):
         self.trace = numpy.asarray(traceMat)
         self.traceCvt = numpy.asarray(traceCvtMat)  
             
+        self.diagnostics.start()
+        
         # VideoCapture, try to open the camera     
-        self.cap = cv2.VideoCapture(self.setup.cam.track_id)
+        self.cap = cap if cap != None else cv2.VideoCapture(self.setup.cam.track_id)
         
         # log success
         if self.cap.isOpened():
@@ -89,11 +148,21 @@ class Tracker(Freezeable, threading.Thread):
             
             # grab a frame for testing purposes
             flag, self.frame = self.cap.read()
+            
+            # grab frames continuously in their own thread
+            if self.setup.tracking.capture_thread and cap == None:
+                self.grabber = FrameGrabber(self.cap)
+                self.grabber.start()
         else:
             MyLog.e(self.name, "Failed to open camera!")
             
-        # check if storing the tracking data is enabled
-        if self.setup.other.storepos:    
+        # check if storing the tracking data is enabled. Binary pose log (see PoseLog) or .txt file
+        if self.setup.other.storepos and self.setup.other.poselog:
+            try:
+                self.pose_log = PoseLog(self.setup.filesystem.file_dir + "tracking.bin")
+            except Exception as pokemon:
+                MyLog.e(self.name, "Exception with file: " + pokemon.__str__())
+        elif self.setup.other.storepos:    
             # open and prepare .txt file to store tracking data. Create directory if needed   
             try:
                 # open and prepare .txt file to store tracking data. Create directory if needed
@@ -119,11 +188,27 @@ class Tracker(Freezeable, threading.Thread):
         """
         Private. Runs in its own thread.
         """
+        # frames are processed at tracking.target_rate: each frame has a deadline on a monotonic clock,
+        # so the rate doesn't depend on the processing time. 0: as fast as frames arrive
+        period = 1.0 / self.setup.tracking.target_rate if self.setup.tracking.target_rate > 0 else 0
+        deadline = monotonic()
+        
         while not self.stopped:
+            # the capture thread was stopped: there will be no more frames
+            if self.grabber != None and self.grabber.stopped:
+                break
             self.updatePosition()
             
-            # let thread wait 30 ms, so that it doesn't do to much work (30+ updates per second should be enough)
-            time.sleep(0.03)
+            if period > 0:
+                deadline += period
+                remaining = deadline - monotonic()
+                if remaining > 0:
+                    time.sleep(remaining)
+                else:
+                    self.timer.late()
+                    # more than a frame behind: start again from now instead of catching up with a burst of frames
+                    if remaining < -period:
+                        deadline = monotonic()
     
     def stop(self):
         """
@@ -135,15 +220,23 @@ class Tracker(Freezeable, threading.Thread):
         if not self.stopped:
             self.stopped = True
             
-            # write unconverted trace image. If directory doesn't exist create it and write to file
-            self.imwriteFile(self.setup.filesystem.file_dir + self.setup.filesystem.cam_dir
-                             , "trace.png"
-                             , self.trace)
-            self.imwriteFile(self.setup.filesystem.file_dir + self.setup.filesystem.cam_dir
-                             , "traceCvt.png"
-                             , self.traceCvt)
+            if self.grabber != None:
+                self.grabber.stop()
+                MyLog.l(self.name, "Capture statistics: " + str(self.grabber.getStats()))
+            
+            # render and write trace images. If directory doesn't exist create it and write to file
+            self.writeTrace()
+            
+            MyLog.l(self.name, "Tracking rate: " + self.formatLoopStats())
+            
+            # write remaining diagnostic images
+            self.diagnostics.stop()
+            MyLog.l(self.name, "Diagnostic images: " + str(self.diagnostics.getStats()))
             
             # close open files
+            if self.pose_log != None:
+                self.pose_log.close()
+            
             if self.tracking_file != None:
                 try:
                     self.tracking_file.close()
@@ -183,18 +276,10 @@ class Tracker(Freezeable, threading.Thread):
         self.calibration_file = open(path + "calibration_pts.txt", "w")
         self.calibration_file.write("calibration[i][0]\t" + "calibration[i][1]\n")
         
-        # #try:
-        # grab a frame as NumPy array
-        flag, self.frame = self.cap.read()
-        
-        # throw an error if  there is none
-        if self.frame == None:
+        # grab and crop a frame
+        if not self.nextFrame():
             raise Exception("Camera could not grab a frame.")
         
-        # crop offsets of picture
-        self.frame = self.frame[self.setup.image.tracking.offy:self.setup.image.tracking.offy + self.setup.image.tracking.height
-                                , self.setup.image.tracking.offx:self.setup.image.tracking.offx + self.setup.image.tracking.width]
-        
         quarter = None
         pos = None
         
@@ -223,18 +308,15 @@ class Tracker(Freezeable, threading.Thread):
         m_x = [-1, -1, 1, 1];
         m_y = [-1, 1, 1, -1];
 
-        # start manipulating frame: Make a copy of self.frame
-        frameCopy = numpy.empty_like(self.frame)
-        frameCopy[:] = self.frame
+        # blur the image to reduce noise. self.frame stays untouched for the calibration image
+        frameCopy = self.pipeline.blur(self.frame)
 
-        # blur the image to reduce noise
-        frameCopy = cv2.GaussianBlur(frameCopy
-                                     , (0, 0)
-                                     , 2)
-
-        # convert to HSV channels, because a thresholding by hue catches graduated colors better than a RGB/BGR thresholding
-        frameCopy = cv2.cvtColor(frameCopy
-                                 , cv.CV_BGR2HSV)
+        if self.setup.tracking.use_lut:
+            # label yellow pixels of the whole frame at once
+            frameCopy = self.pipeline.classify(self.calibration_classifier, frameCopy)
+        else:
+            # convert to HSV channels, because a thresholding by hue catches graduated colors better than a RGB/BGR thresholding
+            frameCopy = self.pipeline.toHsv(frameCopy)
             
         # #try:
         # track each marker
@@ -247,9 +329,12 @@ class Tracker(Freezeable, threading.Thread):
   
             # get position of marker
             try:
-                pos = self.getPosOfMarker(quarter
-                                          , (25, 140, 110)
-                                          , (35, 255, 255))
+                if self.setup.tracking.use_lut:
+                    pos = self.validatePos(self.calibration_classifier.getCentroids(quarter)["yellow"])
+                else:
+                    pos = self.getPosOfMarker(quarter
+                                              , self.yellow_range[0]
+                                              , self.yellow_range[1])
                 
                 if self.setup.other.debug:
                     # draw a circle on the calibration image where the marker has been found
@@ -308,6 +393,7 @@ class Tracker(Freezeable, threading.Thread):
             raise Exception("There are markers missing. Restart calibration to ensure correct results.")
         else:
             # calibration finished
+            self.arena_frame.setCalibration(self.calibration)
             self.calibrated = True
    
     def imwriteFile(self, path, fileName, _file):
@@ -349,7 +435,7 @@ class Tracker(Freezeable, threading.Thread):
         y = None
         # #try:
         # filtering the colors to be in a specific range [low, high]
-        img = cv2.inRange(img, low, high)
+        img = self.pipeline.threshold(img, low, high)
         
         # calculate moments to estimate position of object
         mmts = cv2.moments(img)
@@ -363,18 +449,23 @@ class Tracker(Freezeable, threading.Thread):
         except ZeroDivisionError:
             y = 0
             
-        # check if position is plausible: Is the detected position within our image?
-        if ((x > 0) & (x < self.setup.image.tracking.width)):
-            pos[0] = x
-        else:
+        return self.validatePos([x, y])
+    
+    def validatePos(self, p):
+        """
+        Private. Check if a marker position is plausible: Is the detected position within our image?
+        p is None if the marker was not found. Returns the position.
+        """
+        if p == None:
+            raise Exception("marker could not be tracked.")
+        
+        if not ((p[0] > 0) & (p[0] < self.setup.image.tracking.width)):
             raise Exception("x position of marker could not be tracked.")
         
-        if ((y > 0) & (y < self.setup.image.tracking.height)):
-            pos[1] = y
-        else:
+        if not ((p[1] > 0) & (p[1] < self.setup.image.tracking.height)):
             raise Exception("y position of marker could not be tracked.")
 
-        return pos
+        return [p[0], p[1]]
     
     def loadCalibration(self):
         """
@@ -419,6 +510,7 @@ class Tracker(Freezeable, threading.Thread):
                         self.calibration[i - 1][1] = int(self.calibration[i - 1][1])
                 i = i + 1
             
+            self.arena_frame.setCalibration(self.calibration)
             self.calibrated = True
             MyLog.l(self.name, "Calibration successfully loaded from file!")
         except Exception as pokemon:
@@ -433,45 +525,34 @@ class Tracker(Freezeable, threading.Thread):
     def calcPosInBox(self, p, c):
         """
         Private. Calculate positions of given points within the given calibration points.
-        Assumes that the box is a rectangle. Uses law of cosines. 
-        """
-        # first we need the distance between marker 0 to 1 and 0 to 3
-        d01 = self.getDistance((c[0][0], c[0][1])
-                               , (c[1][0], c[1][1]))
-        d03 = self.getDistance((c[0][0], c[0][1])
-                               , (c[3][0], c[3][1]))
-        
-        # create a list which will save the new coordinates of p
-        r = self.createList(len(p))
-        
-        # calculate the new x- and y-position in the box with the law of cosines for each point in p
-        for i in range(0, len(p)):
-            # calculate x as integer
-            r[i][0] = int(math.floor(((d03 ** 2) + (self.getDistance((c[0][0], c[0][1])
-                                                                     , (p[i][0], p[i][1])) ** 2) 
-                                      - self.getDistance((p[i][0], p[i][1])
-                                                      , (c[3][0], c[3][1])) ** 2) / (2 * d03) * self.setup.arena.boxwidth / d03 + 0.5))
-            # calculate y as integer
-            r[i][1] = int(math.floor(((d01 ** 2) + (self.getDistance((c[0][0], c[0][1])
-                                                                     , (p[i][0], p[i][1])) ** 2) 
-                                      - (self.getDistance((p[i][0], p[i][1])
-                                                       , (c[1][0], c[1][1])) ** 2)) / (2 * d01) * self.setup.arena.boxheight / d01 + 0.5))
-        return r
+        Uses the homography of the shared arena frame (one matrix multiplication for all points).
+        """
+        # the arena frame only recalculates its homography if the calibration points changed
+        self.arena_frame.setCalibration(c)
+        
+        # transform all points at once and round to integers
+        return numpy.floor(self.arena_frame.toArena(p) + 0.5).astype(int).tolist()
     
-    def drawTrace(self, trace, p, interpolated):
+    def renderTrace(self, mode=None):
         """
-        Private. Draw a trace given by a vector into a given image.
+        Returns the trace images (unconverted, converted) of all tracked positions.
+        mode is the colour mode of the trace ("flag", "time" or "speed"), tracking.trace_colour by default.
         """
-        # draw circles and connect them with lines
-        if self.setup.other.debug:
-            cv2.circle(trace, (p[0][0], p[0][1]), 5, (255, 0, 0), 1)
-            cv2.circle(trace, (p[2][0], p[2][1]), 5, (0, 255, 255), 1)
-            cv2.line(trace, (p[1][0], p[1][1]), (p[0][0], p[0][1]), (255, 0, 0), 1)
-            cv2.line(trace, (p[3][0], p[3][1]), (p[2][0], p[2][1]), (0, 255, 255), 1)
-        if interpolated:
-            cv2.line(trace, (int(p[5][0]), int(p[5][1])), (int(p[4][0]), int(p[4][1])), (0, 255, 255), 1)
-        else:
-            cv2.line(trace, (int(p[5][0]), int(p[5][1])), (int(p[4][0]), int(p[4][1])), (255, 255, 255), 1)
+        return (self.trace_buffer.render(self.trace, "pixel", mode, self.setup.other.debug)
+                , self.trace_buffer.render(self.traceCvt, "box", mode, self.setup.other.debug))
+    
+    def writeTrace(self):
+        """
+        Private. Render the trace images and write them (trace.png, traceCvt.png and, with tracking.trace_svg, .svg files).
+        """
+        path = self.setup.filesystem.file_dir + self.setup.filesystem.cam_dir
+        trace, traceCvt = self.renderTrace()
+        self.imwriteFile(path, "trace.png", trace)
+        self.imwriteFile(path, "traceCvt.png", traceCvt)
+        
+        if self.setup.tracking.trace_svg:
+            self.trace_buffer.writeSvg(path + "trace.svg", "pixel", self.setup.image.tracking.width, self.setup.image.tracking.height)
+            self.trace_buffer.writeSvg(path + "traceCvt.svg", "box", self.setup.arena.boxwidth, self.setup.arena.boxheight)
     
     def updatePosition(self):
         """
@@ -481,102 +562,126 @@ class Tracker(Freezeable, threading.Thread):
             MyLog.l(self.name, "Tracker is not calibrated yet. Initializing calibration...")
             self.calibrate()
         
-        angle = 0
-        newPos = self.createList(2)
-        
-        # grab a frame as NumPy array
-        flag, self.frame = self.cap.read()
-
-        # throw an error if there is none
-        if self.frame == None:
-            raise Exception("Camera could not grab a frame.")
+        # grab and crop a frame. Without one (camera hiccup or stopped grabber) the markers are predicted
+        self.timer.startFrame()
+        if not self.nextFrame():
+            self.missFrame()
+            return
+        if self.missed_frames > 0:
+            MyLog.l(self.name, "Camera delivered frames again after " + str(self.missed_frames) + " missed frames.")
+            self.missed_frames = 0
+        self.timer.lap("capture")
 
-        # crop offsets of picture
-        self.frame = self.frame[self.setup.image.tracking.offy:self.setup.image.tracking.offy + self.setup.image.tracking.height
-                                , self.setup.image.tracking.offx:self.setup.image.tracking.offx + self.setup.image.tracking.width]
-
-        # if the frame was not empty, we make a copy and start manipulating it
-        img = numpy.empty_like(self.frame)
-        img[:] = self.frame
-
-        # blur the image to reduce noise
-        img = cv2.GaussianBlur(img, (0, 0), 2)
-
-        # convert to HSV channels, because a thresholding by hue catches graduated colors better than a RGB/BGR thresholding
-        img = cv2.cvtColor(img, cv.CV_BGR2HSV)
-
-        # get current position of blue marker
-        # DEPRECATED: newPos[0] = self.getPosOfMarker(img, (85, 150, 100), (100, 255, 255))
-        try:
-            newPos[0] = self.getPosOfMarker(img
-                                            , (90, 100, 90)
-                                            , (110, 255, 255))
-        except Exception, pokemon:
-            newPos[0] = [-1, -1]
-            
-        # get current position of green marker
-        # DEPRECATED: newPos[1] = self.getPosOfMarker(img, (45, 150, 100), (55, 255, 255))
-        try:
-            newPos[1] = self.getPosOfMarker(img
-                                            , (40, 140, 90)
-                                            , (55, 255, 255))
-        except:
-            newPos[1] = [-1, -1]
-            
-        # initialize tracking error flag
-        trackingError = False
+        self.roi_stats["frames"] += 1
         
-        # check if a marker could not be tracked
-        if newPos[0][0] < 0 or newPos[0][1] < 0 or newPos[1][0] < 0 or newPos[1][1] < 0:
-            # find out which marker could not be tracked
-            marker = None
-            
-            if newPos[0][0] < 0 or newPos[0][1] < 0:
-                marker = "blue"
+        newPos = None
+        if self.multi_tracker != None:
+            # track all robots in one pass, the markers of tracking.robot_id are handled below
+            self.multi_tracker.update(self.frame, self.frame_time)
+            newPos = self.multi_tracker.getMarkers(self.setup.tracking.robot_id)
+        
+        # search markers only in a window around the predicted robot position, if we know where the robot is
+        elif self.setup.tracking.use_roi and self.roi_lock:
+            newPos = self.findMarkersInRoi()
+            if self.isFound(newPos):
+                self.roi_stats["roi"] += 1
+            elif self.lost_frames > 0:
+                # a marker is predicted already, searching the full frame in every frame of a dropout would stall the loop
+                self.roi_stats["predicted"] += 1
             else:
-                marker = "green"
-                
-            MyLog.e(self.name, "Could not track " + marker + " marker.")
-            
-            # draw circles on current marker positions and output a picture 
-            cv2.circle(self.frame, (newPos[0][0], newPos[0][1]), 10, (255, 0, 0), 2)
-            cv2.circle(self.frame, (newPos[1][0], newPos[1][1]), 10, (0, 255, 0), 2)
-            self.imwriteFile(self.setup.filesystem.file_dir + self.setup.filesystem.cam_dir, "markerNotTracked.jpg", self.frame)
+                # lost lock, search the full frame
+                self.roi_stats["fallbacks"] += 1
+                newPos = None
+        
+        # search coarse-to-fine, if possible
+        if newPos == None and self.setup.tracking.pyramid_levels > 0:
+            newPos = self.findMarkersPyramid()
+            if newPos != None:
+                self.roi_stats["pyramid"] += 1
+        
+        if newPos == None:
+            self.roi_stats["full"] += 1
+            newPos = self.findMarkers(self.frame, (0, 0))
             
-            # set error flag
-            trackingError = True
+        # markers which could be tracked
+        found = [newPos[0][0] >= 0 and newPos[0][1] >= 0, newPos[1][0] >= 0 and newPos[1][1] >= 0]
+        event = None
+        
+        if not (found[0] and found[1]):
+            event = "markerNotTracked"
             
-        # check if distance between the two markers is too high (if both markers could be tracked)
-        if not trackingError and self.getDistance((newPos[0][0], newPos[0][1]), (newPos[1][0], newPos[1][1])) > self.setup.arena.markerdist:
-            MyLog.e(self.name, "Robot markers too distant. There was probably a mistake trying to detect a marker.")
+        # check if distance between the two markers is too high (if both markers could be tracked). We don't know which one is wrong
+        elif self.getDistance((newPos[0][0], newPos[0][1]), (newPos[1][0], newPos[1][1])) > self.setup.arena.markerdist:
+            event = "tooDistant"
+            found = [False, False]
             
-            # set error flag
-            trackingError = True
+        trackingError = event != None
+        
+        # report a tracking error once when it starts and once when it ends, not in every frame
+        if trackingError and self.lost_frames == 0:
+            if event == "tooDistant":
+                MyLog.e(self.name, "Robot markers too distant. There was probably a mistake trying to detect a marker.")
+            else:
+                MyLog.e(self.name, "Could not track " + ("blue" if not found[0] else "green") + " marker.")
             
             # draw circles on current marker positions and output a picture 
             cv2.circle(self.frame, (newPos[0][0], newPos[0][1]), 10, (255, 0, 0), 2)
             cv2.circle(self.frame, (newPos[1][0], newPos[1][1]), 10, (0, 255, 0), 2)
-            self.imwriteFile(self.setup.filesystem.file_dir + self.setup.filesystem.cam_dir + "calibration/"
-                             , "tooDistant.jpg", self.frame)
-            
-            
-        # handle tracking error
-        if trackingError:
-            # if we have trace data, try linear interpolation to guess the current position
-            if self.track_obj[1][0] >= 0 or self.track_obj[3][0] >= 0:
-                newPos[0][0] = self.track_obj[0][0] + (self.track_obj[0][0] - self.track_obj[1][0])
-                newPos[0][1] = self.track_obj[0][1] + (self.track_obj[0][1] - self.track_obj[1][1])
-                newPos[1][0] = self.track_obj[2][0] + (self.track_obj[2][0] - self.track_obj[3][0])
-                newPos[1][1] = self.track_obj[2][1] + (self.track_obj[2][1] - self.track_obj[3][1])
-                
-                MyLog.l(self.name, "Interpolated position 1: " + str(newPos[0][0]) + "," + str(newPos[0][1]))
-                MyLog.l(self.name, "Interpolated position 2: " + str(newPos[1][0]) + "," + str(newPos[1][1]))
-            # else, restore the last known position
+            self.diagnostics.submit(event, self.frame)
+        elif not trackingError and self.lost_frames > 0:
+            MyLog.l(self.name, "Tracked both markers again after " + str(self.lost_frames) + " frames.")
+        
+        self.lost_frames = self.lost_frames + 1 if trackingError else 0
+        if self.lost_frames == self.setup.tracking.max_prediction + 1:
+            MyLog.e(self.name, "Could not track robot for " + str(self.lost_frames) + " frames. Restored last position.")
+        
+        # correct the motion filters with tracked markers, predict the others
+        for i in range(0, 2):
+            if found[i]:
+                self.motion[i].update(self.frame_time, newPos[i])
             else:
-                newPos[0] = self.track_obj[0]
-                newPos[1] = self.track_obj[2]
-                MyLog.l(self.name, "Cannot interpolate. Restored last position.")
+                predicted = self.motion[i].coast(self.frame_time)
+                if predicted != None:
+                    newPos[i] = [int(math.floor(predicted[0] + 0.5)), int(math.floor(predicted[1] + 0.5))]
+                else:
+                    # never tracked: restore the last known position
+                    newPos[i] = list(self.track_obj[2 * i])
+        
+        # keep the region of interest locked as long as both markers are tracked or predicted
+        self.roi_lock = self.motion[0].isPredicting() and self.motion[1].isPredicting()
+        
+        self.timer.lap("detect")
+        
+        self.adoptPosition(newPos)
+        self.odometry.confidence = self.getConfidence()
+        self.timer.lap("transform")
+        
+        self.history.append(self.frame_time, self.odometry.location, self.odometry.angle)
+        if self.publisher != None:
+            self.publisher.publish(self.odometry, self.robot_located)
+        self.timer.lap("publish")
+        
+        # store input data and aligned data for the trace images
+        self.trace_buffer.append(self.frame_time, self.track_obj, self.box, trackingError)
+        self.timer.lap("draw")
+        
+        # write current position and angle in log-file
+        try:
+            if self.pose_log != None:
+                self.pose_log.append(self.frame_time, self.track_obj[4], self.box[4], self.odometry.angle
+                                     , PoseLog.FLAG_INTERPOLATED if trackingError else 0)
+            elif self.setup.other.storepos:
+                self.tracking_file.write(str(self.box[4][0]) + "\t" + str(self.box[4][1]) + "\t" + str(self.odometry.angle) + "\n")
+        except Exception, pokemon:
+            MyLog.e(self.name, pokemon)
+        
+        self.timer.lap("log")
+        self.timer.endFrame()
         
+    def adoptPosition(self, newPos):
+        """
+        Private. Adopt new marker positions: update the tracked markers, their median and the robots' odometry.
+        """
         # save the last position, adopt the new position 
         self.track_obj[1][0] = self.track_obj[0][0]
         self.track_obj[1][1] = self.track_obj[0][1]
@@ -599,6 +704,7 @@ class Tracker(Freezeable, threading.Thread):
         # update the robots' odometry
         self.odometry.location[0] = self.box[4][0]
         self.odometry.location[1] = self.box[4][1]
+        self.odometry.timestamp = self.frame_time
         
         # next, calculate the robots' angle. Determine distance between blue and green marker
         dist = self.getDistance((self.box[0][0], self.box[0][1]), (self.box[2][0], self.box[2][1]))
@@ -616,24 +722,243 @@ class Tracker(Freezeable, threading.Thread):
                 
             self.odometry.angle = math.floor(angle + 0.5)
         
-        # draw trace from input data and from aligned data
-        self.drawTrace(self.trace
-                       , self.track_obj
-                       , trackingError)
-        self.drawTrace(self.traceCvt
-                       , self.box
-                       , trackingError)
+    def findMarkers(self, frame, offset, blur=True):
+        """
+        Private. Blur and convert frame (or a region of it) and find the blue and the green marker.
+        offset (x, y) of the region is added to the positions. Markers which could not be found are at [-1, -1].
+        """
+        newPos = self.createList(2)
+        
+        # blur the image to reduce noise
+        self.timer.lap("detect")
+        img = self.pipeline.blur(frame) if blur else frame
+        self.timer.lap("blur")
         
-        # write current position and angle in log-file
+        if self.setup.tracking.use_lut:
+            # label all marker pixels in one pass and get the centroids of all markers
+            labels = self.pipeline.classify(self.classifier, img)
+            self.timer.lap("convert")
+            centroids = self.classifier.getCentroids(labels, offset)
+            for i, marker in enumerate(("blue", "green")):
+                try:
+                    newPos[i] = self.validatePos(centroids[marker])
+                except Exception:
+                    newPos[i] = [-1, -1]
+            return newPos
+
+        # convert to HSV channels, because a thresholding by hue catches graduated colors better than a RGB/BGR thresholding
+        img = self.pipeline.toHsv(img)
+        self.timer.lap("convert")
+
+        # get current position of blue marker
+        # DEPRECATED: newPos[0] = self.getPosOfMarker(img, (85, 150, 100), (100, 255, 255))
         try:
-            if self.setup.other.storepos:
-                self.tracking_file.write(str(self.box[4][0]) + "\t" + str(self.box[4][1]) + "\t" + str(self.odometry.angle) + "\n")
+            pos = self.getPosOfMarker(img, self.blue_range[0], self.blue_range[1])
+            newPos[0] = [pos[0] + offset[0], pos[1] + offset[1]]
         except Exception, pokemon:
-            MyLog.e(self.name, pokemon)
+            newPos[0] = [-1, -1]
+            
+        # get current position of green marker
+        # DEPRECATED: newPos[1] = self.getPosOfMarker(img, (45, 150, 100), (55, 255, 255))
+        try:
+            pos = self.getPosOfMarker(img, self.green_range[0], self.green_range[1])
+            newPos[1] = [pos[0] + offset[0], pos[1] + offset[1]]
+        except:
+            newPos[1] = [-1, -1]
+        
+        return newPos
+    
+    def findMarkersInRoi(self):
+        """
+        Private. Find both markers in a window around the robots' position predicted by the motion filters.
+        Markers which could not be found within the window are at [-1, -1].
+        """
+        predicted = [self.motion[i].predict(self.frame_time) for i in range(0, 2)]
+        c_x = (predicted[0][0] + predicted[1][0]) / 2.0
+        c_y = (predicted[0][1] + predicted[1][1]) / 2.0
+        
+        # window grows with the distance moved since the last measurement and with every predicted frame
+        radius = self.setup.tracking.roi_radius
+        for i in range(0, 2):
+            moved = max(abs(predicted[i][0] - self.motion[i].position[0]), abs(predicted[i][1] - self.motion[i].position[1]))
+            radius = max(radius, self.setup.tracking.roi_radius * (1 + self.motion[i].getMisses() / 2.0) + moved)
+        
+        newPos = self.findMarkersInWindow(c_x, c_y, radius, True)
+        return newPos if newPos != None else self.createList(2)
+    
+    def findMarkersPyramid(self):
+        """
+        Private. Find candidates of both markers in a downsampled frame (tracking.pyramid_levels times by 2),
+        then find the markers at full resolution in a window around the candidates.
+        Returns None if a marker could not be found.
+        """
+        levels = self.setup.tracking.pyramid_levels
+        scale = 2 ** levels
+        
+        # pyrDown smoothes before downsampling, so the coarse frame doesn't need another blur
+        self.timer.lap("detect")
+        img = self.pipeline.pyrDown(self.frame, levels)
+        self.timer.lap("blur")
+        
+        coarse = self.findMarkers(img, (0, 0), False)
+        if coarse[0][0] < 0 or coarse[1][0] < 0:
+            return None
+        
+        # window around both candidates, enlarged by the inaccuracy of the coarse positions
+        c_x = (coarse[0][0] + coarse[1][0] + 1) * scale / 2.0
+        c_y = (coarse[0][1] + coarse[1][1] + 1) * scale / 2.0
+        radius = max(abs(coarse[0][0] - coarse[1][0]), abs(coarse[0][1] - coarse[1][1])) * scale / 2.0 + scale + self.setup.tracking.pyramid_margin
+        return self.findMarkersInWindow(c_x, c_y, radius)
+    
+    def findMarkersInWindow(self, c_x, c_y, radius, partial=False):
+        """
+        Private. Find both markers at full resolution in a window (center, half size) of the current frame.
+        Returns None if a marker could not be found within the window, with partial only if the window is empty
+        (markers which could not be found are at [-1, -1]).
+        """
+        x1 = int(max(c_x - radius, 0))
+        y1 = int(max(c_y - radius, 0))
+        x2 = int(min(c_x + radius, self.frame.shape[1]))
+        y2 = int(min(c_y + radius, self.frame.shape[0]))
+        if x2 - x1 < 2 or y2 - y1 < 2:
+            return None
+        
+        newPos = self.findMarkers(self.frame[y1:y2, x1:x2], (x1, y1))
+        if not partial and not self.isFound(newPos):
+            return None
+        return newPos
+    
+    def isFound(self, newPos):
+        """
+        Private. Returns True if both markers of newPos were found.
+        """
+        return newPos[0][0] >= 0 and newPos[0][1] >= 0 and newPos[1][0] >= 0 and newPos[1][1] >= 0
+    
+    def getConfidence(self):
+        """
+        Returns the confidence of the current odometry: 1 if both markers were tracked, decreasing
+        with every frame a marker is predicted and 0 if the last known position was restored.
+        """
+        if not (self.motion[0].isPredicting() and self.motion[1].isPredicting()):
+            return 0.0
+        return 1.0 - float(self.lost_frames) / (self.setup.tracking.max_prediction + 1)
+    
+    def getRoiStats(self):
+        """
+        Returns region of interest statistics: number of frames, frames tracked within the ROI,
+        fallbacks to the full frame after losing lock and the share of ROI frames.
+        """
+        stats = dict(self.roi_stats)
+        stats["roi_share"] = float(stats["roi"]) / stats["frames"] if stats["frames"] > 0 else 0.0
+        stats["locked"] = self.roi_lock
+        return stats
+    
+    def grabFrame(self):
+        """
+        Private. Returns the newest frame and the time it was captured.
+        """
+        if self.grabber != None:
+            return self.grabber.getLatest()
         
+        flag, frame = self.cap.read()
+        return frame, time.time()
+    
+    def nextFrame(self):
+        """
+        Private. Grab the newest frame and crop it to the tracking image (self.frame, self.frame_time).
+        Returns False if the camera delivered no frame.
+        """
+        frame, frame_time = self.grabFrame()
+        if frame is None:
+            return False
+        
+        self.frame_time = frame_time
+        self.frame = self.pipeline.crop(frame)
+        return True
+    
+    def missFrame(self):
+        """
+        Private. Count a frame the camera did not deliver: the motion filters predict the markers
+        like during an occlusion, tracking goes on with the next frame. Quiet while stopping.
+        """
+        if self.stopped or (self.grabber != None and self.grabber.stopped):
+            return
+        
+        if self.missed_frames == 0:
+            MyLog.e(self.name, "Camera could not grab a frame.")
+        self.missed_frames += 1
+        
+        self.frame_time = time.time()
+        for i in range(0, 2):
+            self.motion[i].coast(self.frame_time)
+        self.roi_lock = self.motion[0].isPredicting() and self.motion[1].isPredicting()
+    
+    def getLoopStats(self):
+        """
+        Returns tracking loop statistics of the last tracking.stats_window frames: target and achieved rate
+        (frames per second), frames which missed their deadline, mean processing time per frame and
+        mean and maximum time (ms) of each stage (capture, blur, convert, detect, transform, publish, draw, log).
+        """
+        stats = self.timer.getStats()
+        stats["target_rate"] = self.setup.tracking.target_rate
+        return stats
+    
+    def formatLoopStats(self):
+        """
+        Private. Returns the loop statistics as a line of text.
+        """
+        stats = self.getLoopStats()
+        text = "%.1f Hz (target %s Hz), %d of %d frames late, %.2f ms per frame:" % (stats["rate"], str(stats["target_rate"]), stats["late"], stats["frames"], stats["busy"])
+        for stage in self.timer.stages:
+            text += " %s %.2f/%.2f" % (stage, stats["stages"][stage]["mean"], stats["stages"][stage]["max"])
+        return text + " ms (mean/max)"
+    
+    def getCaptureStats(self):
+        """
+        Returns capture statistics of the capture thread (captured, dropped and failed frames).
+        """
+        if self.grabber == None:
+            return None
+        return self.grabber.getStats()
+    
     def getOdometry(self):
+        """
+        Returns current odometry. odometry.timestamp is the time the frame was captured.
+        """
         return self.odometry
     
+    def getRobotOdometry(self, robot_id):
+        """
+        Returns the odometry of another robot of tracking.robots (see MultiRobotTracker).
+        """
+        if self.multi_tracker == None:
+            raise Exception("No robots configured in tracking.robots.")
+        return self.multi_tracker.getOdometry(robot_id)
+    
+    def getRobotIds(self):
+        """
+        Returns the ids of all robots of tracking.robots.
+        """
+        if self.multi_tracker == None:
+            return []
+        return self.multi_tracker.getIds()
+    
+    def getOdometryAt(self, t):
+        """
+        Returns the odometry at time t (time.time()), e.g. the capture time of a robot camera frame.
+        Interpolated between the two tracked poses around t. If t is newer than the newest pose,
+        the newest pose is returned.
+        """
+        pose = self.history.getAt(t)
+        if pose == None:
+            return self.odometry
+        
+        odometry = Odometry()
+        odometry.location = [int(math.floor(pose[0] + 0.5)), int(math.floor(pose[1] + 0.5))]
+        odometry.angle = math.floor(pose[2] + 0.5)
+        odometry.timestamp = t
+        return odometry
+    
     def locateRobot(self):
         """
         Detect robots' current position.
@@ -642,34 +967,12 @@ class Tracker(Freezeable, threading.Thread):
             MyLog.l(self.name, "Tracker is not calibrated yet. Initializing calibration...")
             self.calibrate()
         
-        newPos = self.createList(2)
-        
-        # grab a frame as NumPy array
-        flag, self.frame = self.cap.read()
-        
-        # throw an error if there is none
-        if self.frame == None:
+        # grab and crop a frame
+        if not self.nextFrame():
             raise Exception("Camera could not grab a frame.")
         
-        # crop offsets of picture
-        self.frame = self.frame[self.setup.image.tracking.offy:self.setup.image.tracking.offy + self.setup.image.tracking.height
-                                , self.setup.image.tracking.offx:self.setup.image.tracking.offx + self.setup.image.tracking.width]
-        
-        # if the frame was not empty, we make a copy and start manipulating it
-        img = numpy.empty_like(self.frame)
-        img[:] = self.frame
-
-        # blur the image to reduce noise
-        img = cv2.GaussianBlur(img, (0, 0), 2)
-
-        # convert to HSV channels, because a thresholding by hue catches graduated colors better than a RGB/BGR thresholding
-        img = cv2.cvtColor(img, cv.CV_BGR2HSV)
-    
-        # get current position of blue marker
-        newPos[0] = self.getPosOfMarker(img, (90, 100, 90), (110, 255, 255))
-        
-        # get current position of green marker
-        newPos[1] = self.getPosOfMarker(img, (40, 140, 90), (55, 255, 255))
+        # get current position of blue and green marker
+        newPos = self.findMarkers(self.frame, (0, 0))
         
         # initialize tracking error flag and 
         trackingError = False
@@ -689,7 +992,7 @@ class Tracker(Freezeable, threading.Thread):
             # draw circles on current marker positions and output a picture 
             cv2.circle(self.frame, (newPos[0][0], newPos[0][1]), 10, (255, 0, 0), 2)
             cv2.circle(self.frame, (newPos[1][0], newPos[1][1]), 10, (0, 255, 0), 2)
-            self.imwriteFile(self.setup.filesystem.file_dir + self.setup.filesystem.cam_dir, "markerNotTracked.jpg", self.frame)
+            self.diagnostics.submit("markerNotTracked", self.frame)
             
             # set error flag
             trackingError = True
@@ -704,53 +1007,27 @@ class Tracker(Freezeable, threading.Thread):
             # draw circles on current marker positions and output a picture 
             cv2.circle(self.frame, (newPos[0][0], newPos[0][1]), 10, (255, 0, 0), 2)
             cv2.circle(self.frame, (newPos[1][0], newPos[1][1]), 10, (0, 255, 0), 2)
-            self.imwriteFile(self.setup.filesystem.file_dir + self.setup.filesystem.cam_dir + "calibration/", "tooDistant.jpg", self.frame)
+            self.diagnostics.submit("tooDistant", self.frame)
             
         # handle tracking error
         if trackingError:
             raise Exception("Could not track robot.")
         
-        # save the last position, adopt the new position 
-        self.track_obj[1][0] = self.track_obj[0][0]
-        self.track_obj[1][1] = self.track_obj[0][1]
-        self.track_obj[0][0] = newPos[0][0]
-        self.track_obj[0][1] = newPos[0][1]
-        self.track_obj[3][0] = self.track_obj[2][0]
-        self.track_obj[3][1] = self.track_obj[2][1]
-        self.track_obj[2][0] = newPos[1][0]
-        self.track_obj[2][1] = newPos[1][1]
-        self.track_obj[5][0] = self.track_obj[4][0]
-        self.track_obj[5][1] = self.track_obj[4][1]
-        
-        # build the median of marker points
-        self.track_obj[4][0] = (self.track_obj[0][0] + self.track_obj[2][0]) / 2
-        self.track_obj[4][1] = (self.track_obj[0][1] + self.track_obj[2][1]) / 2
-        
-        # calculate the robots' position within the inertial system of the box
-        self.box = self.calcPosInBox(self.track_obj, self.calibration)
-        
-        # update the robots' odometry
-        self.odometry.location[0] = self.box[4][0]
-        self.odometry.location[1] = self.box[4][1]
-        
-        # next, calculate the robots' angle. Determine distance between blue and green marker
-        dist = self.getDistance((self.box[0][0], self.box[0][1]), (self.box[2][0], self.box[2][1]))
-
-        if  dist != 0:
-            # angle = asin((blue.y - green.y)/distance)
-            self.odometry.angle = math.asin((self.box[0][1] - self.box[2][1]) / dist) * self.setup.constants.RAD2DEG
-            
-            # since asin is defined only between -90 and 90 degrees, we need to differentiate to gain 91-180 degrees, too
-            if self.box[0][0] < self.box[2][0]:
-                if self.odometry.angle > 0:
-                    self.odometry.angle = 180 - self.odometry.angle
-                else:
-                    self.odometry.angle = -180 - self.odometry.angle
+        self.adoptPosition(newPos)
+        self.trace_buffer.append(self.frame_time, self.track_obj, self.box, False)
         
         MyLog.l(self.name, "Robots' position: " + str(self.odometry.location) + " angle: " + str(self.odometry.angle) + " degree")
         
+        # start the motion filters at the located markers
+        for i in range(0, 2):
+            self.motion[i].update(self.frame_time, newPos[i])
+        self.roi_lock = True
+        self.odometry.confidence = 1.0
+        
         # start position of robot is correct now
         self.robot_located = True
+        if self.publisher != None:
+            self.publisher.publish(self.odometry, self.robot_located)
 
     def hasLocatedRobot(self):
         """
@@ -0,0 +1,214 @@
+from utils.Freezeable import Freezeable
+from utils import Log as MyLog
+from settings import Setup
+from modules.dataType import Odometry
+from modules.Tracker import Tracker
+from multiprocessing import Process, Pipe, RawArray
+import numpy
+import threading
+import time
+
+class SharedPose(Freezeable):
+    """
+    The newest pose of the tracked robot in shared memory, written by one process and read by others
+    without locks: a sequence lock. The writer makes the sequence number odd, writes the pose and
+    makes it even again. A reader copies the pose and retries if the sequence number was odd or
+    changed meanwhile, so it never sees a half-written pose and never blocks the writer.
+    (Stores are not reordered on x86. On weakly ordered CPUs this relies on the interpreter's own barriers.)
+    """
+    # slots of the shared array
+    SEQ = 0
+    TIMESTAMP = 1
+    X = 2
+    Y = 3
+    ANGLE = 4
+    CONFIDENCE = 5
+    LOCATED = 6
+    SIZE = 7
+
+    def __init__(self):
+        """
+        Constructor. Create before starting the writing process, the memory is inherited by it.
+        """
+        self.setup = Setup()
+        self.name = "SharedPose"
+
+        self.raw = RawArray("d", self.SIZE)
+        self.data = numpy.frombuffer(self.raw, numpy.float64)
+
+        # statistics of read(): reads and retries because of a concurrent write
+        self.reads = 0
+        self.retries = 0
+
+        self.freeze()
+
+    def publish(self, odometry, located):
+        """
+        Write a pose. Only one process may write.
+        """
+        self.data[self.SEQ] += 1
+        self.data[self.TIMESTAMP] = odometry.timestamp
+        self.data[self.X] = odometry.location[0]
+        self.data[self.Y] = odometry.location[1]
+        self.data[self.ANGLE] = odometry.angle
+        self.data[self.CONFIDENCE] = odometry.confidence
+        self.data[self.LOCATED] = 1 if located else 0
+        self.data[self.SEQ] += 1
+
+    def read(self):
+        """
+        Returns a consistent copy of the shared array (see the slot constants).
+        """
+        self.reads += 1
+        while True:
+            seq = self.data[self.SEQ]
+            if seq % 2 == 0:
+                pose = self.data.copy()
+                if self.data[self.SEQ] == seq:
+                    return pose
+            self.retries += 1
+            time.sleep(0)
+
+def runTracker(connection, shared, cap=None):
+    """
+    Runs in the tracker process. Creates the tracker, publishes its poses to shared and
+    executes the commands of a TrackerProcess: (method name, arguments) -> (True, result) or (False, error).
+    """
+    tracker = Tracker(cap)
+    tracker.publisher = shared
+    connection.send((True, None))
+
+    while True:
+        command, args = connection.recv()
+        try:
+            result = getattr(tracker, command)(*args)
+            connection.send((True, result))
+        except Exception as pokemon:
+            connection.send((False, pokemon.__str__()))
+        if command == "stop":
+            break
+
+    if tracker.is_alive():
+        tracker.join()
+    connection.close()
+
+class TrackerProcess(Freezeable):
+    """
+    Runs Tracker in its own process (tracking.process), so tracking doesn't compete with
+    navigation, the camera and SFA inference for the interpreter lock.
+    Poses are published through shared memory (see SharedPose): getOdometry() and hasLocatedRobot()
+    never wait for the tracker. All other methods are sent to the tracker process and wait for its answer.
+    Implements the methods of Tracker used by the other modules.
+    """
+
+    def __init__(self, cap=None):
+        """
+        Constructor. Starts the tracker process and waits until the tracker was created (camera opened).
+        """
+        self.setup = Setup()
+        self.name = "TrackerProcess"
+
+        self.shared = SharedPose()
+        self.connection, child = Pipe()
+        # one command at a time
+        self.lock = threading.Lock()
+
+        self.process = Process(target=runTracker, args=(child, self.shared, cap))
+        self.process.daemon = True
+        self.stopped = False
+
+        self.freeze()
+
+        self.process.start()
+        self.connection.recv()
+        MyLog.l(self.name, "Tracker process started (pid " + str(self.process.pid) + ")")
+
+    def call(self, command, *args):
+        """
+        Private. Execute a method of the tracker in the tracker process and return its result.
+        """
+        self.lock.acquire()
+        try:
+            self.connection.send((command, args))
+            ok, result = self.connection.recv()
+        finally:
+            self.lock.release()
+        if not ok:
+            raise Exception(result)
+        return result
+
+    def calibrate(self):
+        """
+        Calibrate the tracker, see Tracker.calibrate().
+        """
+        self.call("calibrate")
+
+    def loadCalibration(self):
+        """
+        Load the calibration, see Tracker.loadCalibration().
+        """
+        self.call("loadCalibration")
+
+    def locateRobot(self):
+        """
+        Detect robots' current position, see Tracker.locateRobot().
+        """
+        self.call("locateRobot")
+
+    def start(self):
+        """
+        Start tracking in the tracker process.
+        """
+        self.call("start")
+
+    def stop(self):
+        """
+        Stop tracking, let the tracker write its files and end the process.
+        """
+        if not self.stopped:
+            self.stopped = True
+            self.call("stop")
+            self.process.join(5)
+            MyLog.l(self.name, "Tracker process stopped. Pose reads: " + str(self.shared.reads) + ", retries: " + str(self.shared.retries))
+
+    def getOdometry(self):
+        """
+        Returns the newest odometry published by the tracker process.
+        """
+        pose = self.shared.read()
+        odometry = Odometry()
+        odometry.location = [int(pose[SharedPose.X]), int(pose[SharedPose.Y])]
+        odometry.angle = pose[SharedPose.ANGLE]
+        odometry.timestamp = pose[SharedPose.TIMESTAMP]
+        odometry.confidence = pose[SharedPose.CONFIDENCE]
+        return odometry
+
+    def hasLocatedRobot(self):
+        """
+        Returns true if the robots' correct start position is known.
+        """
+        return self.shared.read()[SharedPose.LOCATED] != 0
+
+    def getOdometryAt(self, t):
+        """
+        Returns the odometry at time t, see Tracker.getOdometryAt().
+        """
+        return self.call("getOdometryAt", t)
+
+    def getRoiStats(self):
+        """
+        Returns region of interest statistics, see Tracker.getRoiStats().
+        """
+        return self.call("getRoiStats")
+
+    def getLoopStats(self):
+        """
+        Returns tracking loop statistics, see Tracker.getLoopStats().
+        """
+        return self.call("getLoopStats")
+
+    def getCaptureStats(self):
+        """
+        Returns capture statistics, see Tracker.getCaptureStats().
+        """
+        return self.call("getCaptureStats")
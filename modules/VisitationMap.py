@@ -0,0 +1,171 @@
+from utils.Freezeable import Freezeable
+from utils import Log as MyLog
+from settings import Setup
+from collections import deque
+import Queue
+import numpy
+import math
+import os
+import threading
+import time
+
+class VisitationMap(Freezeable):
+    """
+    This class counts how often the robot visited each cell of the arena with each heading.
+    The counts are stored in a (rows, columns, heading bins) uint16 array, which is
+    saved to filesystem.visitation_dir every visitation.snapshot_interval seconds.
+    Snapshots are written in their own thread, so disk I/O does not slow down the odometry
+    loop, and only the last visitation.snapshot_history files are kept.
+    The random walk can ask for the less visited side to bias its turns (see getTurnPreference()).
+    """
+    def __init__(self):
+        """
+        Constructor
+        """
+        self.setup = Setup()
+        self.name = "VisitationMap"
+
+        # cell size in mm and number of heading bins
+        self.resolution = self.setup.visitation.resolution
+        self.heading_bins = self.setup.visitation.heading_bins
+
+        self.rows = int(math.ceil(self.setup.arena.boxheight / float(self.resolution)))
+        self.cols = int(math.ceil(self.setup.arena.boxwidth / float(self.resolution)))
+
+        # visits per cell and heading bin
+        self.visits = numpy.zeros((self.rows, self.cols, self.heading_bins), numpy.uint16)
+
+        # maximum value of a counter, counters saturate instead of overflowing
+        self.max_visits = numpy.iinfo(numpy.uint16).max
+
+        # snapshots
+        self.path = self.setup.filesystem.file_dir + self.setup.filesystem.visitation_dir
+        self.snapshot_count = 0
+        self.last_snapshot = time.time()
+
+        # snapshot waiting to be written: (number, visits). None stops the writing thread
+        self.queue = Queue.Queue(1)
+        self._thread = None
+
+        # file names of the written snapshots
+        self.history = deque()
+
+        self.freeze()
+
+    def update(self, location, angle):
+        """
+        Count a visit of the cell at location (mm) with heading angle (degree).
+        """
+        row = int(location[1]) // self.resolution
+        col = int(location[0]) // self.resolution
+        if row < 0 or col < 0 or row >= self.rows or col >= self.cols:
+            return
+
+        _bin = int((angle + 180) % 360 * self.heading_bins // 360) % self.heading_bins
+        if self.visits[row, col, _bin] < self.max_visits:
+            self.visits[row, col, _bin] += 1
+
+        if time.time() - self.last_snapshot >= self.setup.visitation.snapshot_interval:
+            self.snapshot()
+
+    def snapshot(self):
+        """
+        Queue a copy of the current visitation array for writing as .npy-file.
+        Skipped if the previous snapshot was not written yet.
+        """
+        self.last_snapshot = time.time()
+        if self._thread == None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self.writeSnapshots)
+            self._thread.daemon = True
+            self._thread.start()
+
+        try:
+            self.queue.put_nowait((self.snapshot_count, self.visits.copy()))
+            self.snapshot_count += 1
+        except Queue.Full:
+            MyLog.d(self.name, "Previous snapshot not written yet, skipped snapshot.")
+
+    def writeSnapshots(self):
+        """
+        Private. Runs in its own thread, writes queued snapshots.
+        """
+        while True:
+            item = self.queue.get()
+            if item == None:
+                break
+            self.writeSnapshot(*item)
+
+    def writeSnapshot(self, number, visits):
+        """
+        Private. Write a snapshot and delete the oldest one if the history is full.
+        """
+        try:
+            if not os.path.exists(self.path):
+                os.makedirs(self.path)
+                MyLog.l(self.name, "Directory successfully created: " + self.path)
+
+            fileName = "visitation_" + str(number).zfill(6) + ".npy"
+            numpy.save(self.path + fileName, visits)
+
+            self.history.append(fileName)
+            while len(self.history) > self.setup.visitation.snapshot_history:
+                os.remove(self.path + self.history.popleft())
+        except Exception as pokemon:
+            MyLog.e(self.name, "Exception in writeSnapshot: " + pokemon.__str__())
+
+    def stop(self):
+        """
+        Take a snapshot of the current counts, write it and stop the writing thread.
+        """
+        if self._thread != None and self._thread.is_alive():
+            # wait for the previous snapshot, so the final one isn't skipped
+            self.queue.put(None)
+            self._thread.join()
+        self.snapshot()
+        self.queue.put(None)
+        self._thread.join()
+
+    def getVisits(self, location, angle=None):
+        """
+        Returns visits of the cell at location (mm). If angle is None, visits of all headings are summed.
+        Locations outside of the arena count as visited very often.
+        """
+        row = int(location[1]) // self.resolution
+        col = int(location[0]) // self.resolution
+        if row < 0 or col < 0 or row >= self.rows or col >= self.cols:
+            return int(self.max_visits)
+
+        if angle == None:
+            return int(self.visits[row, col].sum())
+        _bin = int((angle + 180) % 360 * self.heading_bins // 360) % self.heading_bins
+        return int(self.visits[row, col, _bin])
+
+    def getTurnPreference(self, location, angle):
+        """
+        Returns the probability with which the robot should turn towards smaller angles.
+        Compares the visits of the cells ahead on both sides of the current heading:
+        0.5 if both were visited equally often, close to 1 if the side of bigger angles was visited more often.
+        """
+        lookahead = self.setup.visitation.lookahead
+        offset = self.setup.visitation.turn_offset
+
+        visits = []
+        for direction in (angle - offset, angle + offset):
+            p = (location[0] + lookahead * math.cos(math.radians(direction)),
+                 location[1] + lookahead * math.sin(math.radians(direction)))
+            visits.append(self.getVisits(p))
+
+        return (visits[1] + 1.0) / (visits[0] + visits[1] + 2.0)
+
+    def getCoverage(self):
+        """
+        Returns the fraction of visited cells and the fraction of visited (cell, heading bin) poses.
+        """
+        visited = self.visits > 0
+        return visited.any(axis=2).mean(), visited.mean()
+
+    def getVisitation(self):
+        """
+        Returns a copy of the visitation array (rows, columns, heading bins).
+        """
+        return self.visits.copy()
@@ -0,0 +1,232 @@
+from utils.Freezeable import Freezeable
+from utils import Log as MyLog
+from settings import Setup
+from collections import deque
+import threading
+
+class WaypointSource(Freezeable):
+    """
+    Source of waypoints for ePuckControl.followSource().
+    Waypoints are produced in their own thread into a buffer of at most
+    navigation.lookahead waypoints, so the next waypoints are ready (and can be
+    looked at with peek()) while the robot drives the current segment.
+    Memory stays constant no matter how long the source is.
+    Subclasses implement points(), a generator of [x, y] waypoints, which start() runs in the producing thread:
+    -FileWaypointSource("./path.txt", turns)
+    -ArrayWaypointSource([[100, 100], [500, 100]], turns)
+    -GeneratorWaypointSource(generator)
+    -QueueWaypointSource(): another thread calls put(point) and finish()
+    """
+    def __init__(self, lookahead=None):
+        """
+        Constructor
+        """
+        self.setup = Setup()
+        self.name = "WaypointSource"
+
+        # maximum number of buffered waypoints
+        self.lookahead = lookahead if lookahead != None else self.setup.navigation.lookahead
+
+        # buffered waypoints and condition to wait for waypoints / free space
+        self.buffer = deque()
+        self.condition = threading.Condition()
+
+        # finished: there will be no more waypoints. closed: consumer does not want more waypoints
+        self.finished = False
+        self.closed = False
+
+        self._thread = None
+
+        self.freeze()
+
+    def start(self):
+        """
+        Start producing waypoints in their own thread.
+        """
+        if self._thread == None:
+            self._thread = threading.Thread(target=self.produce)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def produce(self):
+        """
+        Private. Runs in its own thread, puts waypoints of points() into the buffer.
+        """
+        try:
+            for point in self.points():
+                if not self.put(point):
+                    break
+        except Exception as pokemon:
+            MyLog.e(self.name, "Exception in produce: " + pokemon.__str__())
+        self.finish()
+
+    def put(self, point):
+        """
+        Append a waypoint. Blocks while the buffer is full.
+        Returns False if the source was closed and the waypoint was dropped.
+        """
+        self.condition.acquire()
+        try:
+            while len(self.buffer) >= self.lookahead and not self.closed:
+                self.condition.wait()
+            if self.closed:
+                return False
+            self.buffer.append([point[0], point[1]])
+            self.condition.notifyAll()
+            return True
+        finally:
+            self.condition.release()
+
+    def finish(self):
+        """
+        Mark the end of the waypoints.
+        """
+        self.condition.acquire()
+        self.finished = True
+        self.condition.notifyAll()
+        self.condition.release()
+
+    def close(self):
+        """
+        Stop producing waypoints and drop buffered ones.
+        """
+        self.condition.acquire()
+        self.closed = True
+        self.buffer.clear()
+        self.condition.notifyAll()
+        self.condition.release()
+
+    def next(self):
+        """
+        Returns the next waypoint and removes it from the buffer.
+        Blocks until a waypoint is available. Returns None at the end.
+        """
+        self.condition.acquire()
+        try:
+            while len(self.buffer) == 0 and not self.finished and not self.closed:
+                self.condition.wait()
+            if len(self.buffer) == 0:
+                return None
+            point = self.buffer.popleft()
+            self.condition.notifyAll()
+            return point
+        finally:
+            self.condition.release()
+
+    def peek(self, block=True):
+        """
+        Returns the next waypoint without removing it.
+        Blocks until a waypoint is available. Returns None at the end,
+        or right away if block is false and no waypoint is buffered yet.
+        """
+        self.condition.acquire()
+        try:
+            while block and len(self.buffer) == 0 and not self.finished and not self.closed:
+                self.condition.wait()
+            if len(self.buffer) == 0:
+                return None
+            return self.buffer[0]
+        finally:
+            self.condition.release()
+
+class FileWaypointSource(WaypointSource):
+    """
+    Streams waypoints from a path file "turns"-times. Format of file:
+    x    y
+    4000    2000
+    500    500
+    ...
+    """
+    def __init__(self, filePath, turns=1, lookahead=None):
+        """
+        Constructor
+        """
+        self.filePath = "".join(filePath)
+        self.turns = turns
+
+        # check if file is empty
+        _file = open(self.filePath, "r")
+        first_character = _file.read(1)
+        _file.close()
+        if not first_character:
+            raise Exception("filePath is empty!")
+
+        # parse the whole file once, so a corrupt file is rejected before the robot moves
+        for point in self.parse():
+            pass
+
+        WaypointSource.__init__(self, lookahead)
+
+    def parse(self):
+        """
+        Private. Parse each line of the file (ignore first line).
+        """
+        _file = open(self.filePath, "r")
+        try:
+            j = 0
+            for line in _file:
+                if not j == 0:
+                    # try reading two numbers from line
+                    x, y = line.strip().split()
+
+                    # check if read data is a number
+                    if not (x.isdigit() and y.isdigit()):
+                        raise Exception("File is corrupt. Read data wasn't int.")
+
+                    yield [int(x), int(y)]
+                j = j + 1
+        finally:
+            _file.close()
+
+    def points(self):
+        """
+        Parse the file "turns"-times.
+        """
+        for i in range(0, self.turns):
+            for point in self.parse():
+                yield point
+
+class ArrayWaypointSource(WaypointSource):
+    """
+    Waypoints from a list or an (n, 2) array, repeated "turns"-times.
+    """
+    def __init__(self, points, turns=1, lookahead=None):
+        """
+        Constructor
+        """
+        self.array = points
+        self.turns = turns
+
+        WaypointSource.__init__(self, lookahead)
+
+    def points(self):
+        for i in range(0, self.turns):
+            for point in self.array:
+                yield point
+
+class GeneratorWaypointSource(WaypointSource):
+    """
+    Waypoints from a generator (or any other iterable), e.g. a planner.
+    """
+    def __init__(self, generator, lookahead=None):
+        """
+        Constructor
+        """
+        self.generator = generator
+
+        WaypointSource.__init__(self, lookahead)
+
+    def points(self):
+        for point in self.generator:
+            yield point
+
+class QueueWaypointSource(WaypointSource):
+    """
+    Waypoints fed by another thread (e.g. from a socket) with put(point).
+    Call finish() after the last waypoint.
+    """
+    def start(self):
+        """
+        Nothing to produce, waypoints are put() by another thread.
+        """
+        pass
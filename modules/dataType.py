@@ -9,6 +9,10 @@ class Odometry(Freezeable):
         
         self.location = [0, 0]
         self.angle = 0
+        # time (time.time()) the odometry was measured, 0 if unknown
+        self.timestamp = 0
+        # 1: both markers tracked, less while a lost marker is predicted, 0: last known pose
+        self.confidence = 1.0
         
         self.freeze()
 
@@ -172,7 +172,14 @@ class randomVehicle(Freezeable):
                 chance = random.random()
                 noise = random.random() * self.max_speed
                 
-                if chance >= 0.5:
+                # probability to slow down the left wheel (= turn towards smaller angles)
+                turn_preference = 0.5
+                visitation = self.epuck.getVisitationMap()
+                if self.setup.visitation.bias_random_walk and visitation != None:
+                    odometry = self.epuck.getOdometry()
+                    turn_preference = visitation.getTurnPreference(odometry.location, odometry.angle)
+                
+                if chance >= 1 - turn_preference:
                     # => left wheel slows down
                     motor_speed[0] = momentum * self.max_speed + (1 - momentum) * noise
                     # max speed
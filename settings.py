@@ -28,6 +28,9 @@ import math
 # |   +->network_dir:       Directory where network files can be found [def: "...path.../network/"]
 # |   +->network_file:      Full path of network file [def: "...path.../filename.tsn"]
 # |   +->activity_path:     Directory where cell activity files will be saved [def: "cell_activity/"]
+# |   +->obstacle_dir:      Directory where obstacle files for the path planner can be found, PathPlanner reads file names without directory from here [def: "...path.../obstacles/"]
+# |   +->costmap_dir:       Directory where costmaps of the path planner will be cached [def: "costmap/"]
+# |   +->visitation_dir:    Directory where snapshots of the visitation map will be saved [def: "visitation/"]
 # |
 # +---+image
 # |   |
@@ -47,6 +50,38 @@ import math
 # |       +->pic_width:    picture width (format to which will be scaled) [def: 55]
 # |       +->pic_height:   picture height (format to which will be scaled) [def: 35]
 # |
+# +---+tracking
+# |   |
+# |   +->use_roi:      search markers only in a window around the predicted robot position, fall back to the full frame when lost [def: True]
+# |   +->roi_radius:   half size (pixels) of the region of interest window [def: 40]
+# |   +->use_lut:      classify marker colours with a lookup table in one pass instead of HSV thresholding per colour [def: True]
+# |   +->lut_bits:     bits per BGR channel of the lookup table [def: 6]
+# |   +->pyramid_levels: find marker candidates in a frame downsampled this many times by 2, then refine them at full resolution (0: off) [def: 1]
+# |   +->pyramid_margin: margin (pixels) of the full resolution window around the marker candidates [def: 12]
+# |   +->robots:       track several robots in one pass: {robot id: ((front HSV low, high), (back HSV low, high))}, empty: only this robot [def: {}]
+# |   +->robot_id:     id (in robots) of the robot this program controls, has to be set if robots is not empty [def: None]
+# |   +->min_blob_area: smallest marker blob (pixels) when tracking several robots [def: 3]
+# |   +->motion_alpha:   position gain of the markers' motion filter (see modules/MotionFilter.py) [def: 0.85]
+# |   +->motion_beta:    velocity gain of the markers' motion filter [def: 0.3]
+# |   +->max_prediction: number of frames a lost marker is predicted, then its last position is held [def: 10]
+# |   +->min_confidence: navigation only corrects its odometry with tracked poses of at least this confidence (0..1) [def: 0.5]
+# |   +->undistort:    correct lens distortion of tracked positions, if there is a lens calibration (see tools/calibrateLens.py) [def: True]
+# |   +->checkerboard: number of inner corners (columns, rows) of the checkerboard for the lens calibration [def: (9, 6)]
+# |   +->process:      run the tracker in its own process, poses are shared through shared memory (see modules/TrackerProcess.py) [def: False]
+# |   +->target_rate:  frames per second the tracking loop aims at, with a deadline per frame (0: as fast as frames arrive) [def: 30]
+# |   +->stats_window: number of frames the tracking loop statistics are computed over (see Tracker.getLoopStats()) [def: 100]
+# |   +->trace_colour: colour of the trace images: "flag" (yellow where interpolated), "time" or "speed" (blue to red) [def: "flag"]
+# |   +->trace_svg:    also write the trace images as SVG files [def: True]
+# |   +->capture_thread: grab frames continuously in their own thread, the tracker always processes the newest frame [def: True]
+# |   +->capture_buffer: number of frames kept by the capture thread [def: 3]
+# |   +->offline_chunk:  number of frames per chunk when tracking recorded frames (see OfflineTracker.py) [def: 100]
+# |   +->offline_processes: number of processes when tracking recorded frames, 0 = number of CPUs [def: 0]
+# |   +->offline_frames: maximum number of decoded frames waiting for or in work when tracking a video, bounds memory [def: 200]
+# |   +->history_size:   number of timestamped poses kept for Tracker.getOdometryAt() [def: 512]
+# |   +->diagnostic_interval: minimum time (seconds) between two diagnostic images of the same event (e.g. lost marker) [def: 1.0]
+# |   +->diagnostic_queue:    maximum number of diagnostic images waiting to be written [def: 8]
+# |   +->diagnostic_history:  number of diagnostic images kept per event [def: 20]
+# |
 # +---+robot
 # |   |
 # |   +->mac:                mac-address of your ePuck [format: "ab:cd:ef:gh:ij:kl"]
@@ -58,6 +93,52 @@ import math
 # |   |                      e.g. 15: If the difference of the angle calculation of the tracking module and the robots' own angle is bigger than 15, update via tracker.
 # |   +->diameter:           robots' diameter in mm. [def: 84]
 # |
+# +---+navigation
+# |   |
+# |   +->drive_speed:        wheel speed while driving straight to a target [def: 700]
+# |   +->heading_control:    trim wheel speeds with a PID controller to hold the heading while driving straight [def: True]
+# |   +->heading_kp:         proportional gain of the heading controller (wheel speed per degree) [def: 8.0]
+# |   +->heading_ki:         integral gain of the heading controller [def: 0.5]
+# |   +->heading_kd:         derivative gain of the heading controller [def: 1.0]
+# |   +->heading_trim_limit: maximum wheel speed trim of the heading controller [def: 200]
+# |   +->use_primitives:     turn towards targets and drive straight segments with encoder-target motion primitives (see modules/MotionPrimitives.py)
+# |   |                      instead of turn() and the speed profile. Records the primitives' overshoot statistics [def: False]
+# |   +->rotate_speed:       wheel speed of motion primitives when turning on the spot [def: 400]
+# |   +->slow_speed:         wheel speed of motion primitives shortly before reaching their encoder target [def: 150]
+# |   +->slow_ticks:         motion primitives slow down this many encoder steps before their target [def: 50]
+# |   +->poll_min:           minimum time (sec) between two encoder polls of a motion primitive [def: 0.01]
+# |   +->poll_max:           maximum time (sec) between two encoder polls of a motion primitive [def: 0.1]
+# |   +->lookahead:          number of waypoints a WaypointSource buffers ahead of the robot [def: 8]
+# |   +->use_ramps:          accelerate and decelerate on straight segments, so the robot stops at the target without overshoot [def: True]
+# |   +->acceleration:       acceleration ramp in wheel speed per second [def: 2000]
+# |   +->deceleration:       deceleration ramp in wheel speed per second [def: 1500]
+# |   +->min_speed:          wheel speed at the start and end of the ramps [def: 100]
+# |
+# +---+planner
+# |   |
+# |   +->resolution:   grid resolution of the path planner in mm per cell [def: 10]
+# |   +->margin:       distance in mm the robot keeps to obstacles, additional to its radius [def: 20]
+# |   +->cost_weight:  additional cost of cells close to obstacles. Higher values keep paths further away from obstacles [def: 4.0]
+# |
+# +---+coverage
+# |   |
+# |   +->spacing:          distance in mm between neighbouring sweep lines / spiral rings of CoveragePath.py [def: self.robot.diameter]
+# |   +->resolution:       grid resolution in mm per cell when estimating coverage [def: 10]
+# |   +->lissajous_a:      frequency of the Lissajous figure in x-direction [def: 3]
+# |   +->lissajous_b:      frequency of the Lissajous figure in y-direction [def: 4]
+# |   +->lissajous_points: number of waypoints of the Lissajous figure [def: 200]
+# |
+# +---+visitation
+# |   |
+# |   +->enabled:           count visits of arena cells and headings while navigating [def: True]
+# |   +->resolution:        cell size of the visitation map in mm [def: 20]
+# |   +->heading_bins:      number of heading bins of the visitation map [def: 8]
+# |   +->snapshot_interval: save the visitation map every x seconds [def: 10]
+# |   +->snapshot_history:  number of visitation map snapshots kept, older ones are deleted [def: 10]
+# |   +->bias_random_walk:  let the random walk prefer turning towards less visited cells [def: False]
+# |   +->lookahead:         distance in mm of the cells the random walk compares [def: 150]
+# |   +->turn_offset:       angle in degree between heading and the cells the random walk compares [def: 45]
+# |
 # +---+arena
 # |   |
 # |   +->markerdist:   maximum allowed distance (pixels) between the center of the robot markers [def: self.robot.diameter]
@@ -68,6 +149,8 @@ import math
 # +---+other
 # |   |
 # |   +->straps:       store tracked positions in a file [def: True]
+# |   +->poselog:      store positions in a binary pose log (tracking.bin/tracing.bin, see modules/PoseLog.py) instead of a .txt file [def: False]
+# |   +->poselog_block: number of records the pose log collects before writing them to file [def: 256]
 # |   +->debug:        debug mode [def: False]
 # |   +->filter_log:   You can filter "Log.py"-generated messages in stdout by changing this value to "no/error/log/all"
 # |   |                no: there will be no log at all
@@ -126,6 +209,9 @@ class Setup(Freezeable):
         self.filesystem.network_dir = self.filesystem.input_dir + "network/"
         self.filesystem.network_file = self.filesystem.network_dir + "linC/network_x100000_color_ICA.tsn"
         self.filesystem.activity_path = "cell_activity/"
+        self.filesystem.obstacle_dir = self.filesystem.input_dir + "obstacles/"
+        self.filesystem.costmap_dir = "costmap/"
+        self.filesystem.visitation_dir = "visitation/"
         self.filesystem.freeze()
 
         self.image = EmptyOptionContainer()
@@ -146,6 +232,38 @@ class Setup(Freezeable):
         self.image.robot.freeze()
         self.image.freeze()
 
+        self.tracking = EmptyOptionContainer()
+        self.tracking.use_roi    = True
+        self.tracking.roi_radius = 40
+        self.tracking.use_lut    = True
+        self.tracking.lut_bits   = 6
+        self.tracking.pyramid_levels = 1
+        self.tracking.pyramid_margin = 12
+        self.tracking.robots         = {}
+        self.tracking.robot_id       = None
+        self.tracking.min_blob_area  = 3
+        self.tracking.motion_alpha   = 0.85
+        self.tracking.motion_beta    = 0.3
+        self.tracking.max_prediction = 10
+        self.tracking.min_confidence = 0.5
+        self.tracking.undistort      = True
+        self.tracking.checkerboard   = (9, 6)
+        self.tracking.process        = False
+        self.tracking.target_rate    = 30
+        self.tracking.stats_window   = 100
+        self.tracking.trace_colour   = "flag"
+        self.tracking.trace_svg      = True
+        self.tracking.capture_thread = True
+        self.tracking.capture_buffer = 3
+        self.tracking.offline_chunk  = 100
+        self.tracking.offline_processes = 0
+        self.tracking.offline_frames = 200
+        self.tracking.history_size   = 512
+        self.tracking.diagnostic_interval = 1.0
+        self.tracking.diagnostic_queue    = 8
+        self.tracking.diagnostic_history  = 20
+        self.tracking.freeze()
+
         self.robot = EmptyOptionContainer()
         self.robot.mac = "10:00:E8:C5:61:4B"
         self.robot.light_factor        = 1.1
@@ -154,6 +272,51 @@ class Setup(Freezeable):
         self.robot.diameter            = 84
         self.robot.freeze() 
 
+        self.navigation = EmptyOptionContainer()
+        self.navigation.drive_speed        = 700
+        self.navigation.heading_control    = True
+        self.navigation.heading_kp         = 8.0
+        self.navigation.heading_ki         = 0.5
+        self.navigation.heading_kd         = 1.0
+        self.navigation.heading_trim_limit = 200
+        self.navigation.use_primitives     = False
+        self.navigation.rotate_speed       = 400
+        self.navigation.slow_speed         = 150
+        self.navigation.slow_ticks         = 50
+        self.navigation.poll_min           = 0.01
+        self.navigation.poll_max           = 0.1
+        self.navigation.lookahead          = 8
+        self.navigation.use_ramps          = True
+        self.navigation.acceleration       = 2000
+        self.navigation.deceleration       = 1500
+        self.navigation.min_speed          = 100
+        self.navigation.freeze()
+
+        self.planner = EmptyOptionContainer()
+        self.planner.resolution  = 10
+        self.planner.margin      = 20
+        self.planner.cost_weight = 4.0
+        self.planner.freeze()
+
+        self.coverage = EmptyOptionContainer()
+        self.coverage.spacing          = self.robot.diameter
+        self.coverage.resolution       = 10
+        self.coverage.lissajous_a      = 3
+        self.coverage.lissajous_b      = 4
+        self.coverage.lissajous_points = 200
+        self.coverage.freeze()
+
+        self.visitation = EmptyOptionContainer()
+        self.visitation.enabled           = True
+        self.visitation.resolution        = 20
+        self.visitation.heading_bins      = 8
+        self.visitation.snapshot_interval = 10
+        self.visitation.snapshot_history  = 10
+        self.visitation.bias_random_walk  = False
+        self.visitation.lookahead         = 150
+        self.visitation.turn_offset       = 45
+        self.visitation.freeze()
+
         self.arena = EmptyOptionContainer()
         self.arena.markerdist = self.robot.diameter
         self.arena.markersize = 35
@@ -163,6 +326,8 @@ class Setup(Freezeable):
 
         self.other = EmptyOptionContainer()
         self.other.storepos = False
+        self.other.poselog = False
+        self.other.poselog_block = 256
         self.other.debug = False
         self.other.filter_log = "all"
         self.other.freeze()
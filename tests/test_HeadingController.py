@@ -0,0 +1,46 @@
+"""
+Tests of modules/HeadingController.py.
+Run from the repository root: python -m unittest discover tests
+"""
+
+from modules.HeadingController import HeadingController
+import time
+import unittest
+
+class HeadingControllerTest(unittest.TestCase):
+
+    def testProportional(self):
+        controller = HeadingController(8.0, 0, 0, 200)
+        self.assertAlmostEqual(controller.update(5), 40)
+        self.assertAlmostEqual(controller.update(-2), -16)
+        self.assertAlmostEqual(controller.getError(), -2)
+
+    def testTrimLimit(self):
+        controller = HeadingController(8.0, 0, 0, 200)
+        self.assertEqual(controller.update(90), 200)
+        self.assertEqual(controller.update(-90), -200)
+        self.assertEqual(controller.getTrim(), -200)
+
+    def testIntegralAntiWindup(self):
+        controller = HeadingController(0, 100.0, 0, 50)
+        controller.update(10)
+        for i in range(0, 5):
+            time.sleep(0.01)
+            trim = controller.update(10)
+        # the integral alone never exceeds the trim limit
+        self.assertTrue(0 < trim <= 50)
+        self.assertTrue(abs(controller.integral * controller.ki) <= 50 + 1e-9)
+
+    def testReset(self):
+        controller = HeadingController(1.0, 1.0, 1.0, 200)
+        controller.update(10)
+        time.sleep(0.01)
+        controller.update(10)
+        controller.reset()
+        self.assertEqual(controller.getTrim(), 0)
+        self.assertEqual(controller.getError(), 0)
+        # no derivative kick after a reset: first update is proportional only
+        self.assertAlmostEqual(controller.update(3), 3)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+"""
+Tests of modules/MotionFilter.py.
+Run from the repository root: python -m unittest discover tests
+"""
+
+from modules.MotionFilter import MotionFilter
+import unittest
+
+class MotionFilterTest(unittest.TestCase):
+
+    def assertPosition(self, position, expected):
+        self.assertAlmostEqual(position[0], expected[0])
+        self.assertAlmostEqual(position[1], expected[1])
+
+    def testNoMeasurement(self):
+        motion = MotionFilter()
+        self.assertEqual(motion.predict(1.0), None)
+        self.assertEqual(motion.coast(1.0), None)
+
+    def testConstantVelocity(self):
+        motion = MotionFilter(0.85, 0.3)
+        for i in range(0, 10):
+            motion.update(i * 0.1, [100 + i * 10, 50 - i * 5])
+        # a marker moving with constant velocity is followed without lag
+        self.assertPosition(motion.getVelocity(), (100, -50))
+        self.assertPosition(motion.predict(1.0), (200, 0))
+
+    def testCoast(self):
+        motion = MotionFilter(0.85, 0.3)
+        motion.update(0.0, [100, 100])
+        motion.update(0.1, [110, 100])
+        self.assertPosition(motion.coast(0.2), (120, 100))
+        self.assertPosition(motion.coast(0.3), (130, 100))
+        self.assertEqual(motion.getMisses(), 2)
+        self.assertTrue(motion.isPredicting())
+
+        # the next measurement ends the dropout
+        motion.update(0.4, [140, 100])
+        self.assertEqual(motion.getMisses(), 0)
+        self.assertPosition(motion.predict(0.4), (140, 100))
+
+    def testHoldAfterMaxPrediction(self):
+        motion = MotionFilter(0.85, 0.3)
+        motion.update(0.0, [100, 100])
+        motion.update(0.1, [110, 100])
+        max_prediction = motion.setup.tracking.max_prediction
+        for i in range(0, max_prediction + 1):
+            position = motion.coast(0.2 + i * 0.1)
+        # the filter stopped predicting and holds the last measured position
+        self.assertFalse(motion.isPredicting())
+        self.assertPosition(position, (110, 100))
+
+        # a measurement after the long dropout starts again without velocity
+        motion.update(5.0, [300, 200])
+        self.assertPosition(motion.getVelocity(), (0, 0))
+        self.assertPosition(motion.predict(6.0), (300, 200))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+"""
+Tests of modules/PathPlanner.py.
+Run from the repository root: python -m unittest discover tests
+"""
+
+from settings import Setup
+import modules.PathPlanner
+from modules.PathPlanner import PathPlanner
+import numpy
+import shutil
+import tempfile
+import unittest
+
+class PathPlannerTest(unittest.TestCase):
+
+    def setUp(self):
+        # cache costmaps in a temporary directory, not in filesystem.file_dir
+        self.path = tempfile.mkdtemp() + "/"
+        def temporarySetup():
+            setup = Setup()
+            setup.filesystem.file_dir = self.path
+            return setup
+        modules.PathPlanner.Setup = temporarySetup
+        PathPlanner.costmaps = {}
+
+    def tearDown(self):
+        modules.PathPlanner.Setup = Setup
+        PathPlanner.costmaps = {}
+        shutil.rmtree(self.path, True)
+
+    def testCostmap(self):
+        planner = PathPlanner([(400, 0, 450, 120)])
+        # walls and obstacle are blocked, cells far from them are free with the minimal cost 1
+        self.assertFalse(planner.isFree(planner.toCell((5, 150))))
+        self.assertFalse(planner.isFree(planner.toCell((425, 100))))
+        self.assertTrue(planner.isFree(planner.toCell((200, 150))))
+        self.assertEqual(planner.costmap.min(), 1)
+        # cells close to the obstacle cost more than cells further away
+        self.assertTrue(planner.costmap[planner.toCell((330, 155))] > planner.costmap[planner.toCell((150, 155))])
+
+    def testPlanAroundObstacle(self):
+        planner = PathPlanner([(400, 0, 450, 120)])
+        waypoints = planner.plan((100, 100), (800, 100))
+        self.assertEqual(waypoints[-1], [800, 100])
+        self.assertTrue(len(waypoints) > 1)
+
+        # every waypoint is free and there is a line of sight between consecutive waypoints
+        cells = [planner.toCell(p) for p in [[100, 100]] + waypoints]
+        for i in range(1, len(cells)):
+            self.assertTrue(planner.isFree(cells[i]))
+            self.assertTrue(planner.hasLineOfSight(cells[i - 1], cells[i]))
+
+    def testStraightPathWithoutObstacles(self):
+        planner = PathPlanner()
+        self.assertEqual(planner.plan((100, 150), (800, 150)), [[800, 150]])
+
+    def testBlockedGoal(self):
+        planner = PathPlanner([(400, 0, 450, 120)])
+        self.assertRaises(Exception, planner.plan, (100, 100), (425, 100))
+
+    def testCostmapCache(self):
+        first = PathPlanner([(400, 0, 450, 120)])
+        PathPlanner.costmaps = {}
+        # the second planner loads the costmap from the file cache
+        second = PathPlanner([(400, 0, 450, 120)])
+        self.assertTrue(numpy.array_equal(first.costmap, second.costmap))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+"""
+Tests of modules/PoseHistory.py.
+Run from the repository root: python -m unittest discover tests
+"""
+
+from modules.PoseHistory import PoseHistory
+import unittest
+
+class PoseHistoryTest(unittest.TestCase):
+
+    def assertPose(self, pose, expected):
+        for value, expectedValue in zip(pose, expected):
+            self.assertAlmostEqual(value, expectedValue)
+
+    def testEmpty(self):
+        history = PoseHistory(4)
+        self.assertEqual(history.getAt(1.0), None)
+        self.assertEqual(history.getRange(), None)
+
+    def testInterpolation(self):
+        history = PoseHistory(4)
+        history.append(1.0, (100, 200), 10)
+        history.append(2.0, (200, 100), 30)
+        self.assertPose(history.getAt(1.25), (125, 175, 15))
+        self.assertPose(history.getAt(2.0), (200, 100, 30))
+
+    def testAngleWrap(self):
+        history = PoseHistory(4)
+        history.append(1.0, (0, 0), 170)
+        history.append(2.0, (0, 0), -170)
+        # shorter way goes through 180, not through 0
+        self.assertPose(history.getAt(1.5), (0, 0, 180))
+        self.assertPose(history.getAt(1.75), (0, 0, -175))
+
+    def testClamping(self):
+        history = PoseHistory(4)
+        history.append(1.0, (100, 200), 10)
+        history.append(2.0, (200, 100), 30)
+        self.assertPose(history.getAt(0.0), (100, 200, 10))
+        self.assertPose(history.getAt(3.0), (200, 100, 30))
+
+    def testRingOverflow(self):
+        history = PoseHistory(3)
+        for i in range(0, 5):
+            history.append(float(i), (i * 10, 0), 0)
+        # only the last three poses are kept
+        self.assertEqual(history.getRange(), (2.0, 4.0))
+        self.assertPose(history.getAt(0.0), (20, 0, 0))
+        self.assertPose(history.getAt(3.5), (35, 0, 0))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+"""
+Tests of modules/PoseLog.py.
+Run from the repository root: python -m unittest discover tests
+"""
+
+from modules.PoseLog import PoseLog, loadPoseLog
+import os
+import shutil
+import tempfile
+import unittest
+
+class PoseLogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.fileName = os.path.join(self.path, "poses.bin")
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def testRoundTrip(self):
+        log = PoseLog(self.fileName, 2)
+        log.append(1.5, (320, 240), (500, 155), 90)
+        log.append(2.5, None, (510, 160), -45, PoseLog.FLAG_INTERPOLATED)
+        log.append(3.5, (330, 250), None, 0, PoseLog.FLAG_CORRECTION)
+        log.close()
+
+        records = loadPoseLog(self.fileName)
+        self.assertEqual(len(records), 3)
+        self.assertEqual(list(records["timestamp"]), [1.5, 2.5, 3.5])
+        self.assertEqual([records[0][field] for field in ("px", "py", "x", "y", "angle")], [320, 240, 500, 155, 90])
+        self.assertEqual((records[1]["px"], records[1]["angle"], records[1]["flags"]), (-1, -45, PoseLog.FLAG_INTERPOLATED))
+        self.assertEqual((records[2]["x"], records[2]["flags"]), (-1, PoseLog.FLAG_CORRECTION))
+
+    def testAppendAfterClose(self):
+        log = PoseLog(self.fileName, 4)
+        log.append(1.0, (0, 0), (0, 0), 0)
+        log.close()
+        log.append(2.0, (0, 0), (0, 0), 0)
+        log.close()
+        self.assertEqual(len(loadPoseLog(self.fileName)), 1)
+
+    def testIncompleteRecord(self):
+        log = PoseLog(self.fileName, 4)
+        log.append(1.0, (0, 0), (0, 0), 0)
+        log.append(2.0, (0, 0), (0, 0), 0)
+        log.close()
+
+        # a crash in the middle of a record
+        _file = open(self.fileName, "ab")
+        _file.write(b"\x00" * 5)
+        _file.close()
+        self.assertEqual(len(loadPoseLog(self.fileName)), 2)
+
+        # appending cuts off the incomplete record, so the new records stay aligned
+        log = PoseLog(self.fileName, 4, True)
+        log.append(3.0, (0, 0), (0, 0), 0)
+        log.close()
+        self.assertEqual(list(loadPoseLog(self.fileName)["timestamp"]), [1.0, 2.0, 3.0])
+
+    def testNotAPoseLog(self):
+        _file = open(self.fileName, "wb")
+        _file.write(b"\x00" * 64)
+        _file.close()
+        self.assertRaises(Exception, loadPoseLog, self.fileName)
+
+if __name__ == "__main__":
+    unittest.main()
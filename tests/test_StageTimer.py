@@ -0,0 +1,75 @@
+"""
+Tests of modules/StageTimer.py.
+Run from the repository root: python -m unittest discover tests
+"""
+
+import modules.StageTimer
+from modules.StageTimer import StageTimer
+import unittest
+
+class FakeClock(object):
+    """
+    Clock which only moves when told to.
+    """
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+class StageTimerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.monotonic = modules.StageTimer.monotonic
+        self.clock = FakeClock()
+        modules.StageTimer.monotonic = self.clock
+
+    def tearDown(self):
+        modules.StageTimer.monotonic = self.monotonic
+
+    def runFrame(self, timer, laps):
+        timer.startFrame()
+        for stage, seconds in laps:
+            self.clock.now += seconds
+            timer.lap(stage)
+        timer.endFrame()
+
+    def testLapsAreSummed(self):
+        timer = StageTimer(["capture", "blur"], 10)
+        self.runFrame(timer, [("capture", 0.010), ("blur", 0.002), ("blur", 0.003)])
+        stats = timer.getStats()
+        self.assertEqual(stats["frames"], 1)
+        self.assertAlmostEqual(stats["stages"]["capture"]["mean"], 10)
+        self.assertAlmostEqual(stats["stages"]["blur"]["mean"], 5)
+        self.assertAlmostEqual(stats["busy"], 15)
+
+    def testLapOutsideOfFrame(self):
+        timer = StageTimer(["capture"], 10)
+        timer.lap("capture")
+        timer.endFrame()
+        stats = timer.getStats()
+        self.assertEqual(stats["frames"], 0)
+        self.assertEqual(stats["stages"]["capture"], {"mean": 0.0, "max": 0.0})
+
+    def testWindow(self):
+        timer = StageTimer(["capture"], 3)
+        for seconds in (0.100, 0.001, 0.002, 0.003):
+            self.runFrame(timer, [("capture", seconds)])
+        # only the last three frames count
+        stats = timer.getStats()
+        self.assertEqual(stats["frames"], 4)
+        self.assertAlmostEqual(stats["stages"]["capture"]["mean"], 2)
+        self.assertAlmostEqual(stats["stages"]["capture"]["max"], 3)
+
+    def testRate(self):
+        timer = StageTimer(["capture"], 10)
+        for i in range(0, 5):
+            self.runFrame(timer, [("capture", 0.005)])
+            self.clock.now += 0.015
+            timer.late()
+        stats = timer.getStats()
+        self.assertAlmostEqual(stats["rate"], 50)
+        self.assertEqual(stats["late"], 5)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""
+Tests of modules/TraceBuffer.py.
+Run from the repository root: python -m unittest discover tests
+"""
+
+from modules.TraceBuffer import TraceBuffer
+import numpy
+import os
+import shutil
+import tempfile
+import unittest
+
+class TraceBufferTest(unittest.TestCase):
+
+    def appendRecords(self, trace, count, interpolated=()):
+        for i in range(0, count):
+            pixel = [[i, 0], None, [i, 2], None, [i, 1], None]
+            box = [[i * 10, 0], None, [i * 10, 20], None, [i * 10, 10], None]
+            trace.append(i * 0.1, pixel, box, i in interpolated)
+
+    def testGrowth(self):
+        trace = TraceBuffer(4)
+        self.appendRecords(trace, 10)
+        records = trace.getRecords()
+        self.assertEqual(len(records), 10)
+        self.assertTrue(len(trace.records) >= 10)
+
+        # records written before the buffer grew are kept
+        self.assertEqual(list(records["timestamp"]), [i * 0.1 for i in range(0, 10)])
+        self.assertEqual(records["box"][3].tolist(), [[30, 0], [30, 20], [30, 10]])
+        self.assertEqual(records["pixel"][9].tolist(), [[9, 0], [9, 2], [9, 1]])
+
+    def testRecordsAreCopied(self):
+        trace = TraceBuffer(4)
+        self.appendRecords(trace, 2)
+        records = trace.getRecords()
+        records["timestamp"][0] = 42
+        self.assertEqual(trace.getRecords()["timestamp"][0], 0)
+
+    def testFlagColours(self):
+        trace = TraceBuffer(4)
+        self.appendRecords(trace, 4, (2,))
+        colours = trace.getColours(trace.getRecords(), "flag")
+        self.assertEqual(colours.tolist(), [list(TraceBuffer.WHITE), list(TraceBuffer.YELLOW), list(TraceBuffer.WHITE)])
+
+    def testTimeColours(self):
+        trace = TraceBuffer(4)
+        self.appendRecords(trace, 10)
+        colours = trace.getColours(trace.getRecords(), "time").astype(int)
+        self.assertEqual(len(colours), 9)
+        # from blue at the start to red at the end
+        self.assertTrue(colours[0][0] > colours[0][2])
+        self.assertTrue(colours[-1][2] > colours[-1][0])
+
+    def testUnknownMode(self):
+        trace = TraceBuffer(4)
+        self.appendRecords(trace, 3)
+        self.assertRaises(Exception, trace.getColours, trace.getRecords(), "rainbow")
+
+    def testWriteSvg(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        fileName = os.path.join(path, "trace.svg")
+
+        trace = TraceBuffer(4)
+        self.appendRecords(trace, 5, (2, 3))
+        trace.writeSvg(fileName, "box", 1000, 310, "flag")
+
+        _file = open(fileName, "r")
+        svg = _file.read()
+        _file.close()
+        # white, yellow and white again
+        self.assertEqual(svg.count("<polyline"), 3)
+        self.assertTrue('stroke="#ffff00"' in svg)
+
+if __name__ == "__main__":
+    unittest.main()
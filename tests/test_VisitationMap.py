@@ -0,0 +1,64 @@
+"""
+Tests of modules/VisitationMap.py.
+Run from the repository root: python -m unittest discover tests
+"""
+
+from modules.VisitationMap import VisitationMap
+import numpy
+import os
+import shutil
+import tempfile
+import unittest
+
+class VisitationMapTest(unittest.TestCase):
+
+    def setUp(self):
+        self.visitation = VisitationMap()
+        self.path = tempfile.mkdtemp()
+        self.visitation.path = self.path + os.sep
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def testUpdate(self):
+        self.visitation.update((105, 45), 0)
+        self.visitation.update((110, 50), 0)
+        self.visitation.update((110, 50), 90)
+        self.assertEqual(self.visitation.getVisits((100, 40)), 3)
+        self.assertEqual(self.visitation.getVisits((100, 40), 0), 2)
+        self.assertEqual(self.visitation.getVisits((100, 40), 90), 1)
+        self.assertEqual(self.visitation.getVisits((100, 40), 180), 0)
+        self.assertEqual(self.visitation.getVisits((300, 40)), 0)
+
+    def testOutsideArena(self):
+        self.visitation.update((-10, 50), 0)
+        self.visitation.update((50, 5000), 0)
+        self.assertEqual(self.visitation.getVisitation().sum(), 0)
+        self.assertEqual(self.visitation.getVisits((-10, 50)), self.visitation.max_visits)
+
+    def testSaturation(self):
+        self.visitation.visits[2, 5, 4] = self.visitation.max_visits
+        self.visitation.update((105, 45), 0)
+        self.assertEqual(self.visitation.getVisits((105, 45), 0), self.visitation.max_visits)
+
+    def testTurnPreference(self):
+        location = (500, 155)
+        self.assertAlmostEqual(self.visitation.getTurnPreference(location, 0), 0.5)
+
+        # visit the cells ahead at bigger angles: prefer turning towards smaller angles
+        ahead = (location[0] + 150 * numpy.cos(numpy.radians(45)), location[1] + 150 * numpy.sin(numpy.radians(45)))
+        for i in range(0, 10):
+            self.visitation.update(ahead, 0)
+        self.assertTrue(self.visitation.getTurnPreference(location, 0) > 0.9)
+        self.assertTrue(self.visitation.getTurnPreference(location, 90) < 0.5)
+
+    def testStopWritesSnapshot(self):
+        self.visitation.update((105, 45), 0)
+        self.visitation.stop()
+        files = os.listdir(self.path)
+        self.assertEqual(len(files), 1)
+        snapshot = numpy.load(os.path.join(self.path, files[0]))
+        self.assertTrue(numpy.array_equal(snapshot, self.visitation.getVisitation()))
+
+if __name__ == "__main__":
+    unittest.main()
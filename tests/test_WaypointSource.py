@@ -0,0 +1,85 @@
+"""
+Tests of modules/WaypointSource.py.
+Run from the repository root: python -m unittest discover tests
+"""
+
+from modules.WaypointSource import ArrayWaypointSource, FileWaypointSource, GeneratorWaypointSource, QueueWaypointSource
+import os
+import tempfile
+import threading
+import unittest
+
+class WaypointSourceTest(unittest.TestCase):
+
+    def readAll(self, source):
+        points = []
+        point = source.next()
+        while point != None:
+            points.append(point)
+            point = source.next()
+        return points
+
+    def writeFile(self, content):
+        handle, filePath = tempfile.mkstemp(".txt")
+        os.write(handle, content.encode("ascii"))
+        os.close(handle)
+        self.addCleanup(os.remove, filePath)
+        return filePath
+
+    def testArraySource(self):
+        source = ArrayWaypointSource([[100, 100], [500, 100]], 2, 1)
+        source.start()
+        self.assertEqual(self.readAll(source), [[100, 100], [500, 100], [100, 100], [500, 100]])
+        self.assertEqual(source.next(), None)
+
+    def testGeneratorSource(self):
+        source = GeneratorWaypointSource(([i, i] for i in range(0, 20)), 3)
+        source.start()
+        self.assertEqual(self.readAll(source), [[i, i] for i in range(0, 20)])
+
+    def testFileSource(self):
+        filePath = self.writeFile("x    y\n4000    2000\n500    500\n")
+        source = FileWaypointSource(filePath, 2)
+        source.start()
+        self.assertEqual(self.readAll(source), [[4000, 2000], [500, 500], [4000, 2000], [500, 500]])
+
+    def testCorruptFile(self):
+        filePath = self.writeFile("x    y\n4000    2000\n500    abc\n")
+        self.assertRaises(Exception, FileWaypointSource, filePath)
+
+    def testQueueSource(self):
+        source = QueueWaypointSource(2)
+        source.start()
+        self.assertEqual(source.peek(False), None)
+
+        def producer():
+            for i in range(0, 10):
+                source.put([i, 0])
+            source.finish()
+        thread = threading.Thread(target=producer)
+        thread.start()
+
+        self.assertEqual(source.peek(), [0, 0])
+        self.assertEqual(self.readAll(source), [[i, 0] for i in range(0, 10)])
+        thread.join()
+
+    def testBufferLimit(self):
+        source = ArrayWaypointSource([[i, i] for i in range(0, 100)], 1, 5)
+        source.start()
+        self.assertEqual(source.peek(), [0, 0])
+        self.assertTrue(len(source.buffer) <= 5)
+
+    def testClose(self):
+        source = ArrayWaypointSource([[i, i] for i in range(0, 100)], 1, 5)
+        source.start()
+        self.assertEqual(source.next(), [0, 0])
+        source.close()
+        self.assertEqual(source.next(), None)
+        self.assertEqual(source.peek(), None)
+
+        # the producing thread does not block on a closed source
+        source._thread.join(1)
+        self.assertFalse(source._thread.is_alive())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,192 @@
+from utils.Freezeable import Freezeable
+from settings import Setup
+from cv2 import cv
+import cv2
+import numpy
+import math
+
+class SyntheticArena(Freezeable):
+    """
+    This class renders synthetic overhead camera frames of the arena with known ground truth:
+    yellow calibration markers in the corners and the robots' blue and green markers at a given pose.
+    Disturbances are configurable: noise (standard deviation of gray values), blur (sigma in pixels),
+    lighting gradient (0: none, 0.5: half as bright on the right side), perspective skew (pixels the
+    far corners move inwards) and occlusion (probability that a robot marker is covered).
+    The arena is placed into the tracking area of the camera frame (image.tracking) with the scale
+    calibrate() assumes (tracking width / arena width).
+    Examples:
+    -arena = SyntheticArena(noise=5, blur=1.0)
+    -frame = arena.render((500, 150, 45))
+    -capture = SyntheticCapture(arena, arena.trajectory(300))
+    """
+    # HSV colours (centers of the tracker's ranges)
+    YELLOW = (30, 200, 220)
+    BLUE = (100, 200, 200)
+    GREEN = (48, 200, 200)
+
+    def __init__(self, noise=0.0, blur=0.0, gradient=0.0, skew=0, occlusion=0.0, seed=0):
+        """
+        Constructor
+        """
+        self.setup = Setup()
+        self.name = "SyntheticArena"
+
+        self.noise = noise
+        self.blur = blur
+        self.gradient = gradient
+        self.skew = skew
+        self.occlusion = occlusion
+        self.random = numpy.random.RandomState(seed)
+
+        # size of the camera frame, the tracker crops image.tracking out of it
+        tracking = self.setup.image.tracking
+        self.frame_width = tracking.offx + tracking.width + tracking.offx
+        self.frame_height = tracking.offy + tracking.height + tracking.offy
+
+        # robot markers: distance of their centers and radius in mm
+        self.marker_distance = self.setup.robot.diameter / 2
+        self.marker_radius = self.setup.robot.diameter / 8
+
+        # arena corners in pixels (top left, bottom left, bottom right, top right), centered in the tracking area
+        scale = float(tracking.width) / self.setup.arena.boxwidth
+        width = self.setup.arena.boxwidth * scale
+        height = self.setup.arena.boxheight * scale
+        left = tracking.offx + (tracking.width - width) / 2.0
+        top = tracking.offy + (tracking.height - height) / 2.0
+        self.corners = numpy.array([[left + skew, top],
+                                    [left, top + height],
+                                    [left + width, top + height],
+                                    [left + width - skew, top]], numpy.float32)
+
+        # arena (mm) -> frame (pixels)
+        arena = numpy.array([[0, 0],
+                             [0, self.setup.arena.boxheight],
+                             [self.setup.arena.boxwidth, self.setup.arena.boxheight],
+                             [self.setup.arena.boxwidth, 0]], numpy.float32)
+        self.homography = cv2.getPerspectiveTransform(arena, self.corners)
+
+        # background: floor, arena and calibration markers. Robot markers are drawn on a copy
+        self.background = self.renderBackground()
+
+        self.freeze()
+
+    def toPixel(self, points):
+        """
+        Transform arena coordinates in mm (N x 2) into frame pixels (N x 2).
+        """
+        points = numpy.asarray(points, numpy.float32).reshape(-1, 1, 2)
+        return cv2.perspectiveTransform(points, self.homography).reshape(-1, 2)
+
+    def toBGR(self, hsv):
+        """
+        Private. Convert one HSV colour to a BGR tuple.
+        """
+        bgr = cv2.cvtColor(numpy.array([[hsv]], numpy.uint8), cv.CV_HSV2BGR)[0, 0]
+        return (int(bgr[0]), int(bgr[1]), int(bgr[2]))
+
+    def renderBackground(self):
+        """
+        Private. Render floor, arena and the yellow calibration markers.
+        """
+        frame = numpy.empty((self.frame_height, self.frame_width, 3), numpy.uint8)
+        frame[:] = (40, 40, 40)
+        cv2.fillConvexPoly(frame, numpy.int32(numpy.round(self.corners)), (110, 110, 110))
+
+        # calibration markers are squares in the arena corners
+        size = self.setup.arena.markersize
+        w, h = self.setup.arena.boxwidth, self.setup.arena.boxheight
+        for (x, y) in ((0, 0), (0, h - size), (w - size, h - size), (w - size, 0)):
+            square = self.toPixel([[x, y], [x, y + size], [x + size, y + size], [x + size, y]])
+            cv2.fillConvexPoly(frame, numpy.int32(numpy.round(square)), self.toBGR(self.YELLOW))
+        return frame
+
+    def getMarkers(self, pose):
+        """
+        Returns the centers of the blue and the green marker (mm) of a robot at pose (x, y, angle).
+        The blue marker is in front, see Tracker.updatePosition().
+        """
+        d_x = math.cos(math.radians(pose[2])) * self.marker_distance / 2.0
+        d_y = math.sin(math.radians(pose[2])) * self.marker_distance / 2.0
+        return [[pose[0] + d_x, pose[1] + d_y], [pose[0] - d_x, pose[1] - d_y]]
+
+    def render(self, pose):
+        """
+        Render a frame with the robot at pose (x, y, angle) in arena coordinates (mm, degree).
+        """
+        frame = self.background.copy()
+
+        markers = self.toPixel(self.getMarkers(pose))
+        radius = max(int(round(self.marker_radius * float(self.setup.image.tracking.width) / self.setup.arena.boxwidth)), 1)
+        for center, colour in zip(markers, (self.BLUE, self.GREEN)):
+            # draw with 4 bits of subpixel precision
+            cv2.circle(frame, (int(round(center[0] * 16)), int(round(center[1] * 16))), radius * 16, self.toBGR(colour), -1, cv2.CV_AA, 4)
+
+        # cover one of the markers
+        if self.occlusion > 0 and self.random.rand() < self.occlusion:
+            center = markers[self.random.randint(0, 2)]
+            cv2.circle(frame, (int(round(center[0])), int(round(center[1]))), radius + 2, (20, 20, 20), -1)
+
+        if self.gradient > 0:
+            light = 1.0 - self.gradient * numpy.linspace(0, 1, self.frame_width)
+            frame = (frame * light[numpy.newaxis, :, numpy.newaxis]).astype(numpy.uint8)
+
+        if self.blur > 0:
+            frame = cv2.GaussianBlur(frame, (0, 0), self.blur)
+
+        if self.noise > 0:
+            noisy = frame + self.random.normal(0, self.noise, frame.shape)
+            frame = numpy.clip(noisy, 0, 255).astype(numpy.uint8)
+
+        return frame
+
+    def trajectory(self, count):
+        """
+        Returns count poses (x, y, angle) along a smooth closed path through the arena,
+        heading in driving direction.
+        """
+        margin = self.setup.robot.diameter
+        w = self.setup.arena.boxwidth / 2.0 - margin
+        h = self.setup.arena.boxheight / 2.0 - margin
+        poses = []
+        for i in range(0, count):
+            t = 2 * math.pi * i / count
+            x = self.setup.arena.boxwidth / 2.0 + w * math.sin(t)
+            y = self.setup.arena.boxheight / 2.0 + h * math.sin(2 * t)
+            angle = math.degrees(math.atan2(2 * h * math.cos(2 * t), w * math.cos(t)))
+            poses.append((x, y, angle))
+        return poses
+
+class SyntheticCapture(object):
+    """
+    Stands in for a cv2.VideoCapture: returns rendered frames of poses one after the other
+    (from the beginning again after the last one). pose is the ground truth of the last returned frame.
+    """
+
+    def __init__(self, arena, poses):
+        """
+        Constructor
+        """
+        self.arena = arena
+        self.poses = poses
+        self.index = 0
+        self.pose = None
+        self.frame = None
+
+    def isOpened(self):
+        return True
+
+    def grab(self):
+        self.pose = self.poses[self.index % len(self.poses)]
+        self.index += 1
+        self.frame = self.arena.render(self.pose)
+        return True
+
+    def retrieve(self):
+        return True, self.frame
+
+    def read(self):
+        self.grab()
+        return self.retrieve()
+
+    def release(self):
+        pass
@@ -0,0 +1,106 @@
+"""
+Benchmark of the tracker on synthetic frames (see SyntheticArena), no camera needed.
+Times calibrate(), updatePosition(), calcPosInBox() and getPosOfMarker() and compares
+tracked poses with the ground truth.
+Run from the repository root:
+python -m tools.benchmarkTracker [frames=300] [noise=0] [blur=0] [gradient=0] [skew=0] [occlusion=0]
+"""
+
+from settings import Setup
+from utils import Log as MyLog
+from modules.Tracker import Tracker
+from modules.StageTimer import StageTimer
+from tools.SyntheticArena import SyntheticArena, SyntheticCapture
+from cv2 import cv
+import cv2
+import numpy
+import shutil
+import sys
+import tempfile
+import time
+
+NAME = "benchmarkTracker"
+
+def timeIt(function, repetitions):
+    """
+    Returns the mean time (seconds) of a call of function.
+    """
+    start = time.time()
+    for i in range(0, repetitions):
+        function()
+    return (time.time() - start) / repetitions
+
+def benchmark(frames=300, noise=0.0, blur=0.0, gradient=0.0, skew=0, occlusion=0.0):
+    """
+    Track a number of synthetic frames and return a dictionary of timings and errors.
+    """
+    setup = Setup()
+    arena = SyntheticArena(noise, blur, gradient, skew, occlusion)
+    capture = SyntheticCapture(arena, arena.trajectory(frames))
+
+    tracker = Tracker(capture)
+
+    # keep all files of the benchmark (calibration, traces, diagnostic images) away from the real ones
+    path = tempfile.mkdtemp() + "/"
+    tracker.setup.filesystem.file_dir = path
+    tracker.diagnostics.path = path + setup.filesystem.cam_dir + "diagnostics/"
+
+    results = {}
+    try:
+        # calibration and its error (pixels) against the rendered corners
+        results["calibrate"] = timeIt(tracker.calibrate, 3)
+        offset = numpy.array([setup.image.tracking.offx, setup.image.tracking.offy])
+        results["calibration_error"] = float(numpy.abs(numpy.array(tracker.calibration) - (arena.corners - offset)).max())
+
+        # tracking and its error against the ground truth
+        position_errors = []
+        angle_errors = []
+        # time the stages of all frames
+        tracker.timer = StageTimer(tracker.timer.stages, frames)
+        for i in range(0, frames):
+            tracker.updatePosition()
+            truth = capture.pose
+            location = tracker.getOdometry().location
+            position_errors.append(numpy.hypot(location[0] - truth[0], location[1] - truth[1]))
+            angle_errors.append(abs((tracker.getOdometry().angle - truth[2] + 180) % 360 - 180))
+        # rendering is part of grabbing a frame (stage "capture"), don't count it
+        stats = tracker.timer.getStats()
+        results["updatePosition"] = (stats["busy"] - stats["stages"]["capture"]["mean"]) / 1000
+        results["fps"] = 1.0 / results["updatePosition"] if results["updatePosition"] > 0 else float("inf")
+        results["position_error_mean"] = float(numpy.mean(position_errors))
+        results["position_error_max"] = float(numpy.max(position_errors))
+        results["angle_error_mean"] = float(numpy.mean(angle_errors))
+        results["angle_error_max"] = float(numpy.max(angle_errors))
+        results["frame_stats"] = tracker.getRoiStats()
+
+        results["calcPosInBox"] = timeIt(lambda: tracker.calcPosInBox(tracker.track_obj, tracker.calibration), 1000)
+
+        hsv = cv2.cvtColor(cv2.GaussianBlur(tracker.frame, (0, 0), 2), cv.CV_BGR2HSV)
+        results["getPosOfMarker"] = timeIt(lambda: tracker.getPosOfMarker(hsv, tracker.blue_range[0], tracker.blue_range[1]), 100)
+    finally:
+        tracker.stop()
+        shutil.rmtree(path, True)
+
+    return results
+
+def printResults(results):
+    """
+    Log the results of benchmark().
+    """
+    MyLog.l(NAME, "calibrate():      %.2f ms, corner error %.1f px" % (results["calibrate"] * 1000, results["calibration_error"]))
+    MyLog.l(NAME, "updatePosition(): %.2f ms (%.0f frames per second)" % (results["updatePosition"] * 1000, results["fps"]))
+    MyLog.l(NAME, "  position error: mean %.1f mm, max %.1f mm" % (results["position_error_mean"], results["position_error_max"]))
+    MyLog.l(NAME, "  angle error:    mean %.1f deg, max %.1f deg" % (results["angle_error_mean"], results["angle_error_max"]))
+    MyLog.l(NAME, "  frames:         " + str(results["frame_stats"]))
+    MyLog.l(NAME, "calcPosInBox():   %.3f ms" % (results["calcPosInBox"] * 1000))
+    MyLog.l(NAME, "getPosOfMarker(): %.3f ms" % (results["getPosOfMarker"] * 1000))
+
+if __name__ == "__main__":
+    # process console input: key=value
+    options = {"frames": 300}
+    for i, arg in enumerate(sys.argv):
+        if i == 0: continue
+        key, value = arg.split("=")
+        options[key] = int(value) if key in ("frames", "skew") else float(value)
+
+    printResults(benchmark(**options))
@@ -0,0 +1,25 @@
+"""
+Lens calibration of the tracking camera.
+Take 10-20 pictures of a printed checkerboard (tracking.checkerboard inner corners) with the tracking camera,
+in different positions and angles all over the arena, and save them in one directory. Then run from the repository root:
+python -m tools.calibrateLens <image directory> [columns rows]
+The intrinsics and the undistortion map are written to calibration/lens.npz and used by the tracker from then on.
+"""
+
+from modules.LensCorrection import LensCorrection
+import sys
+
+def main():
+    if len(sys.argv) < 2:
+        print __doc__
+        sys.exit()
+
+    pattern = None
+    if len(sys.argv) > 3:
+        pattern = (int(sys.argv[2]), int(sys.argv[3]))
+
+    lens = LensCorrection()
+    lens.calibrate(sys.argv[1], pattern)
+
+if __name__ == "__main__":
+    main()
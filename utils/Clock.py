@@ -0,0 +1,33 @@
+import ctypes
+import ctypes.util
+import os
+import time
+
+# clock_gettime() id of the monotonic clock on Linux
+CLOCK_MONOTONIC = 1
+
+class timespec(ctypes.Structure):
+    _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+_clock_gettime = None
+if hasattr(time, "monotonic"):
+    monotonic = time.monotonic
+else:
+    try:
+        _clock_gettime = ctypes.CDLL(ctypes.util.find_library("rt") or "libc.so.6", use_errno=True).clock_gettime
+        _clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(timespec)]
+    except Exception:
+        _clock_gettime = None
+
+    def monotonic():
+        """
+        Returns seconds of a clock which never jumps (e.g. when the system time is set), for measuring intervals.
+        Falls back to time.time() if there is no monotonic clock.
+        """
+        if _clock_gettime == None:
+            return time.time()
+        t = timespec()
+        if _clock_gettime(CLOCK_MONOTONIC, ctypes.pointer(t)) != 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        return t.tv_sec + t.tv_nsec * 1e-9